@@ -0,0 +1,93 @@
+"""
+Benchmark for near-duplicate lookups in the DuplicateIndex.
+
+Grows an index of random fingerprints to each size in --sizes and, at every
+size, times `find_canonical` for listings that are near-duplicates (1 to
+max_distance flipped bits) of an indexed one, and for listings that match
+nothing, next to a brute-force scan over every stored fingerprint. Banded
+lookups should stay roughly flat as the index grows while the scan grows
+linearly.
+
+Exits with status 1 if any planted near-duplicate is not found.
+
+Usage:
+    python -m benchmarks.dedupe_bench [--sizes 1000,10000,100000] [--queries 500]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from storage.duplicate_index import DuplicateIndex, _bands, _signed
+from utilities.logger import Logger
+
+
+def flip_bits(rng, fingerprint, count):
+    for bit in rng.sample(range(64), count):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def brute_force(index, fingerprint, max_distance):
+    rows = index._conn.execute("SELECT url, fingerprint FROM fingerprints").fetchall()
+    return [row["url"] for row in rows if bin((row["fingerprint"] & ((1 << 64) - 1)) ^ fingerprint).count("1") <= max_distance]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated index sizes")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="dedupe_bench_")
+    Logger._log_file = os.path.join(tmp_dir, "logs.jsonl")
+    Logger._echo = False
+
+    rng = random.Random(args.seed)
+    index = DuplicateIndex(os.path.join(tmp_dir, "duplicates.sqlite3"))
+    fingerprints = []
+    missed = 0
+
+    print(f"{'indexed':>9} {'dup us/lookup':>14} {'miss us/lookup':>15} {'scan us/lookup':>15} {'found':>9}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        # Filled in one transaction; `add` commits per listing, which would dominate the setup time
+        with index._conn:
+            while len(fingerprints) < size:
+                fingerprint = rng.getrandbits(64)
+                url = f"https://example.org/{len(fingerprints)}.html"
+                index._conn.execute(
+                    "INSERT INTO fingerprints VALUES (?, '', ?, NULL, ?, 0, ?, ?, ?, ?)",
+                    [url, _signed(fingerprint), url] + _bands(fingerprint),
+                )
+                fingerprints.append(fingerprint)
+
+        targets = rng.sample(range(size), min(args.queries, size))
+        duplicates = [flip_bits(rng, fingerprints[target], rng.randint(1, index.max_distance)) for target in targets]
+        began = time.perf_counter()
+        matches = [index.find_canonical(fingerprint) for fingerprint in duplicates]
+        duplicate_us = (time.perf_counter() - began) / len(duplicates) * 1e6
+        found = sum(1 for match in matches if match is not None)
+        missed += len(duplicates) - found
+
+        unrelated = [rng.getrandbits(64) for _ in range(len(duplicates))]
+        began = time.perf_counter()
+        for fingerprint in unrelated:
+            index.find_canonical(fingerprint)
+        miss_us = (time.perf_counter() - began) / len(unrelated) * 1e6
+
+        scans = duplicates[:20]
+        began = time.perf_counter()
+        for fingerprint in scans:
+            brute_force(index, fingerprint, index.max_distance)
+        scan_us = (time.perf_counter() - began) / len(scans) * 1e6
+
+        print(f"{size:>9} {duplicate_us:>14.0f} {miss_us:>15.0f} {scan_us:>15.0f} {found:>4}/{len(duplicates):<4}")
+
+    Logger.shutdown()
+    sys.exit(1 if missed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Offline end-to-end load benchmark for Engine.run.
+
+Starts local stand-ins for Craigslist, the OpenAI chat completions API and
+Twilio, then runs the real spider, LLMBufferPipeline, ListingEvaluatorLLMClient
+and Engine against them once per scale, each run in a fresh process and
+scratch directory. Reports listings scored per second, p50/p99 LLM request
+latency, peak RSS and alerts sent. No real network traffic is made.
+
+With --regions, every search covers that many Craigslist regions, each
+serving the given number of listings. With --workers, every scale is run once
+per worker count. Runs with more than one worker go through the
+coordinator and its crawl worker processes. LLM latency is only measured
+in-process, so it is not reported for those runs.
+
+Usage:
+    python -m benchmarks.load [--scales 50,500,2000,10000] [--llm-latency 0.3]
+                              [--llm-jitter 0.1] [--llm-error-rate 0.0]
+                              [--llm-malformed-rate 0.0]
+                              [--repost-rate 0.0] [--images] [--production-pacing]
+                              [--regions 1] [--cross-post-rate 0.0] [--workers 1,2,4]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from benchmarks.load.standins import ChatCompletionsStandIn, CraigslistStandIn, TwilioStandIn
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+REGIONS = ("sfbay", "sacramento", "monterey", "stockton", "modesto", "fresno", "chico", "reno")
+
+
+def run_scale(listings, workers, llm, twilio, args):
+    regions = REGIONS[:args.regions]
+    craigslist = CraigslistStandIn(
+        listings,
+        seed=args.seed,
+        repost_rate=args.repost_rate,
+        regions=regions,
+        cross_post_rate=args.cross_post_rate,
+    ).start()
+    llm.reset()
+    twilio.reset()
+    workdir = tempfile.mkdtemp(prefix=f"load_bench_{listings}_")
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])),
+        SCRAPY_SETTINGS_MODULE="benchmarks.load.settings",
+        BENCH_PRODUCTION_PACING="1" if args.production_pacing else "0",
+        OPENAI_API_KEY="load-bench",
+        OPENAI_BASE_URL=f"{llm.url}/v1",
+        TWILIO_ACCOUNT_SID="AC" + "0" * 32,
+        TWILIO_AUTH_TOKEN="load-bench",
+        LOG_ECHO="0",
+    )
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.load.worker",
+             "--listings", str(listings),
+             "--craigslist-url", craigslist.url,
+             "--twilio-url", twilio.url,
+             "--regions", ",".join(regions),
+             "--workers", str(workers)]
+            + (["--images"] if args.images else []),
+            cwd=workdir, env=env, capture_output=True, text=True,
+        )
+    finally:
+        craigslist.stop()
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr[-4000:])
+        raise RuntimeError(f"Benchmark run for {listings} listings failed, scratch dir: {workdir}")
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result.update({
+        "detail_pages": craigslist.detail_pages,
+        "reposts": craigslist.reposts,
+        "cross_posts": craigslist.cross_posts,
+        "llm_requests_served": llm.requests,
+        "photos": craigslist.photos,
+        "llm_images": llm.images,
+        "llm_errors": llm.errors,
+        "llm_malformed": llm.malformed,
+        "alerts": len(twilio.messages),
+        "workdir": workdir,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="50,500,2000,10000", help="comma separated listing counts")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per chat completion")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="extra random seconds per chat completion")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of chat completions that fail with a 500")
+    parser.add_argument("--llm-malformed-rate", type=float, default=0.0, help="share of chat completions with a broken reply")
+    parser.add_argument("--repost-rate", type=float, default=0.0, help="share of listings that repost an earlier one")
+    parser.add_argument("--regions", type=int, default=1, choices=range(1, len(REGIONS) + 1), metavar=f"1-{len(REGIONS)}",
+                        help="regions per search, each with its own listings")
+    parser.add_argument("--cross-post-rate", type=float, default=0.0, help="share of a region's listings cross-posted from another")
+    parser.add_argument("--workers", default="1", help="comma separated crawl worker counts")
+    parser.add_argument("--images", action="store_true", help="enable the listing photo stage (needs Pillow)")
+    parser.add_argument("--production-pacing", action="store_true", help="keep the production download delay and throttle")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print raw results as JSON lines")
+    args = parser.parse_args()
+
+    llm = ChatCompletionsStandIn(args.llm_latency, args.llm_jitter, args.llm_error_rate, args.llm_malformed_rate, seed=args.seed).start()
+    twilio = TwilioStandIn().start()
+    try:
+        if not args.json:
+            print(f"{'listings':>9} {'workers':>7} {'pages':>7} {'scored':>7} {'secs':>8} {'listings/s':>11} "
+                  f"{'llm p50':>8} {'llm p99':>8} {'llm err':>8} {'rss MiB':>8} {'alerts':>7}")
+        for listings in (int(scale) for scale in args.scales.split(",")):
+            for workers in (int(count) for count in args.workers.split(",")):
+                result = run_scale(listings, workers, llm, twilio, args)
+                if args.json:
+                    print(json.dumps(result))
+                    continue
+                p50 = f"{result['llm_p50'] * 1000:.0f}ms" if result["llm_p50"] is not None else "-"
+                p99 = f"{result['llm_p99'] * 1000:.0f}ms" if result["llm_p99"] is not None else "-"
+                print(f"{listings:>9} {workers:>7} {result['detail_pages']:>7} {result['scored']:>7} {result['elapsed']:>8.1f} "
+                      f"{result['listings_per_sec']:>11.1f} {p50:>8} {p99:>8} {result['llm_errors']:>8} "
+                      f"{result['peak_rss_kib'] / 1024:>8.0f} {result['alerts']:>7}", flush=True)
+    finally:
+        llm.stop()
+        twilio.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# Scrapy settings for the load benchmark
+#
+# The project settings, with the politeness limits lifted since every request
+# goes to a local stand-in. Set BENCH_PRODUCTION_PACING=1 to keep the
+# production delay and adaptive throttle instead.
+
+import os
+from scraper.scraper.settings import *  # noqa: F401,F403
+
+if os.environ.get("BENCH_PRODUCTION_PACING") != "1":
+    DOWNLOAD_DELAY = 0
+    RANDOMIZE_DOWNLOAD_DELAY = False
+    CONCURRENT_REQUESTS = 32
+    CONCURRENT_REQUESTS_PER_DOMAIN = 16
+    ADAPTIVE_THROTTLE_ENABLED = False
+
+# The crawl ends when the search is exhausted, not at the production timeout
+CLOSESPIDER_TIMEOUT = 0
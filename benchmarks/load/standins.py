@@ -0,0 +1,380 @@
+"""
+Local stand-ins for the services the engine talks to.
+
+Each stand-in is a small threaded HTTP server that can be started on an
+ephemeral port and inspected afterwards:
+
+- CraigslistStandIn serves, per region, a search results page and detail
+  pages for N generated listings, a share of which can be reposts of earlier
+  ones or cross-posts from another region, and JPEG photos for them (drawn
+  with Pillow when first requested).
+- ChatCompletionsStandIn answers OpenAI chat completion requests with a score
+  per listing, after a configurable latency, fails a configurable share of
+  requests and garbles a configurable share of replies.
+- TwilioStandIn accepts message create requests and records the bodies.
+"""
+import io
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+BRANDS = ("Specialized", "Trek", "Cannondale", "Giant", "Bianchi", "Cervelo", "Surly", "Kona", "Fuji", "Raleigh")
+MODELS = ("Allez", "Domane", "CAAD", "Contend", "Via Nirone", "R3", "Straggler", "Rove", "Roubaix", "Merckx")
+KINDS = ("road bike", "road bike", "road bike", "road bike", "gravel bike", "commuter", "kids bike", "mountain bike")
+MATERIALS = ("aluminum", "carbon fiber", "steel", "titanium")
+CONDITIONS = ("new", "like new", "excellent", "good", "fair")
+
+
+class _StandIn:
+    """Run a request handler on 127.0.0.1 in a background thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    def handler(self, request):
+        raise NotImplementedError
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stand_in.handler(self)
+
+            def do_POST(self):
+                stand_in.handler(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    @staticmethod
+    def respond(request, status, body, content_type="application/json"):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    @staticmethod
+    def read_body(request):
+        length = int(request.headers.get("Content-Length") or 0)
+        return request.rfile.read(length) if length else b""
+
+
+class CraigslistStandIn(_StandIn):
+    """
+    Search and detail pages for `listings` generated bike listings per region, in Craigslist's markup.
+
+    Every region's pages are under `/<region>/`, so the base URL to configure
+    is `<url>/{region}`. About `repost_rate` of the listings are reposts: an
+    earlier listing's text under a new post id, at a price up to 5% lower.
+    About `cross_post_rate` of the listings of every region but the first are
+    cross-posts: a listing of an earlier region, at the same price, under a
+    new post id.
+
+    Every listing has `PHOTOS` photos at its own URLs. The last one is the
+    first re-encoded at a lower quality, and a repost's photos are the same
+    pictures as the original's, as when a seller uploads them again.
+    """
+
+    FIRST_POST_ID = 7700000000
+    PHOTOS = 3
+
+    def __init__(self, listings, seed=0, repost_rate=0.0, regions=("sfbay",), cross_post_rate=0.0):
+        super().__init__()
+        rng = random.Random(seed)
+        self.listings = []
+        self._search_pages = {}
+        for region in regions:
+            earlier = list(self.listings)
+            own = []
+            for _ in range(listings):
+                index = len(self.listings)
+                if earlier and rng.random() < cross_post_rate:
+                    original = rng.choice(earlier)
+                    listing = dict(self._repost(rng, index, original), price=original["price"], cross_post=True)
+                elif own and rng.random() < repost_rate:
+                    listing = self._repost(rng, index, rng.choice(own))
+                else:
+                    listing = self._generate(rng, index)
+                listing["region"] = region
+                own.append(listing)
+                self.listings.append(listing)
+            self._search_pages[region] = self._render_search_page(own).encode("utf-8")
+        self.reposts = sum(1 for listing in self.listings if listing.get("repost_of") and not listing.get("cross_post"))
+        self.cross_posts = sum(1 for listing in self.listings if listing.get("cross_post"))
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.search_pages = 0
+            self.detail_pages = 0
+            self.photos = 0
+
+    def _generate(self, rng, index):
+        brand, model, kind = rng.choice(BRANDS), rng.choice(MODELS), rng.choice(KINDS)
+        size = rng.choice((50, 52, 54, 54, 54, 56, 58))
+        return {
+            "post_id": self.FIRST_POST_ID + index,
+            "title": f"{brand} {model} {size}cm {kind}",
+            "price": rng.randint(150, 2500) if rng.random() < 0.85 else rng.choice((rng.randint(40, 149), rng.randint(2501, 6000))),
+            "distance": round(rng.uniform(0.2, 18.0), 1),
+            "condition": rng.choice(CONDITIONS),
+            "material": rng.choice(MATERIALS),
+            "size": size,
+            "posted": f"2025-09-{1 + index % 28:02d} {index % 24:02d}:{index % 60:02d}",
+        }
+
+    def _repost(self, rng, index, original):
+        return dict(
+            {key: value for key, value in original.items() if key != "cross_post"},
+            post_id=self.FIRST_POST_ID + index,
+            price=max(1, round(original["price"] * rng.uniform(0.95, 1.0))),
+            posted=f"2025-09-{1 + index % 28:02d} {index % 24:02d}:{index % 60:02d}",
+            repost_of=original.get("repost_of") or original["post_id"],
+        )
+
+    def _render_search_page(self, listings):
+        results = "\n".join(
+            f'<li class="cl-static-search-result" title="{escape(listing["title"])}">'
+            f'<a href="/{listing["region"]}/bik/d/listing/{listing["post_id"]}.html">'
+            f'<div class="title">{escape(listing["title"])}</div>'
+            f'<div class="details"><div class="price">${listing["price"]:,}</div>'
+            f'<div class="location">sf</div><div class="distance">{listing["distance"]}mi</div></div>'
+            f'</a></li>'
+            for listing in listings
+        )
+        return (
+            '<!DOCTYPE html><html><head><title>sfbay bicycles - craigslist</title></head><body>'
+            f'<ol class="cl-static-search-results">{results}</ol></body></html>'
+        )
+
+    def _render_detail_page(self, listing):
+        title = escape(listing["title"])
+        description = (
+            f"{listing['material'].title()} frame, {listing['size']}cm. "
+            f"Condition is {listing['condition']}. Tuned up last month, new tires and bar tape."
+        )
+        posting_data = json.dumps({
+            "@context": "https://schema.org",
+            "@type": "Product",
+            "name": listing["title"],
+            "description": description,
+            "offers": {"@type": "Offer", "price": f"{listing['price']:.2f}", "priceCurrency": "USD"},
+            "image": [f"/{listing['region']}/images/{listing['post_id']}_{n}.jpg" for n in range(self.PHOTOS)],
+        })
+        return f"""<!DOCTYPE html>
+<html><head><title>{title} - craigslist</title>
+<script type="application/ld+json" id="ld_posting_data">{posting_data}</script></head>
+<body class="posting"><section class="body">
+<h1 class="postingtitle"><span class="postingtitletext"><span id="titletextonly">{title}</span>
+<span class="price">${listing['price']:,}</span></span></h1>
+<section class="userbody"><div class="mapAndAttrs"><div class="attrgroup">
+<div class="attr condition"><span class="labl">condition:</span> <span class="valu"><a href="#">{listing['condition']}</a></span></div>
+<div class="attr"><span class="labl">frame material:</span> <span class="valu"><a href="#">{listing['material']}</a></span></div>
+<div class="attr"><span class="labl">frame size:</span> <span class="valu">{listing['size']}cm</span></div>
+</div></div>
+<section id="postingbody">{escape(description)}</section>
+<div class="postinginfos">
+<p class="postinginfo">post id: {listing['post_id']}</p>
+<p class="postinginfo reveal">posted: <time class="date timeago" datetime="2025-09-01T00:00:00-0700">{listing['posted']}</time></p>
+</div></section></section></body></html>"""
+
+    def _render_photo(self, listing, n):
+        from PIL import Image, ImageDraw
+        rng = random.Random(listing.get("repost_of") or listing["post_id"])
+        image = Image.new("RGB", (800, 600), tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        # The first and last photos are the same picture
+        picture = 0 if n == self.PHOTOS - 1 else n
+        shapes = random.Random(f"{listing.get('repost_of') or listing['post_id']}:{picture}")
+        for _ in range(12):
+            x, y = shapes.randrange(700), shapes.randrange(500)
+            draw.rectangle((x, y, x + shapes.randrange(40, 300), y + shapes.randrange(40, 300)),
+                           fill=tuple(shapes.randrange(256) for _ in range(3)))
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=50 if n == self.PHOTOS - 1 else 90)
+        return out.getvalue()
+
+    def handler(self, request):
+        path = urlparse(request.path).path
+        photo = re.search(r"/images/(\d+)_(\d+)\.jpg$", path)
+        if photo:
+            index, n = int(photo.group(1)) - self.FIRST_POST_ID, int(photo.group(2))
+            if not (0 <= index < len(self.listings) and n < self.PHOTOS):
+                return self.respond(request, 404, "not found", "text/plain")
+            with self.lock:
+                self.photos += 1
+            return self.respond(request, 200, self._render_photo(self.listings[index], n), "image/jpeg")
+
+        search = re.match(r"^/([^/]+)/search/", path)
+        if search:
+            page = self._search_pages.get(search.group(1))
+            if page is None:
+                return self.respond(request, 404, "not found", "text/plain")
+            with self.lock:
+                self.search_pages += 1
+            return self.respond(request, 200, page, "text/html; charset=utf-8")
+
+        match = re.search(r"/(\d+)\.html$", path)
+        index = int(match.group(1)) - self.FIRST_POST_ID if match else -1
+        if not 0 <= index < len(self.listings):
+            return self.respond(request, 404, "not found", "text/plain")
+        with self.lock:
+            self.detail_pages += 1
+        return self.respond(request, 200, self._render_detail_page(self.listings[index]), "text/html; charset=utf-8")
+
+
+class ChatCompletionsStandIn(_StandIn):
+    """
+    A `/v1/chat/completions` endpoint that scores every listing in the prompt.
+
+    Scores are derived from a checksum of the listing text, shifted by up to half
+    a point per model, so the same listing always gets the same score from a
+    model and the tiers of a cascade sometimes disagree. Replies follow the index and score schema when
+    the request asks for it and are a plain array otherwise. Each request waits
+    for `latency` seconds plus up to `jitter` seconds; a share `error_rate` of
+    requests fail with a 500 and a share `malformed_rate` of replies are cut
+    off, miss their last score or are not JSON at all.
+    """
+
+    LISTING_COUNT = re.compile(r"Below are (\d+) listings")
+
+    def __init__(self, latency=0.3, jitter=0.1, error_rate=0.0, malformed_rate=0.0, seed=0):
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.rng = random.Random(seed)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.errors = 0
+            self.malformed = 0
+            self.listings = 0
+            self.images = 0
+
+    @staticmethod
+    def _text(content):
+        """The listings text of a message, a string or the first text part of a list of parts."""
+        if isinstance(content, str):
+            return content
+        return next((part.get("text", "") for part in content if part.get("type") == "text"), "")
+
+    def _garble(self, content, scores, structured):
+        kind = self.rng.choice(("truncated", "short", "prose"))
+        if kind == "truncated":
+            return content[:len(content) * 2 // 3]
+        if kind == "short" and len(scores) > 1:
+            scores = scores[:-1]
+            return json.dumps({"scores": scores} if structured else [entry["score"] for entry in scores])
+        return "Sorry, I can only score these listings one at a time."
+
+    def handler(self, request):
+        payload = json.loads(self.read_body(request) or b"{}")
+        with self.lock:
+            self.requests += 1
+            delay = self.latency + self.rng.uniform(0, self.jitter)
+            fail = self.rng.random() < self.error_rate
+            garble = self.rng.random() < self.malformed_rate
+        time.sleep(delay)
+
+        if fail:
+            with self.lock:
+                self.errors += 1
+            return self.respond(request, 500, json.dumps({"error": {"message": "injected failure", "type": "server_error"}}))
+
+        prompt = self._text(payload["messages"][-1]["content"])
+        match = self.LISTING_COUNT.search(prompt)
+        count = int(match.group(1)) if match else 0
+        # Drop the "Listing N" header so a listing scores the same at any position
+        blocks = [block.partition("\n")[2] for block in prompt.split("\n\nListing ")[1:]]
+        model = payload.get("model", "standin")
+        scores = [
+            {"index": index + 1, "score": min(5.0, max(1.0,
+                1 + zlib.crc32(block.encode("utf-8")) % 5
+                + (zlib.crc32(f"{model}\n{block}".encode("utf-8")) % 11 - 5) / 10))}
+            for index, block in enumerate(blocks[:count])
+        ]
+        structured = payload.get("response_format", {}).get("type") == "json_schema"
+        content = json.dumps({"scores": scores} if structured else [entry["score"] for entry in scores])
+        if garble:
+            content = self._garble(content, scores, structured)
+        with self.lock:
+            self.listings += count
+            self.malformed += garble
+
+        images = sum(
+            1 for message in payload["messages"] if not isinstance(message["content"], str)
+            for part in message["content"] if part.get("type") == "image_url"
+        )
+        with self.lock:
+            self.images += images
+        # Low detail images are billed at a flat 85 tokens
+        prompt_tokens = sum(len(self._text(message["content"])) for message in payload["messages"]) // 4 + 85 * images
+        self.respond(request, 200, json.dumps({
+            "id": f"chatcmpl-standin-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + 2 * len(scores) + 2,
+            },
+        }))
+
+
+class TwilioStandIn(_StandIn):
+    """Accepts `Messages.json` create requests and keeps the message bodies."""
+
+    def __init__(self):
+        super().__init__()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.messages = []
+
+    def handler(self, request):
+        body = self.read_body(request).decode("utf-8")
+        with self.lock:
+            self.messages.append(body)
+            sid = f"SM{len(self.messages):032d}"
+        self.respond(request, 201, json.dumps({"sid": sid, "status": "queued"}))
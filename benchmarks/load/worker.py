@@ -0,0 +1,128 @@
+"""
+One load benchmark run: the real Engine against already running stand-ins.
+
+Started in its own process by `python -m benchmarks.load` (Scrapy's reactor
+cannot be restarted, and peak RSS is per process). Expects to be run from a
+scratch directory, so logs/ and data/ land there, with SCRAPY_SETTINGS_MODULE
+pointing at benchmarks.load.settings. Prints one JSON line of measurements.
+With more than one worker the engine runs distributed; peak RSS is then the
+largest of the coordinator and its crawl workers.
+"""
+import argparse
+import json
+import resource
+import time
+import yaml
+from pathlib import Path
+from twilio.http.http_client import TwilioHttpClient
+
+REPO_CONFIG = Path(__file__).resolve().parents[2] / "config.yaml"
+TWILIO_API = "https://api.twilio.com"
+
+
+class TwilioStandInHttpClient(TwilioHttpClient):
+    """Sends every Twilio API request to the stand-in instead of api.twilio.com."""
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, url, *args, **kwargs):
+        if url.startswith(TWILIO_API):
+            url = self.base_url + url[len(TWILIO_API):]
+        return super().request(method, url, *args, **kwargs)
+
+
+def write_config(path, listings, craigslist_url, regions, images=False):
+    with open(REPO_CONFIG) as f:
+        config = yaml.safe_load(f)
+    config.update({
+        "listing_count_limit": listings,
+        "craigslist_base_url": f"{craigslist_url}/{{region}}",
+        "seen_store_path": "data/seen.sqlite3",
+        "llm_cache_path": "data/llm_cache.sqlite3",
+        "http_cache_offline": False,
+        "image_stage_enabled": images,
+        "image_cache_path": "data/images.sqlite3",
+        "job_queue_path": "data/jobs.sqlite3",
+        "searches": [dict(search, regions=regions) for search in config["searches"]],
+    })
+    with open(path, "w") as f:
+        yaml.safe_dump(config, f)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listings", type=int, required=True)
+    parser.add_argument("--craigslist-url", required=True)
+    parser.add_argument("--twilio-url", required=True)
+    parser.add_argument("--regions", default="sfbay")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--images", action="store_true")
+    args = parser.parse_args()
+
+    write_config("config.yaml", args.listings, args.craigslist_url, args.regions.split(","), images=args.images)
+    from utilities.config import Config
+    Config("config.yaml")
+
+    from engine.engine import Engine
+    from messager.message_client import MessageClient
+    engine = Engine()
+    MessageClient().transport.client.http_client = TwilioStandInHttpClient(args.twilio_url)
+
+    # Time every request to the chat completions endpoint, retries included
+    latencies = []
+    completions = engine.llm_client.client.chat.completions
+    create = completions.create
+
+    async def timed_create(*a, **kw):
+        began = time.perf_counter()
+        try:
+            return await create(*a, **kw)
+        finally:
+            latencies.append(time.perf_counter() - began)
+
+    completions.create = timed_create
+
+    scored = []
+    pipeline_out = engine.llm_client.pipeline_out
+
+    def counting_pipeline_out(results, search):
+        scored.extend(results)
+        return pipeline_out(results, search=search)
+
+    engine.llm_client.pipeline_out = counting_pipeline_out
+
+    began = time.perf_counter()
+    stats = engine.run(workers=args.workers)
+    elapsed = time.perf_counter() - began
+    if args.workers > 1:
+        # Scored in the worker processes, whose clients are not timed
+        scored = [None] * stats["results"]
+
+    print(json.dumps({
+        "listings": args.listings,
+        "elapsed": elapsed,
+        "scored": len(scored),
+        "listings_per_sec": len(scored) / elapsed if elapsed else 0.0,
+        "llm_requests": len(latencies),
+        "llm_p50": percentile(latencies, 0.50),
+        "llm_p99": percentile(latencies, 0.99),
+        "llm_recovery": engine.llm_client.recovery_metrics,
+        "llm_tiers": {tier.name: tier.stats for tier in engine.llm_client.tiers},
+        "prompt_images": {key: engine.llm_client.prompt_metrics.get(key, 0) for key in ("images", "image_bytes")},
+        "peak_rss_kib": max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss),
+        "distributed": stats if args.workers > 1 else None,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Micro-benchmark for utilities.logger.Logger.
+
+Logs a growing number of entries and reports the mean cost per call for each
+window. With the append-only JSONL writer the per-call cost should stay flat
+as the log file grows.
+
+Usage:
+    python -m benchmarks.logger_bench [--entries 50000] [--window 5000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from utilities.logger import Logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--window", type=int, default=5000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="logger_bench_")
+    Logger._log_file = os.path.join(tmp_dir, "logs.jsonl")
+    Logger._echo = False
+    Logger._max_bytes = 0
+    Logger._queue_size = args.entries + 1
+
+    context = {"url": "https://sfbay.craigslist.org/sfc/bik/d/road-bike/7890123456.html", "count": 10}
+    print(f"{'entries':>10} {'us/call':>10}")
+    for start in range(0, args.entries, args.window):
+        began = time.perf_counter()
+        for i in range(args.window):
+            Logger.log("Parsing detail page", component="BENCH", context=context)
+        elapsed = time.perf_counter() - began
+        print(f"{start + args.window:>10} {elapsed / args.window * 1e6:>10.2f}")
+
+    began = time.perf_counter()
+    Logger.flush(timeout=None)
+    print(f"final flush: {(time.perf_counter() - began) * 1000:.1f} ms, "
+          f"file size: {os.path.getsize(Logger._log_file) / 1024:.0f} KiB, dropped: {Logger.dropped}")
+    Logger.shutdown()
+
+
+if __name__ == "__main__":
+    main()
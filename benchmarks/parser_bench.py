@@ -0,0 +1,184 @@
+"""
+Benchmark for the Craigslist detail-page extractor.
+
+Runs the legacy per-field CSS extraction (kept here for reference) and the
+single-pass `extract_listing` over the saved pages in benchmarks/fixtures,
+checks that both produce the same fields for every page, and reports pages/sec
+and peak traced allocation per page for each. Pages are parsed once up front,
+so only extraction is timed.
+
+Exits with status 1 if any field differs between the two extractors.
+
+Usage:
+    python -m benchmarks.parser_bench [--iterations 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from pathlib import Path
+from scrapy.http import HtmlResponse
+from scraper.scraper.extractor import ListingRecord, extract_listing
+from utilities.logger import Logger
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def legacy_extract_listing(response) -> ListingRecord:
+    """The per-field CSS extraction `CraigslistSpider.parse_detail_page` used before the single-pass extractor."""
+    record = ListingRecord()
+    posting_data_script = response.css('script#ld_posting_data::text').get()
+    if posting_data_script:
+        try:
+            posting_data = json.loads(posting_data_script.strip())
+            record.title = posting_data.get("name", "Title Not Found")
+            record.content = posting_data.get("description", "Content Not Found")
+            record.price = posting_data.get("offers", {}).get("price", "Price Not Found")
+        except (json.JSONDecodeError, AttributeError) as e:
+            Logger.warning(f"Failed to parse JSON-LD data: {e}", component="SPIDER")
+            record.title = _legacy_title(response)
+            record.content = _legacy_content(response)
+    else:
+        record.title = _legacy_title(response)
+        record.content = _legacy_content(response)
+
+    record.post_id = _legacy_post_id(response)
+    record.attribute_group = _legacy_attributes(response)
+    record.updated_at = _legacy_updated_timestamp(response)
+    return record
+
+
+def _legacy_title(response):
+    title_element = response.css('h1.postingtitle span#titletextonly::text').get()
+    return title_element.strip() if title_element else "Title Not Found"
+
+
+def _legacy_content(response):
+    content_elements = response.css('section#postingbody::text').getall()
+    if content_elements:
+        content = " ".join(text.strip() for text in content_elements if text.strip())
+        return content.strip() if content else "Content Not Found"
+    return "Content Not Found"
+
+
+def _legacy_post_id(response):
+    post_id_text = response.css('div.postinginfos p.postinginfo::text').get()
+    if not post_id_text:
+        Logger.warning("Post ID element not found", component="SPIDER")
+        return None
+    colon_index = post_id_text.find(':')
+    if colon_index == -1:
+        Logger.warning(f"Post ID format unexpected: {post_id_text}", component="SPIDER")
+        return None
+    id_part = post_id_text[colon_index + 2:].strip()
+    try:
+        return int(id_part)
+    except ValueError as e:
+        Logger.warning(f"Failed to convert post ID to integer: {e}", component="SPIDER")
+        return None
+
+
+def _legacy_updated_timestamp(response):
+    timestamp_elements = response.css('div.postinginfos p.postinginfo.reveal time.date.timeago::text').getall()
+    if len(timestamp_elements) > 1:
+        return timestamp_elements[1]
+    elif len(timestamp_elements) == 1:
+        return timestamp_elements[0]
+    Logger.warning("No timestamp elements found", component="SPIDER")
+    return None
+
+
+def _legacy_attributes(response):
+    attrs = {}
+    for row in response.css("div.attrgroup div.attr"):
+        key = row.css("span.labl::text").get()
+        value = row.css('span.valu a::text').get()
+        if value is None:
+            value = row.css("span.valu::text").getall()
+            value = " ".join(v.strip() for v in value)
+        else:
+            value = value.strip()
+        if key and value:
+            attrs[key.strip().rstrip(":")] = value
+    return attrs
+
+
+def load_fixtures():
+    responses = []
+    for path in sorted(FIXTURES_DIR.glob("*.html")):
+        response = HtmlResponse(
+            url=f"https://sfbay.craigslist.org/sfc/bik/d/{path.stem}/7780000000.html",
+            body=path.read_bytes(),
+            encoding="utf-8",
+        )
+        response.selector  # parse up front so only extraction is measured
+        responses.append((path.name, response))
+    return responses
+
+
+def check_equality(responses):
+    mismatches = 0
+    for name, response in responses:
+        legacy = asdict(legacy_extract_listing(response))
+        current = asdict(extract_listing(response))
+        for field_name, legacy_value in legacy.items():
+            # The legacy extractor never read photos
+            if field_name == "images":
+                continue
+            if current[field_name] != legacy_value:
+                mismatches += 1
+                print(f"MISMATCH {name} {field_name}: legacy={legacy_value!r} new={current[field_name]!r}")
+    return mismatches
+
+
+def measure(extract, responses, iterations):
+    began = time.perf_counter()
+    for _ in range(iterations):
+        for _, response in responses:
+            extract(response)
+    elapsed = time.perf_counter() - began
+
+    tracemalloc.start()
+    peaks = []
+    for _, response in responses:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        extract(response)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    pages = iterations * len(responses)
+    return pages / elapsed, sum(peaks) / len(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="parser_bench_")
+    Logger._log_file = os.path.join(tmp_dir, "logs.jsonl")
+    Logger._echo = False
+
+    responses = load_fixtures()
+    mismatches = check_equality(responses)
+    print(f"fixtures: {len(responses)}, field mismatches: {mismatches}")
+
+    print(f"{'extractor':>12} {'pages/sec':>12} {'peak KiB/page':>14}")
+    results = {}
+    for label, extract in (("legacy", legacy_extract_listing), ("single-pass", extract_listing)):
+        pages_per_sec, peak_bytes = measure(extract, responses, args.iterations)
+        results[label] = pages_per_sec
+        print(f"{label:>12} {pages_per_sec:>12.0f} {peak_bytes / 1024:>14.1f}")
+    print(f"speedup: {results['single-pass'] / results['legacy']:.2f}x")
+
+    Logger.shutdown()
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Cold start profile for main.py.
+
+Starts fresh interpreters that import `main` and build the `Engine`, the work
+every run does before crawling, and reports:
+
+- wall time for the import and for Engine(), as the median of --repeat runs
+- the slowest modules by cumulative import time (from `python -X importtime`)
+- whether Scrapy, the OpenAI SDK, Twilio or NumPy were loaded, which they
+  should not be until a crawl, an LLM request, a message or the pre-ranker and
+  duplicate filter actually need them
+
+Exits with status 1 if the median startup exceeds --budget-ms (plus the
+--tolerance fraction of it, for noisy shared machines) or one of those packages
+was imported eagerly, so it can guard against startup regressions. CI runs it
+on every push (.github/workflows/startup.yml).
+
+Usage:
+    python -m benchmarks.startup_profile [--repeat 5] [--top 15] [--budget-ms 400] [--tolerance 0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFERRED_PACKAGES = ("scrapy", "twisted", "openai", "httpx", "twilio", "numpy")
+
+STARTUP_SCRIPT = """
+import json, sys, time
+began = time.perf_counter()
+import main
+imported = time.perf_counter()
+from engine.engine import Engine
+Engine()
+built = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - began) * 1000,
+    "engine_ms": (built - imported) * 1000,
+    "loaded": sorted({name.split(".")[0] for name in sys.modules}),
+}))
+"""
+
+
+def run_startup(env, workdir, importtime=False):
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", STARTUP_SCRIPT]
+    completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        sys.stderr.write(completed.stderr[-4000:])
+        raise RuntimeError("Startup script failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def parse_importtime(stderr):
+    """Map every imported module to its (self, cumulative) import time in microseconds."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=400.0, help="allowed median of import + Engine() time")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="fraction of the budget allowed on top of it")
+    args = parser.parse_args()
+
+    # Engine() opens its SQLite stores relative to the working directory
+    workdir = tempfile.mkdtemp(prefix="startup_profile_")
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])),
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "startup-profile"),
+        LOG_ECHO="0",
+    )
+
+    runs = [run_startup(env, workdir)[0] for _ in range(args.repeat)]
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    engine_ms = statistics.median(run["engine_ms"] for run in runs)
+    total_ms = statistics.median(run["import_ms"] + run["engine_ms"] for run in runs)
+    print(f"import main: {import_ms:.1f} ms, Engine(): {engine_ms:.1f} ms, total: {total_ms:.1f} ms "
+          f"(median of {args.repeat}, budget {args.budget_ms:.0f} ms)")
+
+    result, stderr = run_startup(env, workdir, importtime=True)
+    modules = parse_importtime(stderr)
+    print(f"\n{'module':<50} {'self ms':>9} {'cumul ms':>9}")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"{name:<50} {self_us / 1000:>9.1f} {cumulative_us / 1000:>9.1f}")
+
+    eager = [package for package in DEFERRED_PACKAGES if package in result["loaded"]]
+    print(f"\neagerly imported: {', '.join(eager) or 'none'}")
+
+    failed = False
+    limit_ms = args.budget_ms * (1 + args.tolerance)
+    if total_ms > limit_ms:
+        print(f"FAIL: startup {total_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget "
+              f"(limit {limit_ms:.0f} ms with tolerance)")
+        failed = True
+    if eager:
+        print(f"FAIL: {', '.join(eager)} should only be imported when first needed")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
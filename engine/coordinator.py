@@ -0,0 +1,135 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict
+from engine.worker import worker_path
+from storage.job_queue import JobQueue
+from utilities.config import Config
+from utilities.logger import Logger
+from utilities.metrics import Metrics
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+class Coordinator:
+    """
+    Spreads one engine run over several crawl worker processes.
+
+    Every (search, region) pair becomes a job in a local SQLite `JobQueue`;
+    `workers` processes (`engine.worker`) claim jobs until the queue is empty,
+    each running the spider and the LLM pipeline in its own reactor and core.
+    A worker that exits with an error has its running job handed back, up to
+    `max_attempts` tries per job, and is replaced while jobs are left.
+
+    Every job is stamped with the run's start, and a worker's duplicate
+    filter only matches listings indexed before it or by the same job, so
+    what is dropped does not depend on which worker crawled a region first.
+
+    When every worker is done, each search's results from all regions are
+    merged into the engine's ranking, best first, where a cross-post (the
+    same listing posted to several regions) is ranked only once.
+
+    Args:
+        engine: The coordinating engine, which ranks and sends the alerts
+        workers: Number of worker processes
+        queue_path: Job queue database (default = job_queue_path from config)
+        max_attempts: Tries per job before it is given up
+        poll_interval: Seconds between checks on the worker processes
+    """
+
+    def __init__(self, engine, workers: int, queue_path: str = None, max_attempts: int = 2, poll_interval: float = 0.2):
+        self.engine = engine
+        self.workers = workers
+        self.queue_path = queue_path or Config.get('job_queue_path', 'data/jobs.sqlite3')
+        self.queue = JobQueue(self.queue_path)
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Crawl every search in every region across the workers and rank the results.
+
+        Returns:
+            Job counts and the summed Scrapy stats of the run's jobs
+        """
+        config = Config.current()
+        run_id = f"{int(time.time())}-{os.getpid()}"
+        jobs = [(search.name, region) for search in config.searches for region in search.regions]
+        self.queue.enqueue(run_id, jobs)
+        workers = min(self.workers, len(jobs))
+        Logger.log("Starting distributed run", component="COORDINATOR", context={"run": run_id, "jobs": len(jobs), "workers": workers})
+
+        with Metrics.span("coordinator_crawl_seconds"):
+            self._supervise(run_id, workers)
+
+        results_by_search = self.queue.results(run_id)
+        for search, results in results_by_search.items():
+            # Ties go in url order, so they are ranked the same whichever worker finished first
+            self.engine.insert_to_buffer(sorted(set(results), key=lambda result: (-result[0], result[1])), search=search)
+
+        stats = {
+            "run": run_id,
+            "workers": workers,
+            "jobs": self.queue.counts(run_id),
+            "results": sum(len(results) for results in results_by_search.values()),
+            "cross_posts_collapsed": self.engine.cross_posts_collapsed,
+        }
+        for job in self.queue.jobs(run_id):
+            for key, value in job["stats"].items():
+                if isinstance(value, (int, float)):
+                    stats[key] = stats.get(key, 0) + value
+        Logger.log("Distributed run finished", component="COORDINATOR", context=stats)
+        return stats
+
+    def _spawn(self, run_id: str, worker_id: str) -> subprocess.Popen:
+        env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_ROOT), os.environ.get("PYTHONPATH")])),
+            # Each worker starts its own log, which would otherwise clear this process's
+            LOG_FILE=worker_path(Logger._log_file, worker_id),
+        )
+        command = [
+            sys.executable, "-m", "engine.worker",
+            "--queue", self.queue_path,
+            "--run-id", run_id,
+            "--worker-id", worker_id,
+            "--config", str(Config().path),
+        ]
+        return subprocess.Popen(command, env=env)
+
+    def _supervise(self, run_id: str, workers: int) -> None:
+        """Keep up to `workers` processes running while the run has jobs left."""
+        processes = {str(i): self._spawn(run_id, str(i)) for i in range(workers)}
+        spawned, failures = workers, 0
+        while processes:
+            time.sleep(self.poll_interval)
+            for worker_id, process in list(processes.items()):
+                code = process.poll()
+                if code is None:
+                    continue
+                del processes[worker_id]
+                if code != 0:
+                    failures += 1
+                    released = self.queue.release(run_id, worker_id, self.max_attempts)
+                    Metrics.inc("crawl_worker_failures_total")
+                    Logger.warning("Crawl worker exited with an error", component="COORDINATOR", context={
+                        "worker": worker_id,
+                        "code": code,
+                        "jobs_released": released,
+                    })
+            # Workers that crash before claiming anything would otherwise be replaced forever
+            if (self.queue.counts(run_id).get("pending") and len(processes) < workers
+                    and failures < workers * self.max_attempts):
+                worker_id = str(spawned)
+                spawned += 1
+                processes[worker_id] = self._spawn(run_id, worker_id)
+
+        pending = self.queue.counts(run_id).get("pending", 0)
+        if pending:
+            Logger.error("Crawl workers kept failing, jobs left undone", component="COORDINATOR", context={
+                "run": run_id,
+                "pending": pending,
+                "failures": failures,
+            })
@@ -1,11 +1,11 @@
-from typing import List
-from scrapy.crawler import CrawlerProcess
-from scrapy.utils.project import get_project_settings
-from scraper.scraper.spiders.craigslistspider import CraigslistSpider
+from typing import List, Optional
+from engine.ranking import TopKRanking
 from utilities.config import Config
 from utilities.logger import Logger
-from messager.message_client import MessageClient
+from utilities.metrics import Metrics
+from messager.outbox import NotificationOutbox
 from llm.client import ListingEvaluatorLLMClient
+from storage.seen_store import SeenStore
 
 class Engine:
     _instance = None
@@ -19,48 +19,246 @@ class Engine:
     def __init__(self):
         if not self._initialized:
             Engine._initialized = True
-            self.buffer = []
+            self._reset_rankings()
+            self.pipeline_state = None
+            self.seen_store = SeenStore()
+            self.outbox = NotificationOutbox(seen_store=self.seen_store)
             try: 
                 self.llm_client = ListingEvaluatorLLMClient(pipeline_out=self.insert_to_buffer)
             except Exception as e:
                 Logger.error(f"Could not create Listing Evaluator LLM Client: {e}")
                 raise e
 
+    # Scrapy and Twisted are imported inside the methods that crawl, so building
+    # the engine (and a run that fails early) does not pay for them
+
+    def _scraper_settings(self):
+        from scrapy.utils.project import get_project_settings
+        settings = get_project_settings()
+        if Config.get('http_cache_offline', False):
+            settings.update({
+                "CRAIGSLIST_HTTPCACHE_OFFLINE": True,
+                "HTTPCACHE_IGNORE_MISSING": True,
+            })
+        return settings
+
     def _run_scraper(self):
+        from scrapy.crawler import CrawlerProcess
+        from scraper.scraper.spiders.craigslistspider import CraigslistSpider
         Logger.log("Starting scraping process", component="ENGINE")
-        settings = get_project_settings()
-        settings.update({
-            "FEEDS": {
-                "logs/scraped.json": {
-                    "format": "json",
-                    "overwrite": True,
-                }
-            }
-        })
-
-        process = CrawlerProcess(settings)
+        process = CrawlerProcess(self._scraper_settings())
         process.crawl(
             CraigslistSpider,
-            llm_client=self.llm_client
+            llm_client=self.llm_client,
+            searches=Config.current().searches,
         )
         process.start()
 
-    def run(self):
+    def run(self, workers: Optional[int] = None):
+        """
+        Run once. The Twisted reactor cannot be restarted, so this can only be called once.
+
+        Args:
+            workers: Crawl worker processes (default = crawl_workers from config);
+                with more than one the run is distributed by `run_distributed`
+        """
+        workers = workers or Config.get('crawl_workers', 1)
+        if workers > 1:
+            return self.run_distributed(workers)
         Logger.log("Starting entire engine process", component="ENGINE")
-        self._run_scraper()
-        self._final_processing()
+        self._start_run()
+        try:
+            with Metrics.span("engine_stage_seconds", {"stage": "scrape"}):
+                self._run_scraper()
+            with Metrics.span("engine_stage_seconds", {"stage": "final_processing"}):
+                self._final_processing()
+        finally:
+            self._dump_metrics()
+
+    async def run_on_reactor(self, workers: Optional[int] = None) -> dict:
+        """
+        Run once on an already running reactor, for long-lived processes.
+
+        The LLM client's connection pool, the config snapshot, the message
+        transport and the pipelines' indexes and stores all stay warm between
+        runs. Must be driven by Twisted (`Deferred.fromCoroutine`), since it
+        awaits Deferreds. A distributed run waits on its workers in a thread.
+
+        Returns:
+            The Scrapy stats of the crawl
+        """
+        from scrapy.crawler import CrawlerRunner
+        from twisted.internet import threads
+        from scraper.scraper.pipeline_state import PipelineState
+        from scraper.scraper.spiders.craigslistspider import CraigslistSpider
+        workers = workers or Config.get('crawl_workers', 1)
+        if workers > 1:
+            return await threads.deferToThread(self.run_distributed, workers)
+        Logger.log("Starting engine run on running reactor", component="ENGINE")
+        self._start_run()
+        if self.pipeline_state is None:
+            self.pipeline_state = PipelineState()
+        runner = CrawlerRunner(self._scraper_settings())
+        crawler = runner.create_crawler(CraigslistSpider)
+        try:
+            with Metrics.span("engine_stage_seconds", {"stage": "scrape"}):
+                try:
+                    await runner.crawl(
+                        crawler,
+                        llm_client=self.llm_client,
+                        searches=Config.current().searches,
+                        pipeline_state=self.pipeline_state,
+                    )
+                finally:
+                    self.pipeline_state.close()
+            with Metrics.span("engine_stage_seconds", {"stage": "final_processing"}):
+                # Waits on message sends, so keep it off the reactor thread
+                await threads.deferToThread(self._final_processing)
+        finally:
+            self._dump_metrics()
+        return crawler.stats.get_stats() if crawler.stats else {}
+
+    def run_distributed(self, workers: int) -> dict:
+        """
+        Run once with the crawl spread over `workers` processes, one job per search and region.
+
+        This process only coordinates: it ranks the workers' results across all
+        regions and sends the alerts.
+
+        Returns:
+            Job counts and the summed Scrapy stats of the run's jobs
+        """
+        from engine.coordinator import Coordinator
+        Logger.log("Starting distributed engine run", component="ENGINE", context={"workers": workers})
+        self._start_run()
+        try:
+            with Metrics.span("engine_stage_seconds", {"stage": "scrape"}):
+                stats = Coordinator(self, workers).run()
+            with Metrics.span("engine_stage_seconds", {"stage": "final_processing"}):
+                self._final_processing()
+        finally:
+            self._dump_metrics()
+        return stats
+
+    def _start_run(self):
+        Config.refresh()
+        Metrics.reset()
+        self._reset_rankings()
+
+    def _dump_metrics(self):
+        """Write this run's timings and counters as a JSON summary and in Prometheus text format."""
+        config = Config.current()
+        summary = Metrics.dump(
+            json_path=config.get('metrics_json_path', 'logs/metrics.json'),
+            prometheus_path=config.get('metrics_prometheus_path', 'logs/metrics.prom'),
+        )
+        stages = {
+            entry["labels"]["stage"]: entry["sum"]
+            for entry in summary["histograms"].get("engine_stage_seconds", [])
+        }
+        Logger.log("Run metrics written", component="ENGINE", context={"duration": summary["duration"], "stages": stages})
+
+    def _reset_rankings(self):
+        """Start an empty top-k ranking for every configured search."""
+        config = Config.current()
+        self.rankings = {
+            search.name: TopKRanking(search.top_k, on_evict=lambda url, name=search.name: self._unrank(name, url))
+            for search in config.searches
+        }
+        self.eager_sent = set()
+        # Listings sent early per search, so the cap is checked without scanning eager_sent
+        self.eager_counts = {search.name: 0 for search in config.searches}
+        self.cross_posts_collapsed = 0
+        self.duplicate_index = None
+        # Fingerprints and scores of the listings currently in each top k, to spot cross-posts
+        self.ranked = {}
+        if config.get('dedupe_enabled', False):
+            from storage.duplicate_index import DuplicateIndex, NearDuplicateSet
+            self.duplicate_index = DuplicateIndex(
+                config.get('dedupe_index_path', 'data/duplicates.sqlite3'),
+                max_distance=config.get('dedupe_max_distance', 3),
+                price_tolerance=config.get('dedupe_price_tolerance', 0.1),
+            )
+            self.ranked = {search.name: NearDuplicateSet(self.duplicate_index) for search in config.searches}
+
+    def insert_to_buffer(self, results: List[tuple], search: str):
+        """
+        Feed a batch of (score, url) results into the running top-k ranking of its search.
+
+        With `eager_alerts` enabled, a listing is sent immediately when it is
+        certain to make the final top k: its score is the maximum possible, so
+        it can only be tied, and fewer than top_k listings were sent early.
+
+        With `dedupe_enabled`, a cross-post (a near-duplicate of a listing
+        already ranked, typically the same post in another region) is ranked
+        only once, with the better score. The duplicate filter leaves these
+        copies to the ranking, as which region's copy it would have kept
+        would depend on how the crawl was scheduled.
+        """
+        Logger.log(f"Adding ranked results to engine buffer, size: {len(results)}", component="ENGINE", context={"search": search})
+        self.seen_store.record_scores(results, search)
+        config = Config.current()
+        search_config = config.search(search)
+        ranking = self.rankings[search]
+        eager = config.get('eager_alerts', False)
+        max_score = config.get('max_score', 5.0)
+
+        for score, url in results:
+            if self.seen_store.was_notified(url):
+                continue
+            entry = self.duplicate_index.lookup(url, search) if search in self.ranked else None
+            if entry is not None and self._collapse_cross_post(score, url, search, entry):
+                continue
+            in_top_k = ranking.push(score, url)
+            if in_top_k and entry is not None:
+                self.ranked[search].add(url, dict(entry, score=score))
+            if (eager and in_top_k and score >= max_score and score >= search_config.threshold
+                    and self.eager_counts[search] < ranking.k and (search, url) not in self.eager_sent):
+                # Sent on the outbox's threads, so the crawl is never blocked on the message API
+                self.outbox.send_now(score, url, search)
+                self.eager_sent.add((search, url))
+                self.eager_counts[search] += 1
+
+    def _collapse_cross_post(self, score: float, url: str, search: str, entry: dict) -> bool:
+        """
+        Keep only the best of a listing's copies in the ranking.
+
+        Only listings currently in the top k are compared, through a set
+        indexed by canonical url and SimHash band. A listing pushed out of the
+        top k is forgotten: a copy scoring no better could not get in either.
+
+        Returns:
+            True if `url` is a worse copy of a ranked listing and must not be ranked
+        """
+        ranked = self.ranked[search]
+        other_url = ranked.find(entry)
+        if other_url is not None and other_url != url:
+            self.cross_posts_collapsed += 1
+            Metrics.inc("cross_posts_collapsed_total")
+            other_score = ranked.get(other_url)["score"]
+            # Ties go to the smaller url, so the copy kept does not depend on arrival order
+            if (search, other_url) in self.eager_sent or (other_score, url) >= (score, other_url):
+                return True
+            self.rankings[search].discard(other_url)
+            ranked.remove(other_url)
+        return False
 
-    def insert_to_buffer(self, list: List[tuple]):
-        Logger.log(f"Adding ranked results to engine buffer, size: {len(list)}", component="ENGINE")
-        self.buffer.extend(list)
+    def _unrank(self, search: str, url: str):
+        """Forget the fingerprint of a listing that left the top k."""
+        ranked = self.ranked.get(search)
+        if ranked is not None:
+            ranked.remove(url)
 
     def _final_processing(self):
-        self.buffer.sort(key=lambda x: x[0], reverse=True)
-        Logger.log(f"Buffer sorted: {self.buffer}", component="ENGINE")
-        for listing in self.buffer[:Config.get('top_k')]:
-            if listing[0] >= Config.get('threshold'):
-                msg = f"{listing[1]}"
-                MessageClient.send(msg)
-                Logger.log(f"Sending text for [{msg}] with score of [{listing[0]}]", component="ENGINE")
-            else:
-                break
+        """Queue every search's winners above its threshold and send them through the outbox."""
+        config = Config.current()
+        for search, ranking in self.rankings.items():
+            results = ranking.results()
+            Logger.log(f"Final ranking: {results}", component="ENGINE", context={"search": search})
+            threshold = config.search(search).threshold
+            for score, url in results:
+                if score < threshold:
+                    break
+                if (search, url) not in self.eager_sent:
+                    self.outbox.add(score, url, search)
+        self.outbox.flush()
@@ -0,0 +1,57 @@
+import heapq
+import itertools
+from typing import Callable, List, Optional, Tuple
+
+
+class TopKRanking:
+    """
+    Bounded min-heap holding the best `k` (score, url) results seen so far.
+
+    Results are fed in incrementally as LLM batches complete, so each insert
+    costs O(log k) and memory stays at k entries no matter how many listings a
+    crawl produces. Ties are broken by arrival order: an earlier result always
+    outranks a later one with the same score.
+
+    Args:
+        k: Number of results kept
+        on_evict: Called with the url of a result pushed out of the top k
+    """
+
+    def __init__(self, k: int, on_evict: Optional[Callable[[str], None]] = None):
+        self.k = k
+        self.on_evict = on_evict
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, score: float, url: str) -> bool:
+        """
+        Offer a result to the ranking.
+
+        Returns:
+            True if the result is currently in the top k
+        """
+        # Negated sequence number so that among equal scores the newest entry is evicted first
+        entry = (score, -next(self._counter), url)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry <= self._heap[0]:
+            return False
+        evicted = heapq.heapreplace(self._heap, entry)
+        if self.on_evict:
+            self.on_evict(evicted[2])
+        return True
+
+    def discard(self, url: str) -> None:
+        """Remove a result from the ranking, if it is in it."""
+        heap = [entry for entry in self._heap if entry[2] != url]
+        if len(heap) != len(self._heap):
+            heapq.heapify(heap)
+            self._heap = heap
+
+    def results(self) -> List[Tuple[float, str]]:
+        """Current top k as (score, url) tuples, best first."""
+        return [(score, url) for score, _, url in sorted(self._heap, reverse=True)]
@@ -0,0 +1,98 @@
+import time
+from collections import deque
+from typing import Optional
+from scrapy.utils.log import configure_logging
+from scrapy.utils.project import get_project_settings
+from scrapy.utils.reactor import install_reactor
+from utilities.config import Config
+from utilities.logger import Logger
+
+# Scrapy stats worth reporting for every run
+RUN_STATS = (
+    "item_scraped_count",
+    "downloader/request_count",
+    "httpcache/hit",
+    "llm_batch/count",
+    "finish_reason",
+)
+
+
+class Scheduler:
+    """
+    Runs the engine every `interval` seconds inside one long-lived process.
+
+    All crawls share a single Twisted reactor through `CrawlerRunner`, so the
+    modules, the LLM connection pool, the config snapshot and the message
+    transport are set up once instead of on every run. A run that is still
+    going when the next one is due is not overlapped: the tick is skipped and
+    counted. Each finished run logs its duration and key stats, and the last
+    `history_size` reports are kept in `history`.
+
+    Args:
+        engine: The engine to run
+        interval: Seconds between the starts of consecutive runs (default =
+            schedule_interval_minutes from config)
+        history_size: Number of run reports to keep
+        workers: Crawl worker processes per run (default = crawl_workers from config)
+    """
+
+    def __init__(self, engine, interval: Optional[float] = None, history_size: int = 50, workers: Optional[int] = None):
+        self.engine = engine
+        self.workers = workers
+        self.interval = interval or Config.get('schedule_interval_minutes', 120) * 60
+        self.history = deque(maxlen=history_size)
+        self.runs = 0
+        self.skipped = 0
+        self._current = None
+        self._loop = None
+
+    def start(self):
+        """Start the reactor and block until the process is asked to stop."""
+        settings = get_project_settings()
+        install_reactor(settings["TWISTED_REACTOR"])
+        configure_logging(settings)
+        from twisted.internet import reactor, task
+
+        self._loop = task.LoopingCall(self._tick)
+        self._loop.start(self.interval, now=True)
+        # Let an in-flight run finish (and send its alerts) before shutting down
+        reactor.addSystemEventTrigger("before", "shutdown", self.stop)
+        Logger.log("Scheduler started", component="SCHEDULER", context={"interval": self.interval})
+        reactor.run()
+
+    def stop(self):
+        if self._loop is not None and self._loop.running:
+            self._loop.stop()
+        Logger.log("Scheduler stopping", component="SCHEDULER", context={"runs": self.runs, "skipped": self.skipped})
+        return self._current
+
+    def _tick(self):
+        from twisted.internet.defer import Deferred
+        if self._current is not None:
+            self.skipped += 1
+            Logger.warning("Previous run still in progress, skipping this one", component="SCHEDULER", context={"skipped": self.skipped})
+            return
+
+        self.runs += 1
+        run = self.runs
+        started = time.monotonic()
+        self._current = Deferred.fromCoroutine(self.engine.run_on_reactor(self.workers))
+        self._current.addCallbacks(
+            lambda stats: self._report(run, started, stats),
+            lambda failure: self._report(run, started, {}, failure),
+        )
+        # Not returned, so LoopingCall keeps its own pace and a slow run shows up as skipped ticks
+
+    def _report(self, run, started, stats, failure=None):
+        self._current = None
+        report = {
+            "run": run,
+            "duration": round(time.monotonic() - started, 3),
+            "ok": failure is None,
+            **{key: stats.get(key) for key in RUN_STATS if key in stats},
+        }
+        self.history.append(report)
+        if failure is not None:
+            Logger.error(f"Scheduled run failed: {failure.getErrorMessage()}", component="SCHEDULER", context=report)
+        else:
+            Logger.log("Scheduled run finished", component="SCHEDULER", context=report)
@@ -0,0 +1,160 @@
+"""
+Crawl worker of a distributed run.
+
+Started by the Coordinator, one process per worker:
+
+    python -m engine.worker --queue data/jobs.sqlite3 --run-id RUN --worker-id 0 [--config config.yaml]
+
+Claims (search, region) jobs from the run's queue until none are left and
+runs the spider and the whole item pipeline for each one, LLM evaluation
+included. The pipelines' indexes, stores and photo pool are built once per
+worker and reused by every job. Scores go to the seen store as usual and to
+the queue, where the coordinator ranks them; a worker never sends alerts.
+"""
+import argparse
+import os
+import sys
+from dataclasses import replace
+from typing import Optional
+from utilities.config import Config
+from utilities.logger import Logger
+from utilities.metrics import Metrics
+
+# Scrapy stats kept on each finished job
+JOB_STATS = (
+    "item_scraped_count",
+    "item_dropped_count",
+    "downloader/request_count",
+    "llm_batch/count",
+    "archive/rows",
+    "finish_reason",
+)
+
+
+def worker_path(path: Optional[str], worker_id: str) -> Optional[str]:
+    """`logs/metrics.json` becomes `logs/metrics.worker-<id>.json`."""
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker-{worker_id}{ext}"
+
+
+class CrawlWorker:
+    """
+    Runs the jobs of one distributed run, one crawl per job, on a single reactor.
+
+    Every crawl shares the worker's `PipelineState`, which is closed (pre-rank
+    statistics saved, archive written) once the queue is empty.
+
+    Args:
+        engine: The worker process's engine, for its LLM client and stores
+        queue: The run's job queue
+        run_id: The run to take jobs from
+        worker_id: Name of this worker in the queue
+    """
+
+    def __init__(self, engine, queue, run_id: str, worker_id: str):
+        self.engine = engine
+        self.queue = queue
+        self.run_id = run_id
+        self.worker_id = worker_id
+        self.jobs_done = 0
+        self._job = None
+        engine.llm_client.pipeline_out = self._record
+
+    def start(self) -> int:
+        """Run jobs until the queue is empty. Returns the process exit code."""
+        from scrapy.utils.log import configure_logging
+        from scrapy.utils.project import get_project_settings
+        from scrapy.utils.reactor import install_reactor
+        settings = get_project_settings()
+        install_reactor(settings["TWISTED_REACTOR"])
+        configure_logging(settings)
+        from twisted.internet import reactor
+        from twisted.internet.defer import Deferred
+
+        outcome = {"code": 0}
+
+        def failed(failure):
+            Logger.error(f"Crawl worker failed: {failure.getErrorMessage()}", component="WORKER", context={"worker": self.worker_id})
+            outcome["code"] = 1
+
+        d = Deferred.fromCoroutine(self._work())
+        d.addErrback(failed)
+        d.addBoth(lambda _: reactor.stop())
+        reactor.run()
+        return outcome["code"]
+
+    async def _work(self):
+        from scraper.scraper.pipeline_state import PipelineState
+        state = PipelineState()
+        try:
+            await self._run_jobs(state)
+        finally:
+            state.close()
+        Logger.log("No jobs left", component="WORKER", context={"worker": self.worker_id, "jobs": self.jobs_done})
+
+    async def _run_jobs(self, state):
+        from scrapy.crawler import CrawlerRunner
+        from scraper.scraper.spiders.craigslistspider import CraigslistSpider
+        config = Config.current()
+        while True:
+            job = self.queue.claim(self.run_id, self.worker_id)
+            if job is None:
+                break
+            self._job = job
+            search = replace(config.search(job["search"]), regions=(job["region"],))
+            Logger.log("Starting job", component="WORKER", context={"worker": self.worker_id, "job": job["id"], "search": search.name, "region": job["region"]})
+            runner = CrawlerRunner(self.engine._scraper_settings())
+            crawler = runner.create_crawler(CraigslistSpider)
+            try:
+                await runner.crawl(
+                    crawler,
+                    llm_client=self.engine.llm_client,
+                    searches=[search],
+                    pipeline_state=state,
+                    run_started_at=job["enqueued_at"],
+                )
+            except Exception as e:
+                Logger.error(f"Job failed: {e}", component="WORKER", context={"worker": self.worker_id, "job": job["id"]})
+                self.queue.fail(job["id"], str(e))
+                continue
+            finally:
+                self._job = None
+            stats = crawler.stats.get_stats() if crawler.stats else {}
+            self.queue.complete(job["id"], {key: stats[key] for key in JOB_STATS if key in stats})
+            self.jobs_done += 1
+
+    def _record(self, results, search: str):
+        """Replaces the engine's ranking: results are ranked by the coordinator across all workers."""
+        self.engine.seen_store.record_scores(results, search)
+        if self._job is not None and results:
+            self.queue.add_results(self.run_id, self._job["id"], search, results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queue", required=True, help="job queue database")
+    parser.add_argument("--run-id", required=True)
+    parser.add_argument("--worker-id", required=True)
+    parser.add_argument("--config", default=None, help="configuration file (default = the repo's config.yaml)")
+    args = parser.parse_args()
+
+    Config(args.config)
+    from engine.engine import Engine
+    from storage.job_queue import JobQueue
+    engine = Engine()
+    worker = CrawlWorker(engine, JobQueue(args.queue), args.run_id, args.worker_id)
+    try:
+        code = worker.start()
+    finally:
+        config = Config.current()
+        Metrics.dump(
+            json_path=worker_path(config.get('metrics_json_path', 'logs/metrics.json'), args.worker_id),
+            prometheus_path=worker_path(config.get('metrics_prometheus_path', 'logs/metrics.prom'), args.worker_id),
+        )
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
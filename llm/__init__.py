@@ -1,3 +1,9 @@
-from .client import LLMClient, ListingEvaluatorLLMClient
-
 __all__ = ['LLMClient', 'ListingEvaluatorLLMClient']
+
+
+def __getattr__(name):
+    # Resolved on first use so importing llm.cache or llm.tokens stays cheap
+    if name in __all__:
+        from . import client
+        return getattr(client, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
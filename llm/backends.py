@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import re
+import zlib
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from utilities.logger import Logger
+
+
+def _text(content: Any) -> str:
+    """The text of a message: the string itself, or the first text part of a list of content parts."""
+    if isinstance(content, str):
+        return content
+    return next((part.get("text", "") for part in content if part.get("type") == "text"), "")
+
+
+class CompletionBackend:
+    """
+    Serves chat completion requests for any model of one provider.
+
+    `complete` returns an object shaped like OpenAI's ChatCompletion, with the
+    reply in `choices[0].message.content` and token counts in `usage`, and
+    raises on failure. Implementations must allow many concurrent calls.
+    """
+
+    async def complete(self,
+                       model: str,
+                       messages: List[Dict[str, Any]],
+                       temperature: float,
+                       max_tokens: int,
+                       **kwargs):
+        raise NotImplementedError
+
+
+class OpenAIBackend(CompletionBackend):
+    """
+    OpenAI chat completions over one pooled async HTTP client.
+
+    The API key is checked up front, but the SDK is only imported and the
+    client built on the first request, since importing it takes a large share
+    of startup and a run where every listing is cached or unchanged never
+    needs it.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, max_connections: int = 4, **kwargs):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("API key must be provided either as parameter or OPENAI_API_KEY environment variable")
+        self.max_connections = max_connections
+        self._client = None
+        self._client_kwargs = kwargs
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=DefaultAsyncHttpxClient(limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                )),
+                **self._client_kwargs
+            )
+        return self._client
+
+    async def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        return await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+
+
+class StubBackend(CompletionBackend):
+    """
+    Scores listing evaluation prompts locally, without any network access.
+
+    Every listing gets a 1.0-5.0 score derived from a checksum of its text and
+    the model name, so the same listing always scores the same for a model and
+    different models disagree a little, as a cheaper tier would. Replies use the
+    index and score schema when it is requested. For offline runs and for
+    trying out cascade settings. Attached images are ignored.
+    """
+    LISTING_COUNT = re.compile(r"Below are (\d+) listings")
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        self.latency = latency
+
+    async def complete(self, model, messages, temperature, max_tokens, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        prompt = _text(messages[-1]["content"])
+        match = self.LISTING_COUNT.search(prompt)
+        count = int(match.group(1)) if match else 0
+        # Scored without the "Listing N" header, so a listing scores the same at any position
+        blocks = [block.partition("\n")[2] for block in prompt.split("\n\nListing ")[1:]][:count]
+        scores = []
+        for index, block in enumerate(blocks):
+            base = 1 + zlib.crc32(block.encode("utf-8")) % 5
+            offset = (zlib.crc32(f"{model}\n{block}".encode("utf-8")) % 11 - 5) / 10
+            scores.append({"index": index + 1, "score": min(5.0, max(1.0, base + offset))})
+
+        structured = (kwargs.get("response_format") or {}).get("type") == "json_schema"
+        content = json.dumps({"scores": scores} if structured else [entry["score"] for entry in scores])
+        Logger.log("Stub backend scored listings", component="LLM", context={"model": model, "count": len(scores)})
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason="stop")],
+            usage=SimpleNamespace(
+                prompt_tokens=sum(len(_text(message["content"])) for message in messages) // 4,
+                completion_tokens=len(content) // 4,
+                prompt_tokens_details=None,
+            ),
+        )
+
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "stub": StubBackend,
+}
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from storage.seen_store import normalize_price
+from utilities.logger import Logger
+
+CACHED_FIELDS = ("title", "price", "content", "attribute_group")
+
+
+def _normalize_text(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(k).strip(): _normalize_text(v) for k, v in value.items()}
+    return value
+
+
+class EvaluationCache:
+    """
+    On-disk cache of per-listing LLM scores.
+
+    Entries are content-addressed: the key is a hash of the listing's normalized
+    text fields together with everything else that can change the score (search
+    query, search details, model and prompt version). Entries expire after `ttl`
+    seconds and the least recently used ones are evicted past `max_entries`.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS scores (
+                    key TEXT PRIMARY KEY,
+                    score REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS scores_last_access ON scores(last_access)")
+        Logger.log("EvaluationCache initialized", component="LLM", context={"path": self.path, "ttl": ttl, "max_entries": max_entries})
+
+    @staticmethod
+    def key_for(listing: Dict[str, Any], search_query: str, search_details: Iterable[str], model: str, prompt_version: str) -> str:
+        """Hash everything that can influence a listing's score into a cache key."""
+        fields = {name: _normalize_text(listing.get(name)) for name in CACHED_FIELDS}
+        fields["price"] = normalize_price(listing.get("price"))
+        if listing.get("thumbnails"):
+            # Thumbnails are named after their perceptual hash, so the names identify the photos
+            fields["thumbnails"] = [os.path.basename(path) for path in listing["thumbnails"]]
+        payload = json.dumps({
+            "listing": fields,
+            "search_query": _normalize_text(search_query),
+            "search_details": [_normalize_text(d) for d in search_details],
+            "model": model,
+            "prompt_version": prompt_version,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        """Return the cached scores for whichever keys are present and unexpired."""
+        if not keys:
+            return {}
+        now = time.time()
+        unique = list(dict.fromkeys(keys))
+        placeholders = ",".join("?" * len(unique))
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                f"SELECT key, score, created_at FROM scores WHERE key IN ({placeholders})", unique
+            ).fetchall()
+            found = {key: score for key, score, created_at in rows if self.ttl is None or now - created_at <= self.ttl}
+            if found:
+                self._conn.executemany("UPDATE scores SET last_access = ? WHERE key = ?", [(now, key) for key in found])
+        hits = sum(1 for key in keys if key in found)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, entries: Iterable[Tuple[str, float]]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores (key, score, created_at, last_access) VALUES (?, ?, ?, ?)",
+                [(key, score, now, now) for key, score in entries],
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        evicted = 0
+        if self.ttl is not None:
+            evicted += self._conn.execute("DELETE FROM scores WHERE created_at < ?", (now - self.ttl,)).rowcount
+        if self.max_entries is not None:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                evicted += self._conn.execute(
+                    "DELETE FROM scores WHERE key IN (SELECT key FROM scores ORDER BY last_access LIMIT ?)", (overflow,)
+                ).rowcount
+        self.evictions += evicted
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
@@ -1,21 +1,35 @@
-import os
-import yaml
-import json
+import asyncio
+import base64
+import time
 from typing import List, Dict, Any, Optional, Callable
-from pathlib import Path
-from openai import OpenAI
-from utilities.config import Config
+from llm.backends import BACKENDS, CompletionBackend, OpenAIBackend
+from llm.cache import EvaluationCache
+from llm.scores import SCORES_SCHEMA, parse_scores
+from llm.templates import PromptTemplate, prompt_version
+from llm.tokens import estimate_image_tokens, estimate_tokens
+from utilities.config import Config, SearchConfig
 from utilities.logger import Logger
+from utilities.metrics import Metrics
+
+# Item fields used for routing only, never shown to the model as text
+NON_PROMPT_FIELDS = ("search", "region", "images", "thumbnails")
 
 class LLMClient:
     """
     Base class for LLM clients that provides core functionality for interacting with OpenAI's API.
     Handles initialization, system prompts, and basic message sending.
+
+    Requests are stateless: every call builds its own message list, so any number
+    of them can be in flight at once. Concurrency is capped by `max_in_flight`.
+    Requests go through a pluggable provider backend (see llm/backends.py); the
+    OpenAI backend shares one pooled async HTTP client, created on first use.
     """
     
     def __init__(self, 
                  api_key: Optional[str] = None, 
                  model: str = None, 
+                 max_in_flight: Optional[int] = None,
+                 backend: Optional[str] = None,
                  **kwargs):
         """
         Initialize the LLM client.
@@ -23,62 +37,66 @@ class LLMClient:
         Args:
             api_key: OpenAI API key. If None, will try to get from environment variable OPENAI_API_KEY
             model: The model to use for completions
-            **kwargs: Additional arguments to pass to OpenAI client
+            max_in_flight: Maximum number of concurrent requests (default = llm_max_in_flight from config)
+            backend: Name of the provider backend in BACKENDS (default = llm_backend from config, or "openai")
+            **kwargs: Additional arguments to pass to the OpenAI client when it is created
         """
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("API key must be provided either as parameter or OPENAI_API_KEY environment variable")
-        
-        self.model = model or Config.get('model')
-        self.client = OpenAI(api_key=self.api_key, **kwargs)
+        config = Config.current()
+        self.api_key = api_key
+        self.model = model or config.model
+        self.max_in_flight = max_in_flight or config.get('llm_max_in_flight', 4)
+        self._client_kwargs = kwargs
+        self._backends = {}
+        self.backend = self._backend(backend or config.get('llm_backend', 'openai'))
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
         self.system_prompt = ""
-        self.conversation_history: List[Dict[str, str]] = []
-        Logger.log("LLMClient initialized", component="LLM", context={"model": self.model})
-        
+        Logger.log("LLMClient initialized", component="LLM", context={"model": self.model, "max_in_flight": self.max_in_flight})
+
+    def _backend(self, name: str) -> CompletionBackend:
+        """The backend called `name`, created once and shared by every model it serves."""
+        if name not in self._backends:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown LLM backend {name!r}, expected one of: {', '.join(BACKENDS)}")
+            if name == "openai":
+                self._backends[name] = OpenAIBackend(self.api_key, self.max_in_flight, **self._client_kwargs)
+            else:
+                self._backends[name] = BACKENDS[name]()
+        return self._backends[name]
+
+    @property
+    def client(self):
+        """The default backend's pooled AsyncOpenAI client, built on first use."""
+        return self.backend.client
+
     def _set_system_prompt(self, prompt: str) -> None:
         """Set the system prompt for the conversation."""
         self.system_prompt = prompt
 
-    def _read_from_file(self, file_path:str, **kwargs):
-        """Reads from a file and any kwargs are injected into the text like an fstring"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if kwargs:
-                    content = content.format(**kwargs)
-                return content.strip()
-                
-        except FileNotFoundError:
-            raise FileNotFoundError(f"System prompt file not found: {file_path}")
+    def _load_system_prompt(self, name: str = "system.txt") -> None:
+        """Load the system prompt from a template in llm/prompts."""
+        template = PromptTemplate.load(name)
+        self._set_system_prompt(template.render())
+        Logger.log("System prompt loaded", component="LLM", context={"template": name, "version": template.version})
     
-    def _load_system_prompt_from_file(self, file_path: Optional[str] = None) -> None:
-        """Load system prompt from a text file."""
-        if file_path is None:
-            file_path = Path(__file__).parent / "prompts/system.txt"
-
-        system = self._read_from_file(file_path)
-        self._set_system_prompt(system)
-        Logger.log("System prompt loaded", component="LLM", context={"path": str(file_path)})
-    
-    def _add_message(self, role: str, content: str) -> None:
-        """Add a message to the conversation history."""
+    def _build_messages(self, message: str, role: str = "user") -> List[Dict[str, str]]:
+        """Build a self-contained message list for a single request."""
         if role not in ["user", "assistant", "system"]:
             raise ValueError("Role must be 'user', 'assistant', or 'system'")
-        
-        self.conversation_history.append({"role": role, "content": content})
-    
-    def clear_history(self) -> None:
-        """Clear the conversation history."""
-        self.conversation_history = []
+
+        messages = []
+        if self.system_prompt:
+            messages.append({"role": "system", "content": self.system_prompt})
+        messages.append({"role": role, "content": message})
+        return messages
     
-    def send_message(self, 
-                     message: str, 
-                     role: str = "user", 
-                     temperature: float = None, 
-                     max_tokens: int = None, 
-                     **kwargs) -> str:
-        """
-        Send a message to the LLM.
+    async def send_message(self, 
+                           message: str, 
+                           role: str = "user", 
+                           temperature: float = None, 
+                           max_tokens: int = None, 
+                           **kwargs) -> str:
+        """
+        Send a single stateless message to the LLM.
         
         Args:
             message: The message content to send
@@ -90,39 +108,80 @@ class LLMClient:
         Returns:
             The response content from the LLM
         """
-        self._add_message(role, message)
-        messages = []
-        if self.system_prompt:
-            messages.append({"role": "system", "content": self.system_prompt})
-        
-        messages.extend(self.conversation_history)
-        
-        temperature = temperature or Config.get('temperature')
-        max_tokens = max_tokens or Config.get('max_tokens')
+        response = await self.complete(self._build_messages(message, role), temperature, max_tokens, **kwargs)
+        return response.choices[0].message.content
+
+    async def complete(self,
+                       messages: List[Dict[str, Any]],
+                       temperature: float = None,
+                       max_tokens: int = None,
+                       model: Optional[str] = None,
+                       backend: Optional[CompletionBackend] = None,
+                       **kwargs):
+        """
+        Send a prepared message list to the LLM.
+
+        Args:
+            messages: The full message list for the request
+            temperature: Sampling temperature (0-2) (default = temperature from config)
+            max_tokens: Maximum tokens in response (default = max_tokens from config)
+            model: The model to ask (default = the client's model)
+            backend: The backend serving `model` (default = the client's backend)
+            **kwargs: Additional parameters for the API call
+
+        Returns:
+            The raw chat completion response, including token usage
+        """
+        config = Config.current()
+        temperature = temperature or config.temperature
+        max_tokens = max_tokens or config.max_tokens
+        model = model or self.model
+        backend = backend or self.backend
 
+        queued_at = time.perf_counter()
         try:
-            Logger.log("Sending chat completion request", component="LLM", context={"temperature": temperature, "max_tokens": max_tokens})
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                **kwargs
-            )
-            
-            response_content = response.choices[0].message.content
-            self._add_message("assistant", response_content)
+            async with self._semaphore:
+                Metrics.observe("llm_queue_wait_seconds", time.perf_counter() - queued_at)
+                Logger.log("Sending chat completion request", component="LLM", context={"model": model, "temperature": temperature, "max_tokens": max_tokens})
+                with Metrics.span("llm_request_seconds", {"model": model}):
+                    response = await backend.complete(model, messages, temperature, max_tokens, **kwargs)
+            Metrics.inc("llm_requests_total", labels={"outcome": "ok"})
             Logger.log("Received chat completion response", component="LLM")
-            return response_content
-            
+            return response
+
         except Exception as e:
-            Logger.error(f"OpenAI API error: {str(e)}", component="LLM")
-            raise RuntimeError(f"Error calling OpenAI API: {str(e)}")
+            Metrics.inc("llm_requests_total", labels={"outcome": "error"})
+            Logger.error(f"LLM API error: {str(e)}", component="LLM", context={"model": model})
+            raise RuntimeError(f"Error calling LLM API: {str(e)}")
+
+class ModelTier:
+    """One model of the evaluation cascade, the backend serving it and what it cost this process."""
+
+    def __init__(self, name: str, model: str, backend: CompletionBackend):
+        self.name = name
+        self.model = model
+        self.backend = backend
+        self.stats = {
+            "requests": 0,
+            "listings": 0,
+            "request_seconds": 0.0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "escalated": 0,
+            "overturned": 0,
+        }
+
 
 class ListingEvaluatorLLMClient(LLMClient):
     """
     Specialized LLM client for evaluating Craigslist listings.
     Inherits from LLMClient and adds specific functionality for listing evaluation.
+
+    Listings can be scored by a cascade of models (`llm_tiers` in config.yaml).
+    The first tier scores every listing; each later tier re-scores only the
+    listings whose current score lies within `llm_cascade_band` of the search's
+    threshold, where a careful judgment changes the outcome. Without tiers,
+    `model` alone scores everything.
     """
     
     def __init__(self, 
@@ -136,52 +195,322 @@ class ListingEvaluatorLLMClient(LLMClient):
         Args:
             api_key: OpenAI API key. If None, will try to get from environment variable OPENAI_API_KEY
             model: The model to use for completions
-            **kwargs: Additional arguments to pass to OpenAI client
+            pipeline_out: Callback receiving the (score, url) results of every evaluated batch,
+                along with the name of the search they belong to
+            **kwargs: Additional arguments to pass to LLMClient
         """
         super().__init__(api_key, model, **kwargs)
-        self._load_system_prompt_from_file()
+        self._load_system_prompt()
+        self.criteria_template = PromptTemplate.load("criteria.txt")
+        self.evaluation_template = PromptTemplate.load("evaluation.txt")
+        self.prompt_version = prompt_version("system.txt", "criteria.txt", "evaluation.txt")
         self.pipeline_out = pipeline_out
+        self._criteria_messages = {}
+        self.prompt_metrics = {
+            "batches": 0,
+            "prompt_bytes": 0,
+            "prompt_tokens": 0,
+            "cached_prompt_tokens": 0,
+            "images": 0,
+            "image_bytes": 0,
+        }
+        self.recovery_metrics = {
+            "retries": 0,
+            "recovered": 0,
+            "unscored": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+
+        config = Config.current()
+        self.structured_output = config.get('llm_structured_output', True)
+        self.max_retry_depth = config.get('llm_retry_max_depth', 3)
+        self.image_detail = config.get('image_detail', 'low')
+        self.tiers = [ModelTier(tier.name, tier.model, self._backend(tier.backend)) for tier in config.tiers]
+        self.cascade_band = config.get('llm_cascade_band', 0.5)
+        # Cached scores are only valid for the cascade that produced them
+        self.cache_model = "+".join(tier.model for tier in self.tiers)
+        if len(self.tiers) > 1:
+            self.cache_model += f"@{self.cascade_band:g}"
+        ttl_hours = config.get('llm_cache_ttl_hours')
+        self.cache = EvaluationCache(
+            path=config.get('llm_cache_path', 'data/llm_cache.sqlite3'),
+            ttl=ttl_hours * 3600 if ttl_hours else None,
+            max_entries=config.get('llm_cache_max_entries'),
+        )
+
+    def prompt_overhead_tokens(self, search: SearchConfig) -> int:
+        """Estimate the tokens every evaluation request for `search` pays before any listing is added."""
+        criteria = self._criteria_message(search.query, search.details)
+        return estimate_tokens(self.system_prompt + criteria + self.evaluation_template.text, self.model)
+
+    def listing_tokens(self, listing: Dict[str, Any]) -> int:
+        """Estimate the prompt tokens a single listing adds to a batch, its photos included."""
+        tokens = estimate_tokens(self._format_listing(listing), self.model)
+        return tokens + estimate_image_tokens(len(listing.get("thumbnails") or ()), self.image_detail)
+
+    def _criteria_message(self, search_query: str, search_details) -> str:
+        """Render the search criteria once per search so the prompt prefix stays byte-identical."""
+        key = (search_query, tuple(search_details))
+        if key not in self._criteria_messages:
+            self._criteria_messages[key] = self.criteria_template.render(
+                search_query=search_query,
+                search_details="\n".join(f"- {detail}" for detail in search_details),
+            )
+        return self._criteria_messages[key]
+
+    def _build_evaluation_messages(self, listings: List[Dict[str, Any]], search: SearchConfig) -> List[Dict[str, Any]]:
+        """
+        Lay out an evaluation request so it starts with a stable prefix.
+
+        The system prompt and search criteria are identical for every batch of a
+        search, which lets provider-side prompt caching reuse them; only the final
+        message with the listings varies. Listings with thumbnails get their
+        photos appended to that message as images after the text.
+        """
+        evaluation = self.evaluation_template.render(
+            length=len(listings),
+            formatted_listings=self._format_listings(listings),
+        )
+        images = self._image_parts(listings)
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self._criteria_message(search.query, search.details)},
+            {"role": "user", "content": [{"type": "text", "text": evaluation}] + images if images else evaluation},
+        ]
+
+    def _image_parts(self, listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Message parts with every listing's thumbnails, each group labeled with its listing number."""
+        parts = []
+        for index, listing in enumerate(listings):
+            encoded = []
+            for path in listing.get("thumbnails") or ():
+                try:
+                    with open(path, "rb") as f:
+                        encoded.append(base64.b64encode(f.read()).decode("ascii"))
+                except OSError as e:
+                    Logger.warning(f"Could not read listing thumbnail: {e}", component="LLM", context={"path": path})
+            if not encoded:
+                continue
+            parts.append({"type": "text", "text": f"Photos of listing {index + 1}:"})
+            parts.extend(
+                {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{data}", "detail": self.image_detail}}
+                for data in encoded
+            )
+        return parts
+
+    def _record_prompt_metrics(self, messages: List[Dict[str, Any]], response, tier: ModelTier, recovery: bool = False) -> None:
+        prompt_bytes = 0
+        images = image_bytes = 0
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, str):
+                prompt_bytes += len(content.encode("utf-8"))
+                continue
+            for part in content:
+                if part["type"] == "image_url":
+                    images += 1
+                    image_bytes += len(part["image_url"]["url"])
+                else:
+                    prompt_bytes += len(part["text"].encode("utf-8"))
+        prompt_bytes += image_bytes
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        tier.stats["prompt_tokens"] += prompt_tokens
+        tier.stats["completion_tokens"] += completion_tokens
+        Metrics.inc("llm_tier_tokens_total", prompt_tokens, {"tier": tier.name, "kind": "prompt"})
+        Metrics.inc("llm_tier_tokens_total", completion_tokens, {"tier": tier.name, "kind": "completion"})
+        if recovery:
+            self.recovery_metrics["prompt_tokens"] += prompt_tokens
+            self.recovery_metrics["completion_tokens"] += completion_tokens
+            Metrics.inc("llm_recovery_tokens_total", prompt_tokens, {"kind": "prompt"})
+            Metrics.inc("llm_recovery_tokens_total", completion_tokens, {"kind": "completion"})
+
+        self.prompt_metrics["batches"] += 1
+        self.prompt_metrics["prompt_bytes"] += prompt_bytes
+        self.prompt_metrics["prompt_tokens"] += prompt_tokens
+        self.prompt_metrics["cached_prompt_tokens"] += cached_tokens
+        self.prompt_metrics["images"] += images
+        self.prompt_metrics["image_bytes"] += image_bytes
+        if images:
+            Metrics.inc("llm_images_total", images)
+            Metrics.inc("llm_image_bytes_total", image_bytes)
+        Metrics.inc("llm_prompt_tokens_total", prompt_tokens)
+        Metrics.inc("llm_cached_prompt_tokens_total", cached_tokens)
+        Logger.log("Evaluation prompt usage", component="LLM", context={
+            "tier": tier.name,
+            "prompt_bytes": prompt_bytes,
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_tokens,
+            "images": images,
+            "image_bytes": image_bytes,
+        })
     
-    def evaluate_listings(self, listings: List[Dict[str, Any]]) -> List[tuple]:
+    async def evaluate_listings(self, listings: List[Dict[str, Any]], search: SearchConfig) -> List[tuple]:
         """
-        Evaluate a Craigslist listing.
+        Evaluate a batch of Craigslist listings found by one search.
+
+        Listings whose score is already cached are not sent to the LLM; only the
+        cache misses go through the model cascade and the results are merged
+        back in order.
         
         Args:
-            listing_data: Dictionary containing listing information (title, price, description, etc.)
+            listings: Dictionaries containing listing information (title, price, description, etc.)
+            search: The saved search the listings are judged against
             
         Returns:
-            Detailed evaluation of the listing
+            List of (score, url) tuples in the same order as the listings
         """
-        formatted_listings = self._format_listings(listings)
-        file_path = file_path = Path(__file__).parent / "prompts/evaluation.txt"
+        keys = [
+            self.cache.key_for(listing, search.query, search.details, self.cache_model, self.prompt_version)
+            for listing in listings
+        ]
+        cached = self.cache.get_many(keys)
+        scores = [cached.get(key) for key in keys]
+        misses = [index for index, key in enumerate(keys) if key not in cached]
+        Metrics.inc("llm_cache_lookups_total", len(listings) - len(misses), {"result": "hit"})
+        Metrics.inc("llm_cache_lookups_total", len(misses), {"result": "miss"})
+        Logger.log("Evaluation cache lookup", component="LLM", context={"hits": len(listings) - len(misses), "misses": len(misses)})
 
-        evaluation_prompt = self._read_from_file(
-            file_path = file_path,
-            search_query = Config.get('search_query'),
-            search_details = Config.get('search_details'),
-            length = len(listings),
-            formatted_listings = formatted_listings,
-        )
-        Logger.log("Dispatching evaluation to LLM", component="LLM", context={"num_listings": len(listings)})
-        response = self.send_message(evaluation_prompt)
-        self.clear_history()
+        if misses:
+            fresh_scores = await self._cascade([listings[index] for index in misses], search)
+            for index, score in zip(misses, fresh_scores):
+                scores[index] = score
+            self.cache.put_many((keys[index], score) for index, score in zip(misses, fresh_scores) if score is not None)
+
+        results = [(score, listing["url"]) for score, listing in zip(scores, listings) if score is not None]
+        if self.pipeline_out:
+            self.pipeline_out(results, search=search.name)
+        Logger.log("Parsed LLM evaluation results", component="LLM", context={
+            "count": len(results),
+            "unscored": len(listings) - len(results),
+            "search": search.name,
+        })
+        return results
 
+    async def _cascade(self, listings: List[Dict[str, Any]], search: SearchConfig) -> List[Optional[float]]:
+        """
+        Score listings with the first tier and escalate the borderline ones tier by tier.
+
+        A later tier's score replaces the earlier one; a listing the later tier
+        could not score keeps the score it had. A decision is overturned when
+        the new score lands on the other side of the threshold.
+
+        Returns:
+            One score per listing in order, None for listings that could not be scored
+        """
+        first = self.tiers[0]
+        first.stats["listings"] += len(listings)
+        scores = await self._request_scores(listings, search, first)
+
+        for previous, tier in zip(self.tiers, self.tiers[1:]):
+            borderline = [
+                index for index, score in enumerate(scores)
+                if score is not None and abs(score - search.threshold) <= self.cascade_band
+            ]
+            if not borderline:
+                break
+            previous.stats["escalated"] += len(borderline)
+            tier.stats["listings"] += len(borderline)
+            Metrics.inc("llm_escalated_listings_total", len(borderline), {"tier": tier.name})
+            escalated = await self._request_scores([listings[index] for index in borderline], search, tier)
+
+            overturned = 0
+            for index, score in zip(borderline, escalated):
+                if score is None:
+                    continue
+                if (score >= search.threshold) != (scores[index] >= search.threshold):
+                    overturned += 1
+                scores[index] = score
+            tier.stats["overturned"] += overturned
+            Metrics.inc("llm_overturned_decisions_total", overturned, {"tier": tier.name})
+            Logger.log("Escalated borderline listings", component="LLM", context={
+                "search": search.name,
+                "from_tier": previous.name,
+                "to_tier": tier.name,
+                "escalated": len(borderline),
+                "overturned": overturned,
+            })
+        return scores
+
+    async def _request_scores(self, listings: List[Dict[str, Any]], search: SearchConfig, tier: ModelTier, depth: int = 0) -> List[Optional[float]]:
+        """
+        Score a batch of listings, re-requesting only the ones the reply left out.
+
+        A request that fails, or a reply that cannot be parsed or is missing
+        scores, is not thrown away: whatever scores it has are kept, and the
+        unscored listings are sent again split into two halves, down to single
+        listings or `llm_retry_max_depth` levels of splitting.
+
+        Returns:
+            One score per listing in order, None for listings that could not be scored
+        """
+        scores = [None] * len(listings)
+        reason = None
+        messages = self._build_evaluation_messages(listings, search)
+        Logger.log("Dispatching evaluation to LLM", component="LLM", context={"num_listings": len(listings), "tier": tier.name, "retry_depth": depth})
+        began = time.perf_counter()
         try:
-            scores = json.loads(response)
-            results = [(score, listing["url"]) for score, listing in zip(scores, listings)]
-            if self.pipeline_out:
-                self.pipeline_out(results)
-            Logger.log("Parsed LLM evaluation results", component="LLM", context={"count": len(results)})
-            return results
-        except json.JSONDecodeError as e:
-            Logger.error(f"Failed to parse LLM evaluation JSON: {e}", component="LLM", context={"response_sample": response[:200] if isinstance(response, str) else None})
-            raise RuntimeError(f"Couldn't load LLM evaluation scores into list with JSON: {e}\nresponse: {response}")
-    
+            completion = await self.complete(messages, model=tier.model, backend=tier.backend, **self._response_format())
+        except RuntimeError:
+            reason = "request_error"
+            parsed = {}
+        else:
+            self._record_prompt_metrics(messages, completion, tier, recovery=depth > 0)
+            response = completion.choices[0].message.content
+            parsed = parse_scores(response, len(listings))
+            if len(parsed) < len(listings):
+                reason = "parse_error" if not parsed else "count_mismatch"
+                Logger.warning("LLM reply is missing scores", component="LLM", context={
+                    "expected": len(listings),
+                    "parsed": len(parsed),
+                    "response_sample": response[:200] if isinstance(response, str) else None,
+                })
+        finally:
+            elapsed = time.perf_counter() - began
+            tier.stats["requests"] += 1
+            tier.stats["request_seconds"] += elapsed
+            Metrics.observe("llm_tier_request_seconds", elapsed, {"tier": tier.name})
+        for index, score in parsed.items():
+            scores[index] = score
+        if depth > 0:
+            self.recovery_metrics["recovered"] += len(parsed)
+            Metrics.inc("llm_recovered_listings_total", len(parsed))
+
+        missing = [index for index, score in enumerate(scores) if score is None]
+        if not missing:
+            return scores
+        if len(listings) == 1 or depth >= self.max_retry_depth:
+            self.recovery_metrics["unscored"] += len(missing)
+            Metrics.inc("llm_unscored_listings_total", len(missing))
+            Logger.error("Giving up on scoring listings", component="LLM", context={"count": len(missing), "reason": reason, "retry_depth": depth})
+            return scores
+
+        halves = [part for part in (missing[:(len(missing) + 1) // 2], missing[(len(missing) + 1) // 2:]) if part]
+        self.recovery_metrics["retries"] += len(halves)
+        Metrics.inc("llm_retries_total", len(halves), {"reason": reason})
+        results = await asyncio.gather(*(
+            self._request_scores([listings[index] for index in part], search, tier, depth + 1) for part in halves
+        ))
+        for part, part_scores in zip(halves, results):
+            for index, score in zip(part, part_scores):
+                scores[index] = score
+        return scores
+
+    def _response_format(self) -> Dict[str, Any]:
+        """Request arguments that ask for the index and score schema, if the model supports it."""
+        return {"response_format": SCORES_SCHEMA} if self.structured_output else {}
+
     def _format_listing(self, listing_data: Dict[str, Any]) -> str:
         """Format listing data into a readable string for evaluation."""
         formatted = []
         
         for key, value in listing_data.items():
+            if key in NON_PROMPT_FIELDS:
+                continue
             formatted.append(f"{key.title()}: {value}")
         
         return "\n".join(formatted)
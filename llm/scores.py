@@ -0,0 +1,106 @@
+"""
+Structured output for listing evaluations and a tolerant parser for it.
+
+The model is asked for {"scores": [{"index": 1, "score": 4.3}, ...]}, with
+each listing's 1-based position in the prompt echoed next to its score, so a
+reply that skips or reorders listings can still be matched up. The parser
+salvages what it can from replies that are cut off or malformed instead of
+rejecting the whole batch.
+"""
+import json
+import math
+import re
+from typing import Any, Dict, Optional
+
+SCORES_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "listing_scores",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "scores": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "index": {"type": "integer"},
+                            "score": {"type": "number"},
+                        },
+                        "required": ["index", "score"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["scores"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# A flat {...} object, as found inside a truncated or otherwise broken reply
+OBJECT_PATTERN = re.compile(r"\{[^{}\[\]]*\}")
+FENCE_PATTERN = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def _as_score(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        return None
+    return score if math.isfinite(score) else None
+
+
+def _from_entries(entries, count: int) -> Dict[int, float]:
+    scores = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("index")
+        score = _as_score(entry.get("score"))
+        if isinstance(index, int) and not isinstance(index, bool) and 1 <= index <= count and score is not None:
+            # A repeated index keeps its first score
+            scores.setdefault(index - 1, score)
+    return scores
+
+
+def parse_scores(response: Optional[str], count: int) -> Dict[int, float]:
+    """
+    Read the scores of a batch of `count` listings out of a model reply.
+
+    Accepts the structured {"scores": [...]} object, a bare list of index and
+    score objects, and the older plain array of numbers, which is only trusted
+    when it has exactly `count` entries since its positions cannot be checked.
+    When the reply is not valid JSON, every complete index and score object in
+    it is still used.
+
+    Returns:
+        Scores by 0-based listing position; listings without a usable score are missing
+    """
+    if not isinstance(response, str) or not response.strip():
+        return {}
+    text = FENCE_PATTERN.sub("", response.strip())
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        salvaged = []
+        for match in OBJECT_PATTERN.finditer(text):
+            try:
+                salvaged.append(json.loads(match.group(0)))
+            except json.JSONDecodeError:
+                continue
+        return _from_entries(salvaged, count)
+
+    if isinstance(parsed, dict):
+        parsed = parsed.get("scores")
+    if not isinstance(parsed, list):
+        return {}
+    if parsed and all(not isinstance(entry, dict) for entry in parsed):
+        if len(parsed) != count:
+            return {}
+        scores = {index: _as_score(value) for index, value in enumerate(parsed)}
+        return {index: score for index, score in scores.items() if score is not None}
+    return _from_entries(parsed, count)
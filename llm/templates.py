@@ -0,0 +1,50 @@
+import hashlib
+import string
+from functools import lru_cache
+from pathlib import Path
+
+PROMPTS_DIR = Path(__file__).parent / "prompts"
+
+
+class PromptTemplate:
+    """
+    A prompt file read and parsed once per process.
+
+    The template text is validated up front, so rendering is a plain
+    `str.format` call, and `version` is a short content hash that changes
+    whenever the file is edited.
+    """
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text.strip()
+        self.version = hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:12]
+        self.fields = frozenset(
+            field for _, field, _, _ in string.Formatter().parse(self.text) if field
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def load(name: str) -> "PromptTemplate":
+        """Load a template from llm/prompts, reading the file only the first time."""
+        path = PROMPTS_DIR / name
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Prompt template not found: {path}")
+        return PromptTemplate(name, text)
+
+    def render(self, **kwargs) -> str:
+        missing = self.fields - kwargs.keys()
+        if missing:
+            raise KeyError(f"Prompt template {self.name} is missing values for: {', '.join(sorted(missing))}")
+        # Formatted even without fields, so literal braces can be written as {{ }} in every template
+        return self.text.format(**kwargs)
+
+
+def prompt_version(*names: str) -> str:
+    """Combined version of several templates, e.g. for use in cache keys."""
+    digest = hashlib.sha256()
+    for name in names:
+        digest.update(PromptTemplate.load(name).version.encode("ascii"))
+    return digest.hexdigest()[:12]
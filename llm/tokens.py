@@ -0,0 +1,53 @@
+"""
+Local token estimation for sizing LLM batches.
+
+Uses tiktoken when it is installed and falls back to a character-based
+estimate (about four characters per token for English text) otherwise.
+"""
+from functools import lru_cache
+
+CHARS_PER_TOKEN = 4
+# {"index": 12, "score": 4.3}, costs roughly eleven tokens, plus some slack for the wrapping object
+COMPLETION_TOKENS_PER_LISTING = 12
+COMPLETION_OVERHEAD_TOKENS = 10
+# OpenAI bills a "low" detail image at a flat 85 tokens; at "high" detail a thumbnail
+# small enough to fit one 512px tile costs 85 + 170
+IMAGE_TOKENS = {"low": 85, "high": 255, "auto": 255}
+
+
+@lru_cache(maxsize=1)
+def _tiktoken():
+    # Imported on first use, it is slow to load and only needed once batching starts
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    tiktoken = _tiktoken()
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def estimate_tokens(text: str, model: str = "") -> int:
+    """Estimate the number of prompt tokens `text` will cost."""
+    if not text:
+        return 0
+    if _tiktoken() is not None:
+        return len(_encoding(model).encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_image_tokens(num_images: int, detail: str = "low") -> int:
+    """Estimate the prompt tokens of `num_images` attached thumbnails."""
+    return IMAGE_TOKENS.get(detail, IMAGE_TOKENS["high"]) * num_images
+
+
+def estimate_completion_tokens(num_listings: int) -> int:
+    """Estimate the completion tokens needed to score `num_listings` listings."""
+    return COMPLETION_OVERHEAD_TOKENS + COMPLETION_TOKENS_PER_LISTING * num_listings
@@ -1,15 +1,30 @@
+import argparse
 from dotenv import load_dotenv
-from engine.engine import Engine
 from utilities.logger import Logger
 
 load_dotenv()
 
 def main():
-    Logger.log("Application starting", component="MAIN")
+    parser = argparse.ArgumentParser(description="Find and rank Craigslist listings, then send the best ones.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running and crawl on a schedule instead of once")
+    parser.add_argument("--interval", type=float, default=None,
+                        help="minutes between runs in daemon mode (default = schedule_interval_minutes from config)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="crawl worker processes, one search and region at a time each (default = crawl_workers from config)")
+    args = parser.parse_args()
+
+    Logger.log("Application starting", component="MAIN", context={"daemon": args.daemon})
     try:
+        # Imported here so argument errors and --help do not wait on the engine's imports
+        from engine.engine import Engine
         engine = Engine()
         Logger.log("Engine initialized", component="MAIN")
-        engine.run()
+        if args.daemon:
+            from engine.scheduler import Scheduler
+            Scheduler(engine, interval=args.interval * 60 if args.interval else None, workers=args.workers).start()
+        else:
+            engine.run(workers=args.workers)
         Logger.log("Application finished successfully", component="MAIN")
     except Exception as e:
         Logger.error(f"Fatal error in main: {e}", component="MAIN")
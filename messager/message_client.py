@@ -1,39 +1,54 @@
-from twilio.rest import Client
 from dotenv import load_dotenv
-import os
+from typing import Optional
+from messager.transports import TRANSPORTS, MessageTransport
+from utilities.config import Config
 from utilities.logger import Logger
+from utilities.metrics import Metrics
 
 class MessageClient:
+    """
+    Sends text messages to the user through a pluggable transport.
+
+    The transport is picked by `message_transport` in config.yaml ("twilio" or
+    "stub") unless one is passed in or installed with `set_transport`.
+    """
     _instance = None
     _initialized = False
     
-    def __new__(cls):
+    def __new__(cls, transport: Optional[MessageTransport] = None):
         if cls._instance is None:
             cls._instance = super(MessageClient, cls).__new__(cls)
         return cls._instance
     
-    def __init__(self):
+    def __init__(self, transport: Optional[MessageTransport] = None):
         if not self._initialized:
             load_dotenv()
-            self.client = Client(os.environ.get("TWILIO_ACCOUNT_SID"), )
-            self.from_number = "whatsapp:+14155238886"
-            self.to_number ='whatsapp:+16503363559'
+            if transport is None:
+                name = Config.get('message_transport', 'twilio')
+                if name not in TRANSPORTS:
+                    raise ValueError(f"Unknown message transport: {name}")
+                transport = TRANSPORTS[name]()
+            self.transport = transport
             MessageClient._initialized = True
-            Logger.log("MessageClient initialized", component="MESSAGE")
+            Logger.log("MessageClient initialized", component="MESSAGE", context={"transport": type(transport).__name__})
+
+    @staticmethod
+    def set_transport(transport: MessageTransport):
+        """Replace the transport, e.g. with a StubTransport in tests"""
+        MessageClient(transport).transport = transport
 
     def send_message(self, msg: str):
         try:
-            message = self.client.messages.create(
-                body = msg,
-                from_=self.from_number,
-                to=self.to_number,
-            )
-            Logger.log("Message sent", component="MESSAGE", context={"sid": message.sid})
-            return message.sid
+            with Metrics.span("message_send_seconds"):
+                sid = self.transport.send(msg)
+            Metrics.inc("messages_sent_total", labels={"outcome": "ok"})
+            Logger.log("Message sent", component="MESSAGE", context={"sid": sid})
+            return sid
         except Exception as e:
+            Metrics.inc("messages_sent_total", labels={"outcome": "error"})
             Logger.error(f"Failed to send message: {e}", component="MESSAGE")
             raise
     
     @staticmethod
     def send(msg: str):
-        return MessageClient().send_message(msg)
\ No newline at end of file
+        return MessageClient().send_message(msg)
@@ -0,0 +1,162 @@
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+from messager.message_client import MessageClient
+from storage.seen_store import SeenStore
+from utilities.config import Config
+from utilities.logger import Logger
+from utilities.metrics import Metrics
+
+# WhatsApp and concatenated SMS bodies are capped at 1600 characters
+DEFAULT_MAX_LENGTH = 1600
+
+
+class NotificationOutbox:
+    """
+    Queues alerts for a run and sends them without blocking the caller.
+
+    Every queued listing is first recorded in the seen store, so one that
+    could not be sent (after `message_max_attempts` tries with exponential
+    backoff) is picked up again by the next run, and one that was sent is never
+    sent again. Messages go out concurrently on a small thread pool; a failed
+    message never stops the others.
+
+    With `digest_notifications` enabled, `flush` combines all pending listings
+    into as few messages as fit within `message_max_length` characters instead
+    of sending one message per listing.
+    """
+
+    def __init__(self, message_client: Optional[MessageClient] = None, seen_store: Optional[SeenStore] = None):
+        config = Config.current()
+        self.message_client = message_client
+        self.seen_store = seen_store or SeenStore()
+        self.digest = config.get('digest_notifications', False)
+        self.max_length = config.get('message_max_length', DEFAULT_MAX_LENGTH)
+        self.max_attempts = config.get('message_max_attempts', 3)
+        self.backoff = config.get('message_retry_backoff_seconds', 1.0)
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.get('message_max_workers', 4),
+            thread_name_prefix="Outbox",
+        )
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+
+    def _client(self) -> MessageClient:
+        # The transport is only built once there is something to send
+        with self._lock:
+            if self.message_client is None:
+                self.message_client = MessageClient()
+            return self.message_client
+
+    def add(self, score: float, url: str, search: str = "") -> None:
+        """Queue a listing for the next `flush`."""
+        self.seen_store.queue_notification(url, search, score)
+
+    def send_now(self, score: float, url: str, search: str = "") -> Optional[Future]:
+        """Queue a listing and start sending it right away, on its own."""
+        self.seen_store.queue_notification(url, search, score)
+        with self._lock:
+            if url in self._in_flight or self.seen_store.was_notified(url):
+                return None
+            future = self._executor.submit(self._deliver, self._format_single(score, url), [(score, url, search)])
+            self._in_flight[url] = future
+        return future
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Send everything pending, including listings left over from earlier runs,
+        and wait until every message has been delivered or has given up.
+
+        Returns:
+            Counts of listings sent and failed
+        """
+        with self._lock:
+            in_flight = list(self._in_flight.values())
+        wait(in_flight)
+
+        entries = self._dedupe(self.seen_store.pending_notifications())
+        if self.digest:
+            messages = self._format_digests(entries)
+        else:
+            messages = [(self._format_single(score, url), [(score, url, search)]) for score, url, search in entries]
+
+        futures = [self._executor.submit(self._deliver, body, batch) for body, batch in messages]
+        # Eager sends that failed were pending again above, so only their successes count here
+        sent = sum(count for delivered, count in (future.result() for future in in_flight) if delivered)
+        failed = 0
+        for future in futures:
+            delivered, count = future.result()
+            if delivered:
+                sent += count
+            else:
+                failed += count
+        with self._lock:
+            self._in_flight.clear()
+
+        Logger.log("Notification outbox flushed", component="OUTBOX", context={
+            "messages": len(messages),
+            "listings_sent": sent,
+            "listings_failed": failed,
+            "digest": self.digest,
+        })
+        return {"sent": sent, "failed": failed}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def _dedupe(self, entries: List[Tuple[Optional[float], str, str]]) -> List[Tuple[Optional[float], str, str]]:
+        """Keep one entry per URL (its best score), best first."""
+        best = {}
+        for score, url, search in entries:
+            if url not in best or (score or 0) > (best[url][0] or 0):
+                best[url] = (score, url, search)
+        return sorted(best.values(), key=lambda entry: -(entry[0] or 0))
+
+    def _format_single(self, score: Optional[float], url: str) -> str:
+        return f"{url}"
+
+    def _format_digests(self, entries: List[Tuple[Optional[float], str, str]]) -> List[Tuple[str, list]]:
+        """Pack entries into digest messages, each no longer than `max_length`."""
+        messages = []
+        lines, batch = [], []
+        header_room = len(f"{len(entries)} new matches")
+
+        def close_message():
+            header = f"{len(batch)} new match{'es' if len(batch) != 1 else ''}"
+            messages.append(("\n".join([header] + lines), list(batch)))
+
+        for entry in entries:
+            score, url, search = entry
+            line = f"{score:g} [{search}] {url}" if score is not None else f"[{search}] {url}"
+            length = header_room + sum(len(l) + 1 for l in lines) + len(line) + 1
+            if lines and length > self.max_length:
+                close_message()
+                lines, batch = [], []
+            lines.append(line)
+            batch.append(entry)
+        if lines:
+            close_message()
+        return messages
+
+    def _deliver(self, body: str, entries: list) -> Tuple[bool, int]:
+        """Send one message with retries; mark its listings as notified once it is out."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._client().send_message(body)
+                break
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    Metrics.inc("alerts_failed_total", len(entries))
+                    Logger.error(f"Giving up on message after {attempt} attempts, will retry next run: {e}", component="OUTBOX")
+                    return False, len(entries)
+                delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                Logger.warning(f"Message send failed, retrying in {delay:.1f}s: {e}", component="OUTBOX", context={"attempt": attempt})
+                time.sleep(delay)
+
+        for score, url, search in entries:
+            self.seen_store.mark_notified(url, search)
+            Metrics.inc("alerts_sent_total", labels={"search": search})
+            Logger.log(f"Sent [{url}] with score of [{score}]", component="OUTBOX", context={"search": search})
+        return True, len(entries)
@@ -0,0 +1,61 @@
+import os
+import threading
+from typing import List, Optional
+from utilities.logger import Logger
+
+
+class MessageTransport:
+    """
+    Delivers one text message body and returns an id for it.
+
+    Implementations must be safe to call from several threads at once, since
+    the notification outbox sends concurrently. Raise on failure so the caller
+    can retry.
+    """
+
+    def send(self, body: str) -> str:
+        raise NotImplementedError
+
+
+class TwilioTransport(MessageTransport):
+    """Sends messages through the Twilio API (WhatsApp sandbox numbers by default)."""
+
+    def __init__(self,
+                 account_sid: Optional[str] = None,
+                 auth_token: Optional[str] = None,
+                 from_number: str = "whatsapp:+14155238886",
+                 to_number: str = "whatsapp:+16503363559"):
+        # Imported here so the stub transport works without the Twilio SDK configured
+        from twilio.rest import Client
+        self.client = Client(account_sid or os.environ.get("TWILIO_ACCOUNT_SID"), auth_token)
+        self.from_number = from_number
+        self.to_number = to_number
+
+    def send(self, body: str) -> str:
+        message = self.client.messages.create(
+            body=body,
+            from_=self.from_number,
+            to=self.to_number,
+        )
+        return message.sid
+
+
+class StubTransport(MessageTransport):
+    """Keeps messages in memory instead of sending them, for local runs and tests."""
+
+    def __init__(self):
+        self.messages: List[str] = []
+        self._lock = threading.Lock()
+
+    def send(self, body: str) -> str:
+        with self._lock:
+            self.messages.append(body)
+            sid = f"stub-{len(self.messages)}"
+        Logger.log("Stub transport captured message", component="MESSAGE", context={"sid": sid, "length": len(body)})
+        return sid
+
+
+TRANSPORTS = {
+    "twilio": TwilioTransport,
+    "stub": StubTransport,
+}
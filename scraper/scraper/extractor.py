@@ -0,0 +1,184 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from lxml import etree
+from utilities.logger import Logger
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Everything the detail page parser needs, collected in a single document-order XPath
+DETAIL_FIELDS_XPATH = etree.XPath(
+    "//script[@id='ld_posting_data']"
+    f" | //h1[{_has_class('postingtitle')}]//span[@id='titletextonly']"
+    " | //section[@id='postingbody']"
+    f" | //div[{_has_class('postinginfos')}]//p[{_has_class('postinginfo')}]"
+    f" | //div[{_has_class('attrgroup')}]//div[{_has_class('attr')}]"
+    " | //div[@id='thumbs']//a[@href]"
+    f" | //div[{_has_class('gallery')}]//img[@src]"
+)
+TIMESTAMP_XPATH = etree.XPath(f".//time[{_has_class('date')} and {_has_class('timeago')}]")
+LABEL_XPATH = etree.XPath(f".//span[{_has_class('labl')}]")
+VALUE_XPATH = etree.XPath(f".//span[{_has_class('valu')}]")
+VALUE_LINK_XPATH = etree.XPath(f".//span[{_has_class('valu')}]//a")
+# Stand-ins for fields the page did not have
+TITLE_NOT_FOUND = "Title Not Found"
+CONTENT_NOT_FOUND = "Content Not Found"
+
+
+def _text_nodes(element) -> List[str]:
+    """Direct text children of an element, like the CSS `::text` pseudo-element."""
+    texts = [element.text] if element.text is not None else []
+    texts.extend(child.tail for child in element if child.tail is not None)
+    return texts
+
+
+def _first_text(elements) -> Optional[str]:
+    for element in elements:
+        texts = _text_nodes(element)
+        if texts:
+            return texts[0]
+    return None
+
+
+def _classes(element) -> List[str]:
+    return (element.get("class") or "").split()
+
+
+@dataclass
+class ListingRecord:
+    """Every field scraped from a Craigslist detail page."""
+    title: str = TITLE_NOT_FOUND
+    content: str = CONTENT_NOT_FOUND
+    price: Any = "Price Not Found"
+    post_id: Optional[int] = None
+    updated_at: Optional[str] = None
+    attribute_group: Dict[str, str] = field(default_factory=dict)
+    images: List[str] = field(default_factory=list)
+
+
+def extract_listing(response) -> ListingRecord:
+    """
+    Extract a listing from a detail page in a single pass over the document.
+
+    The JSON-LD posting data is used for title, description and price when it
+    is present and valid; otherwise the title and body are read from the page
+    markup. Post id, updated timestamp and attributes always come from the
+    markup. Image URLs are taken from the JSON-LD first, then from the photo
+    gallery, without repeats. Reuses the lxml tree Scrapy already parsed for
+    the response.
+
+    Args:
+        response (scrapy.http.HtmlResponse): The detail page response
+
+    Returns:
+        ListingRecord: The extracted fields, with defaults for anything missing
+    """
+    record = ListingRecord()
+    posting_data_script = None
+    title_text = None
+    content_texts = []
+    post_id_text = None
+    timestamps = []
+    gallery_images = []
+
+    for element in DETAIL_FIELDS_XPATH(response.selector.root):
+        tag = element.tag
+        if tag == "script":
+            if posting_data_script is None and element.text is not None:
+                posting_data_script = element.text
+        elif tag == "span":
+            if title_text is None:
+                title_text = _first_text([element])
+        elif tag == "section":
+            content_texts.extend(_text_nodes(element))
+        elif tag == "p":
+            if post_id_text is None:
+                post_id_text = _first_text([element])
+            if "reveal" in _classes(element):
+                for time_element in TIMESTAMP_XPATH(element):
+                    timestamps.extend(_text_nodes(time_element))
+        elif tag == "div":
+            _add_attribute(record.attribute_group, element)
+        elif tag == "a":
+            gallery_images.append(element.get("href"))
+        elif tag == "img":
+            gallery_images.append(element.get("src"))
+
+    used_json_ld = False
+    if posting_data_script:
+        try:
+            posting_data = json.loads(posting_data_script.strip())
+            title = posting_data.get("name", TITLE_NOT_FOUND)
+            content = posting_data.get("description", CONTENT_NOT_FOUND)
+            price = posting_data.get("offers", {}).get("price", "Price Not Found")
+            record.title, record.content, record.price = title, content, price
+            record.images = _image_urls(posting_data.get("image"))
+            used_json_ld = True
+        except (json.JSONDecodeError, AttributeError) as e:
+            Logger.warning(f"Failed to parse JSON-LD data: {e}", component="SPIDER")
+
+    if not used_json_ld:
+        if title_text:
+            record.title = title_text.strip()
+        content = " ".join(text.strip() for text in content_texts if text.strip())
+        if content:
+            record.content = content
+
+    # The same photo is usually listed in both the JSON-LD and the gallery
+    record.images = list(dict.fromkeys(
+        response.urljoin(url.strip()) for url in record.images + gallery_images if url and url.strip()
+    ))
+
+    record.post_id = _parse_post_id(post_id_text)
+    if len(timestamps) > 1:
+        record.updated_at = timestamps[1]
+    elif timestamps:
+        record.updated_at = timestamps[0]
+    else:
+        Logger.warning("No timestamp elements found", component="SPIDER")
+    return record
+
+
+def _image_urls(value: Any) -> List[str]:
+    """JSON-LD `image` is a URL, an ImageObject or a list of either."""
+    if not isinstance(value, list):
+        value = [value]
+    urls = []
+    for entry in value:
+        if isinstance(entry, dict):
+            entry = entry.get("contentUrl") or entry.get("url")
+        if isinstance(entry, str):
+            urls.append(entry)
+    return urls
+
+
+def _parse_post_id(post_id_text: Optional[str]) -> Optional[int]:
+    if not post_id_text:
+        Logger.warning("Post ID element not found", component="SPIDER")
+        return None
+    colon_index = post_id_text.find(':')
+    if colon_index == -1:
+        Logger.warning(f"Post ID format unexpected: {post_id_text}", component="SPIDER")
+        return None
+    id_part = post_id_text[colon_index + 2:].strip()
+    try:
+        return int(id_part)
+    except ValueError as e:
+        Logger.warning(f"Failed to convert post ID to integer: {e}", component="SPIDER")
+        return None
+
+
+def _add_attribute(attrs: Dict[str, str], row) -> None:
+    key = _first_text(LABEL_XPATH(row))
+    value = _first_text(VALUE_LINK_XPATH(row))
+    if value is None:
+        texts = [text for span in VALUE_XPATH(row) for text in _text_nodes(span)]
+        value = " ".join(v.strip() for v in texts)
+    else:
+        value = value.strip()
+
+    if key and value:
+        attrs[key.strip().rstrip(":")] = value
@@ -0,0 +1,51 @@
+"""
+Thumbnails and perceptual hashes of listing photos.
+
+`make_thumbnail` runs in worker processes, so this module only imports the
+standard library at import time; Pillow is imported by the workers that use it.
+"""
+import io
+from typing import Tuple
+
+# Bits of the dHash fingerprint: 8 rows of 8 left/right brightness comparisons
+DHASH_SIZE = 8
+
+
+def pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def dhash(image) -> int:
+    """64-bit difference hash: whether each pixel of a 9x8 grayscale copy is brighter than its right neighbor."""
+    from PIL import Image
+    small = image.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.BOX)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(DHASH_SIZE):
+        offset = row * (DHASH_SIZE + 1)
+        for col in range(DHASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def make_thumbnail(data: bytes, max_side: int, quality: int) -> Tuple[bytes, int, int, int]:
+    """
+    Downscale a photo to fit in a `max_side` square and re-encode it as JPEG.
+
+    Returns:
+        The JPEG bytes, the photo's dHash and the thumbnail's width and height
+    """
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as image:
+        # Lets the JPEG decoder skip most of the full-size pixels
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+    image.thumbnail((max_side, max_side), Image.Resampling.BICUBIC, reducing_gap=2.0)
+    fingerprint = dhash(image)
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=quality, optimize=True)
+    return out.getvalue(), fingerprint, image.width, image.height
@@ -14,3 +14,7 @@ class ListingItem(scrapy.Item):
     updated_at = scrapy.Field()
     content = scrapy.Field()
     url = scrapy.Field()
+    search = scrapy.Field()
+    region = scrapy.Field()
+    images = scrapy.Field()
+    thumbnails = scrapy.Field()
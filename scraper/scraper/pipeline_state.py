@@ -0,0 +1,111 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from utilities.config import Config
+from utilities.logger import Logger
+from utilities.metrics import Metrics
+
+
+class PipelineState:
+    """
+    Indexes, stores and process pools the item pipelines keep between crawls.
+
+    Loading the relevance index, opening the duplicate index, the image cache
+    and the listing archive and starting the photo process pool can cost more
+    than crawling one search in one region. A crawl worker therefore builds one
+    state and hands it to the spider of every job it runs, and the pipelines
+    take these from the spider instead of building their own; a spider given
+    none builds a state for its one crawl. Each part is only created when a
+    pipeline first asks for it, so disabled stages cost nothing.
+
+    `close` saves the pre-rank statistics, writes out the archive's buffered
+    rows and stops the photo pool; the state can still be used afterwards.
+    """
+
+    def __init__(self):
+        self._relevance_index = None
+        self._duplicate_index = None
+        self._image_cache = None
+        self._image_pool = None
+        self._archive = None
+
+    @property
+    def relevance_index(self):
+        if self._relevance_index is None:
+            from scraper.scraper.relevance import RelevanceIndex
+            self._relevance_index = RelevanceIndex(Config.get('prerank_state_path', 'data/prerank.npz'))
+        return self._relevance_index
+
+    @property
+    def duplicate_index(self):
+        if self._duplicate_index is None:
+            from storage.duplicate_index import DuplicateIndex
+            config = Config.current()
+            self._duplicate_index = DuplicateIndex(
+                config.get('dedupe_index_path', 'data/duplicates.sqlite3'),
+                max_distance=config.get('dedupe_max_distance', 3),
+                price_tolerance=config.get('dedupe_price_tolerance', 0.1),
+            )
+        return self._duplicate_index
+
+    @property
+    def image_cache(self):
+        if self._image_cache is None:
+            from storage.image_cache import ImageCache
+            self._image_cache = ImageCache(Config.get('image_cache_path', 'data/images.sqlite3'))
+        return self._image_cache
+
+    @property
+    def image_pool(self) -> ProcessPoolExecutor:
+        if self._image_pool is None:
+            # Spawned rather than forked: the crawler process already runs the reactor and several threads
+            self._image_pool = ProcessPoolExecutor(
+                max_workers=Config.get('image_workers', 2),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._image_pool
+
+    @property
+    def archive(self):
+        if self._archive is None:
+            from storage.listing_archive import ListingArchive
+            config = Config.current()
+            self._archive = ListingArchive(
+                config.get('archive_path', 'data/archive'),
+                format=config.get('archive_format', 'auto'),
+                flush_rows=config.get('archive_flush_rows', 1000),
+            )
+        return self._archive
+
+    def archive_listing(self, listing, score, status, stats=None):
+        """
+        Append a scraped listing to the archive, unless `archive_enabled` is off.
+
+        Every stage that ends a listing's way through the pipelines archives
+        it, so dropped listings are kept alongside the scored ones.
+        """
+        if not Config.get('archive_enabled', True):
+            return
+        try:
+            self.archive.append(listing, score, status)
+        except Exception as e:
+            # Losing archive rows must never cost the run its alerts
+            Logger.error(f"Failed to archive listing: {e}", component="PIPELINE", context={"url": listing.get("url")})
+            return
+        if stats is not None:
+            stats.inc_value("archive/rows")
+        Metrics.inc("archive_rows_total", labels={"status": status})
+
+    def close(self):
+        if self._relevance_index is not None:
+            self._relevance_index.save()
+        if self._archive is not None:
+            self._archive.flush()
+            Logger.log("Listing archive written", component="PIPELINE", context={
+                "path": self._archive.path,
+                "format": self._archive.format,
+                "rows": self._archive.rows_written,
+                "files": self._archive.files_written,
+            })
+        if self._image_pool is not None:
+            self._image_pool.shutdown(wait=True)
+            self._image_pool = None
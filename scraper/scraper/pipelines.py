@@ -4,50 +4,603 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 
+import asyncio
+import math
+import time
 from utilities.config import Config
 from utilities.logger import Logger
-from twisted.internet.threads import deferToThread
-from twisted.internet.defer import DeferredList
+from utilities.metrics import Metrics, SIZE_BUCKETS
+from scrapy import Request
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.utils.defer import deferred_from_coro, maybe_deferred_to_future
+from twisted.internet.defer import Deferred, DeferredList
 from llm.client import ListingEvaluatorLLMClient
+from llm.tokens import estimate_completion_tokens
+from scraper.scraper.extractor import CONTENT_NOT_FOUND, TITLE_NOT_FOUND
+from scraper.scraper.images import make_thumbnail, pillow_available
+from scraper.scraper.relevance import keep_mask, listing_text, tokenize
+from storage.duplicate_index import simhash
+from storage.seen_store import SeenStore
+
+PRERANK_SCORE_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, math.inf)
+
+class _Batch:
+    """Listings buffered for one search, waiting to be sent to the LLM."""
+
+    def __init__(self, search, overhead_tokens):
+        self.search = search
+        self.overhead_tokens = overhead_tokens
+        self.listings = []
+        self.enqueued_at = []
+        self.tokens = 0
+        self.timer = None
+
+
+class _Window:
+    """Changed listings of one search in one region waiting to be pre-ranked together."""
+
+    def __init__(self, search, region):
+        self.search = search
+        self.region = region
+        self.query = tokenize(" ".join((search.query,) + tuple(search.details)))
+        self.entries = []
+        self.timer = None
+
+
+class DuplicateFilterPipeline:
+    """
+    Collapses reposts and cross-posts before they cost an LLM call.
+
+    Every new or changed listing gets a SimHash fingerprint of its title and
+    description, looked up in a persistent `DuplicateIndex` of the search's
+    listings from every earlier run and from the same region in this run.
+    Copies posted to other regions during this run are not matched here, as
+    which copy came first would depend on how the crawl was scheduled; the
+    engine ranks only one of them. A listing within
+    `dedupe_max_distance` bits and `dedupe_price_tolerance` of the price of an
+    earlier one is linked to that canonical listing and dropped; if the
+    canonical listing was already scored, the score is carried over in the seen
+    store so the copy is skipped like any scored listing from then on. A
+    listing without any title or description text (only the extractor's
+    placeholders) would fingerprint like every other such listing, so it is
+    neither checked nor indexed. Dropped copies are archived with the status
+    "duplicate" and any carried score. Disabled unless `dedupe_enabled` is set.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not Config.get('dedupe_enabled', False):
+            raise NotConfigured
+        return cls(stats=crawler.stats, state=crawler.spider.pipeline_state)
+
+    def __init__(self, stats, state):
+        self.state = state
+        self.index = state.duplicate_index
+        self.stats = stats
+        self.seen_store = SeenStore()
+        # URLs indexed by this crawl, per (search, region)
+        self.indexed = {}
+        self.unique = 0
+        self.duplicates = 0
+        self.scores_carried = 0
+
+    def process_item(self, item, spider):
+        if not self.seen_store.is_changed(item):
+            return item
+
+        title = item.get("title") if item.get("title") != TITLE_NOT_FOUND else ""
+        content = item.get("content") if item.get("content") != CONTENT_NOT_FOUND else ""
+        if not tokenize(f"{title or ''} {content or ''}"):
+            self.stats.inc_value("dedupe/no_text")
+            Metrics.inc("dedupe_listings_total", labels={"result": "no_text"})
+            return item
+
+        url = item.get("url")
+        search = item.get("search") or ""
+        indexed = self.indexed.setdefault((search, item.get("region")), set())
+        with Metrics.span("dedupe_seconds"):
+            fingerprint = simhash(title or "", content or "")
+            match = self.index.find_canonical(
+                fingerprint,
+                item.get("price"),
+                search,
+                exclude_url=url,
+                indexed_before=spider.run_started_at,
+                also_urls=indexed,
+            )
+        indexed.add(url)
+        if match is None:
+            self.index.add(url, fingerprint, item.get("price"), search)
+            self.unique += 1
+            self.stats.inc_value("dedupe/unique")
+            Metrics.inc("dedupe_listings_total", labels={"result": "unique"})
+            return item
+
+        canonical_url = match["canonical_url"]
+        self.index.add(url, fingerprint, item.get("price"), search, canonical_url=canonical_url)
+        self.seen_store.record_item(item)
+        score = self._canonical_score(canonical_url, match["url"], search)
+        if score is not None:
+            # The copy is now a scored listing, so later runs skip its detail page too
+            self.seen_store.record_scores([(score, url)], search)
+            self.scores_carried += 1
+            self.stats.inc_value("dedupe/scores_carried")
+        self.state.archive_listing(dict(item), score, "duplicate", self.stats)
+        self.duplicates += 1
+        self.stats.inc_value("dedupe/duplicates")
+        Metrics.inc("dedupe_listings_total", labels={"result": "duplicate"})
+        raise DropItem(
+            f"Near-duplicate of {canonical_url} (distance {match['distance']}, score {score})",
+            log_level="DEBUG",
+        )
+
+    def _canonical_score(self, canonical_url, matched_url, search):
+        """The canonical listing's score, or the matched copy's if the canonical one was never scored."""
+        for candidate in dict.fromkeys((canonical_url, matched_url)):
+            row = self.seen_store.lookup(url=candidate, search=search)
+            if row is not None and row["score"] is not None:
+                return row["score"]
+        return None
+
+    def close_spider(self, spider):
+        Logger.log("Duplicate filter stats", component="PIPELINE", context={
+            "unique": self.unique,
+            "duplicates": self.duplicates,
+            "scores_carried": self.scores_carried,
+            "indexed": self.index.count(),
+        })
+
+
+class RelevancePrerankPipeline:
+    """
+    Local BM25 pre-ranking in front of LLMBufferPipeline.
+
+    New or changed listings are held per search and region in windows of
+    `prerank_window` items, which the spider fills in search results order,
+    and scored against the search's query and details in one vectorized
+    pass. Only listings in the top `prerank_keep_fraction` of their window, or
+    scoring at least `prerank_min_score` (0-1), continue to the LLM; the rest
+    are dropped, archived with the status "prerank_dropped" and marked as
+    such in the seen store, without a score, so later runs skip their detail
+    pages until their price or updated_at changes. A partial window is released `prerank_max_wait_seconds` (which
+    must be positive) after it was opened, or later if more of its search
+    results are still being fetched: cutting a window short would make what is
+    kept depend on download timing. Term statistics persist in `prerank_state_path`
+    and grow with every run, counting each version of a listing (post id and
+    updated_at) once, however often it is pre-ranked; within a run every
+    window is scored against the statistics it started with (see
+    RelevanceIndex). Disabled unless `prerank_enabled` is set.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not Config.get('prerank_enabled', False):
+            raise NotConfigured
+        return cls(
+            llm_client=getattr(crawler.spider, "llm_client"),
+            stats=crawler.stats,
+            state=crawler.spider.pipeline_state,
+        )
+
+    def __init__(self, llm_client: ListingEvaluatorLLMClient, stats, state):
+        config = Config.current()
+        self.window_size = config.get('prerank_window', 20)
+        self.keep_fraction = config.get('prerank_keep_fraction')
+        self.min_score = config.get('prerank_min_score')
+        self.max_wait = config.get('prerank_max_wait_seconds', 2)
+        self.state = state
+        self.index = state.relevance_index
+        self.llm_client = llm_client
+        self.stats = stats
+        self.seen_store = SeenStore()
+        # Listing versions counted into the term statistics by this crawl
+        self.counted = set()
+        self.windows = {}
+        self.kept = 0
+        self.dropped = 0
+        self.tokens_saved = 0
+
+    def process_item(self, item, spider):
+        if not self.seen_store.is_changed(item):
+            return item
+
+        window = self._window_for(item.get("search") or "", item.get("region"), spider)
+        d = Deferred()
+        window.entries.append((item, d))
+        if len(window.entries) >= self.window_size:
+            self._flush(window)
+        elif window.timer is None:
+            self._schedule(window, spider)
+        return d
+
+    def _schedule(self, window, spider):
+        from twisted.internet import reactor
+        window.timer = reactor.callLater(self.max_wait, self._timed_out, window, spider)
+
+    def _timed_out(self, window, spider):
+        window.timer = None
+        if spider.results_pending(window.search.name, window.region):
+            self._schedule(window, spider)
+            return
+        self._flush(window)
+
+    def _window_for(self, search_name, region, spider):
+        key = (search_name, region)
+        if key not in self.windows:
+            search = next((s for s in spider.searches if s.name == search_name), spider.searches[0])
+            self.windows[key] = _Window(search, region)
+        return self.windows[key]
+
+    def _flush(self, window):
+        if window.timer is not None:
+            if window.timer.active():
+                window.timer.cancel()
+            window.timer = None
+        if not window.entries:
+            return
+
+        entries = window.entries
+        window.entries = []
+        with Metrics.span("prerank_seconds"):
+            doc_ids = self.index.add_documents(
+                [tokenize(listing_text(item)) for item, _ in entries],
+                count=[self._first_count(item) for item, _ in entries],
+            )
+            scores = self.index.score(window.query, doc_ids)
+            keep = keep_mask(scores, self.keep_fraction, self.min_score)
+
+        dropped_tokens = 0
+        for (item, d), score, kept in zip(entries, scores, keep):
+            Metrics.observe("prerank_score", float(score), buckets=PRERANK_SCORE_BUCKETS)
+            if kept:
+                self.kept += 1
+                d.callback(item)
+                continue
+            self.dropped += 1
+            dropped_tokens += self.llm_client.listing_tokens(dict(item))
+            self.seen_store.record_prerank_drop(item)
+            self.state.archive_listing(dict(item), None, "prerank_dropped", self.stats)
+            d.errback(DropItem(f"Pre-ranker score {score:.3f} too low for {window.search.name}", log_level="DEBUG"))
+
+        self.tokens_saved += dropped_tokens
+        self.stats.inc_value("prerank/kept", int(keep.sum()))
+        self.stats.inc_value("prerank/dropped", int((~keep).sum()))
+        self.stats.inc_value("prerank/tokens_saved", dropped_tokens)
+        Metrics.inc("prerank_listings_total", int(keep.sum()), {"result": "kept"})
+        Metrics.inc("prerank_listings_total", int((~keep).sum()), {"result": "dropped"})
+        Metrics.inc("prerank_tokens_saved_total", dropped_tokens)
+        Logger.log("Pre-ranked listings", component="PIPELINE", context={
+            "search": window.search.name,
+            "region": window.region,
+            "kept": int(keep.sum()),
+            "dropped": int((~keep).sum()),
+            "estimated_tokens_saved": dropped_tokens,
+        })
+
+    def _first_count(self, item):
+        """Whether this version of the listing has not been counted into the term statistics yet."""
+        key = (item.get("post_id") or item.get("url"), item.get("updated_at"))
+        if key in self.counted:
+            return False
+        self.counted.add(key)
+        # A version already in the seen store was pre-ranked by an earlier run or search
+        return not self.seen_store.has_version(item)
+
+    def close_spider(self, spider):
+        for window in self.windows.values():
+            self._flush(window)
+        Logger.log("Pre-ranker saved LLM tokens", component="PIPELINE", context={
+            "kept": self.kept,
+            "dropped": self.dropped,
+            "estimated_tokens_saved": self.tokens_saved,
+            "corpus_documents": self.index.documents_counted,
+            "vocabulary": len(self.index.vocabulary),
+        })
+
+
+class ListingImagesPipeline:
+    """
+    Attaches small thumbnails of a listing's photos for the LLM to look at.
+
+    Runs after the pre-ranker, so only listings on their way to the LLM have
+    photos fetched. Up to twice `image_max_per_listing` photo URLs per listing
+    are downloaded as requests through the spider's scheduler (sharing its
+    download slots, middlewares and HTTP cache), then downscaled to fit
+    `image_max_side` pixels and hashed (dHash) in a pool of `image_workers`
+    processes. A photo URL seen before is never downloaded again and a photo
+    already stored is not stored twice (see ImageCache). Photos within
+    `image_dedupe_distance` bits of one already attached to the listing are
+    skipped, and at most `image_max_per_listing` thumbnail paths are set on
+    the item's `thumbnails` field. Disabled unless `image_stage_enabled` is
+    set; needs Pillow.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not Config.get('image_stage_enabled', False):
+            raise NotConfigured
+        if not pillow_available():
+            Logger.warning("Image stage is enabled but Pillow is not installed, skipping photos", component="PIPELINE")
+            raise NotConfigured
+        return cls(crawler)
+
+    def __init__(self, crawler):
+        config = Config.current()
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.max_per_listing = config.get('image_max_per_listing', 2)
+        self.max_side = config.get('image_max_side', 256)
+        self.quality = config.get('image_jpeg_quality', 60)
+        self.dedupe_distance = config.get('image_dedupe_distance', 6)
+        self.max_download_bytes = config.get('image_max_download_bytes', 4 * 1024 * 1024)
+        self.state = crawler.spider.pipeline_state
+        self.cache = self.state.image_cache
+        self.seen_store = SeenStore()
+
+    def process_item(self, item, spider):
+        if not item.get("images") or not self.seen_store.is_changed(item):
+            return item
+        return deferred_from_coro(self._attach_thumbnails(item))
+
+    async def _attach_thumbnails(self, item):
+        thumbnails, hashes = [], []
+        for url in item["images"][:2 * self.max_per_listing]:
+            if len(thumbnails) >= self.max_per_listing:
+                break
+            cached = self.cache.lookup(url)
+            if cached is not None:
+                self.stats.inc_value("images/cached")
+                Metrics.inc("images_total", labels={"result": "cached"})
+                fingerprint, path = cached
+            else:
+                thumbnail = await self._fetch_thumbnail(url)
+                if thumbnail is None:
+                    continue
+                fingerprint, path = thumbnail
+
+            if any(bin(fingerprint ^ other).count("1") <= self.dedupe_distance for other in hashes):
+                self.stats.inc_value("images/duplicates")
+                Metrics.inc("images_total", labels={"result": "duplicate"})
+                continue
+            hashes.append(fingerprint)
+            thumbnails.append(path)
+
+        item["thumbnails"] = thumbnails
+        self.stats.inc_value("images/attached", len(thumbnails))
+        Metrics.observe("images_per_listing", len(thumbnails), buckets=SIZE_BUCKETS)
+        return item
+
+    async def _fetch_thumbnail(self, url):
+        """Download a photo and store its thumbnail; returns its hash and thumbnail path, or None on failure."""
+        try:
+            response = await maybe_deferred_to_future(self._download(url))
+            self.stats.inc_value("images/downloaded")
+            self.stats.inc_value("images/downloaded_bytes", len(response.body))
+            Metrics.inc("image_download_bytes_total", len(response.body))
+            Metrics.observe("download_seconds", response.meta.get("download_latency"), {"page": "image"})
+            with Metrics.span("image_thumbnail_seconds"):
+                data, fingerprint, width, height = await asyncio.wrap_future(
+                    self.state.image_pool.submit(make_thumbnail, response.body, self.max_side, self.quality)
+                )
+        except Exception as e:
+            self.stats.inc_value("images/failed")
+            Metrics.inc("images_total", labels={"result": "failed"})
+            Logger.warning(f"Could not fetch listing photo: {e}", component="PIPELINE", context={"url": url})
+            return None
+
+        path, existed = self.cache.add(url, fingerprint, data, width, height)
+        result = "reused" if existed else "stored"
+        self.stats.inc_value(f"images/{result}")
+        Metrics.inc("images_total", labels={"result": result})
+        return fingerprint, path
+
+    def _download(self, url):
+        """Queue a photo request in the spider's scheduler; the Deferred fires with its response."""
+        d = Deferred()
+        self.crawler.engine.crawl(Request(
+            url,
+            callback=d.callback,
+            errback=d.errback,
+            # Ahead of detail pages, so listings already in the pipeline finish first
+            priority=10,
+            dont_filter=True,
+            meta={"download_maxsize": self.max_download_bytes},
+        ))
+        return d
+
 
 class LLMBufferPipeline:
+    """
+    Buffers scraped listings and sends them to the LLM in batches.
+
+    Each saved search has its own buffer, since a batch is evaluated against a
+    single search's criteria, but all searches share the LLM client and its
+    concurrency limit.
+
+    Batches are packed by estimated tokens rather than item count: a batch is
+    dispatched once adding the next listing would exceed the prompt token
+    budget, the expected reply would not fit in `max_tokens`, or `batch_size`
+    items are buffered. A timer flushes a partially filled batch after
+    `batch_max_wait_seconds` so a slow trickle of items is not held until the
+    spider closes.
+
+    Every listing that reaches this stage is appended to the listing archive
+    with its score once it has one: unchanged listings right away with their
+    stored score, the rest when their batch has been evaluated. Disabled with
+    `archive_enabled`.
+    """
+
     @classmethod
     def from_crawler(cls, crawler):
         return cls(
-            llm_client=getattr(crawler.spider, "llm_client")
+            llm_client=getattr(crawler.spider, "llm_client"),
+            stats=crawler.stats,
+            state=crawler.spider.pipeline_state,
         )
 
-    def __init__(self, llm_client: ListingEvaluatorLLMClient):
-        self.batch_size = Config.get('batch_size')
-        self.buffer = []
+    def __init__(self, llm_client: ListingEvaluatorLLMClient, stats, state):
+        config = Config.current()
+        self.batch_size = config.batch_size
+        self.prompt_token_budget = config.get('batch_prompt_token_budget', 8000)
+        # Leave headroom in the reply budget since completion estimates are rough
+        self.completion_token_budget = int(config.max_tokens * 0.8)
+        self.max_wait = config.get('batch_max_wait_seconds', 30)
+        self.batches = {}
         self.llm_client = llm_client
+        self.stats = stats
+        self.seen_store = SeenStore()
         self._pending_evaluations = []
+        self._batch_sizes = []
+        self._fill_ratios = []
+        self.state = state
+        self.archive = config.get('archive_enabled', True)
 
     def process_item(self, item, spider):
-        self.buffer.append(item)
-        
-        if len(self.buffer) >= self.batch_size:
-            batch = [dict(i) for i in self.buffer]
-            self.buffer.clear()
-            Logger.log(f"Dispatching LLM evaluation for batch size: {len(batch)}", component="PIPELINE")
-            d = deferToThread(self._evaluate_batch, batch)
-            self._pending_evaluations.append(d)
-        
+        if not self.seen_store.is_changed(item):
+            self.stats.inc_value("seen_store/unchanged_items", spider=spider)
+            Metrics.inc("listings_unchanged_total")
+            if self.archive:
+                row = self.seen_store.lookup(url=item.get("url"), post_id=item.get("post_id"), search=item.get("search") or "")
+                self._archive(dict(item), row["score"] if row else None, "unchanged")
+            return item
+
+        self.seen_store.record_item(item)
+        listing = dict(item)
+        batch = self._batch_for(listing.get("search") or "", spider)
+        tokens = self.llm_client.listing_tokens(listing)
+
+        reason = self._overflow_reason(batch, tokens)
+        if reason:
+            self._flush(batch, reason)
+
+        batch.listings.append(listing)
+        batch.enqueued_at.append(time.monotonic())
+        batch.tokens += tokens
+        if len(batch.listings) >= self.batch_size:
+            self._flush(batch, "size")
+        elif batch.timer is None and self.max_wait:
+            from twisted.internet import reactor
+            batch.timer = reactor.callLater(self.max_wait, self._flush, batch, "timeout")
+
         return item
 
+    def _batch_for(self, search_name, spider):
+        if search_name not in self.batches:
+            search = next((s for s in spider.searches if s.name == search_name), spider.searches[0])
+            self.batches[search_name] = _Batch(search, self.llm_client.prompt_overhead_tokens(search))
+        return self.batches[search_name]
+
+    def _overflow_reason(self, batch, tokens):
+        """Return why `batch` must go out before a listing of `tokens` is added, if it must."""
+        if not batch.listings:
+            return None
+        if batch.overhead_tokens + batch.tokens + tokens > self.prompt_token_budget:
+            return "prompt_tokens"
+        if estimate_completion_tokens(len(batch.listings) + 1) > self.completion_token_budget:
+            return "completion_tokens"
+        return None
+
+    def _flush(self, batch, reason):
+        if batch.timer is not None:
+            if batch.timer.active():
+                batch.timer.cancel()
+            batch.timer = None
+        if not batch.listings:
+            return
+
+        listings = batch.listings
+        prompt_tokens = batch.overhead_tokens + batch.tokens
+        fill_ratio = prompt_tokens / self.prompt_token_budget
+        now = time.monotonic()
+        for enqueued_at in batch.enqueued_at:
+            Metrics.observe("pipeline_buffer_wait_seconds", now - enqueued_at)
+        batch.listings = []
+        batch.enqueued_at = []
+        batch.tokens = 0
+
+        self._batch_sizes.append(len(listings))
+        self._fill_ratios.append(fill_ratio)
+        self.stats.inc_value("llm_batch/count")
+        self.stats.inc_value(f"llm_batch/flush_reason/{reason}")
+        self.stats.inc_value("llm_batch/estimated_prompt_tokens", prompt_tokens)
+        self.stats.max_value("llm_batch/max_size", len(listings))
+        Metrics.inc("llm_batches_total", labels={"reason": reason})
+        Metrics.observe("llm_batch_size", len(listings), buckets=SIZE_BUCKETS)
+        Logger.log(f"Dispatching LLM evaluation for batch size: {len(listings)}", component="PIPELINE", context={
+            "search": batch.search.name,
+            "reason": reason,
+            "estimated_prompt_tokens": prompt_tokens,
+            "fill_ratio": round(fill_ratio, 3),
+        })
+        d = deferred_from_coro(self._evaluate_batch(listings, batch.search))
+        self._pending_evaluations.append(d)
+
     def close_spider(self, spider):
-        if self.buffer:
-            batch = [dict(i) for i in self.buffer]
-            self.buffer.clear()
-            Logger.log(f"Flushing final LLM evaluation batch size: {len(batch)}", component="PIPELINE")
-            d = deferToThread(self._evaluate_batch, batch)
-            self._pending_evaluations.append(d)
+        for batch in self.batches.values():
+            self._flush(batch, "close")
+        self._report_batch_stats()
 
         if self._pending_evaluations:
-            return DeferredList(self._pending_evaluations, consumeErrors=True)
+            d = DeferredList(self._pending_evaluations, consumeErrors=True)
+            d.addBoth(lambda _: self._finish(spider))
+            return d
+        self._finish(spider)
+
+    def _finish(self, spider):
+        self._report_llm_stats(spider)
+
+    def _archive(self, listing, score, status):
+        # Written out when the pipeline state is closed, possibly after several crawls
+        self.state.archive_listing(listing, score, status, self.stats)
+
+    def _report_batch_stats(self):
+        if not self._batch_sizes:
+            return
+        avg_size = sum(self._batch_sizes) / len(self._batch_sizes)
+        avg_fill = sum(self._fill_ratios) / len(self._fill_ratios)
+        self.stats.set_value("llm_batch/avg_size", round(avg_size, 2))
+        self.stats.set_value("llm_batch/avg_fill_ratio", round(avg_fill, 3))
+        Logger.log("LLM batching stats", component="PIPELINE", context={
+            "batches": len(self._batch_sizes),
+            "sizes": self._batch_sizes,
+            "avg_fill_ratio": round(avg_fill, 3),
+        })
+
+    def _report_llm_stats(self, spider):
+        cache_stats = self.llm_client.cache.stats()
+        for key in ("hits", "misses", "evictions"):
+            self.stats.set_value(f"llm_cache/{key}", cache_stats[key], spider=spider)
+        Logger.log("LLM evaluation cache stats", component="PIPELINE", context=cache_stats)
+
+        prompt_metrics = self.llm_client.prompt_metrics
+        for key, value in prompt_metrics.items():
+            self.stats.set_value(f"llm_prompt/{key}", value, spider=spider)
+        if prompt_metrics["batches"]:
+            self.stats.set_value("llm_prompt/avg_bytes_per_batch", prompt_metrics["prompt_bytes"] // prompt_metrics["batches"], spider=spider)
+        Logger.log("LLM prompt stats", component="PIPELINE", context=prompt_metrics)
+
+        recovery_metrics = self.llm_client.recovery_metrics
+        for key, value in recovery_metrics.items():
+            self.stats.set_value(f"llm_recovery/{key}", value, spider=spider)
+        Logger.log("LLM recovery stats", component="PIPELINE", context=recovery_metrics)
+
+        for tier in self.llm_client.tiers:
+            for key, value in tier.stats.items():
+                self.stats.set_value(f"llm_tier/{tier.name}/{key}", round(value, 3) if isinstance(value, float) else value, spider=spider)
+            if tier.stats["requests"]:
+                self.stats.set_value(f"llm_tier/{tier.name}/avg_request_seconds", round(tier.stats["request_seconds"] / tier.stats["requests"], 3), spider=spider)
+            Logger.log("LLM tier stats", component="PIPELINE", context={"tier": tier.name, "model": tier.model, **tier.stats})
 
-    def _evaluate_batch(self, batch):
+    async def _evaluate_batch(self, listings, search):
+        results = []
         try:
-            self.llm_client.evaluate_listings(batch)
+            with Metrics.span("llm_batch_seconds"):
+                results = await self.llm_client.evaluate_listings(listings, search)
         except Exception as e:
+            Metrics.inc("llm_batch_failures_total")
             Logger.error(f"Failed to evaluate listings batch: {e}", component="PIPELINE")
+        if self.archive:
+            scores = {url: score for score, url in results}
+            for listing in listings:
+                score = scores.get(listing.get("url"))
+                self._archive(listing, score, "scored" if score is not None else "unscored")
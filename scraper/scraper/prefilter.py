@@ -0,0 +1,93 @@
+import re
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+DISTANCE_PATTERN = re.compile(r"([\d.]+)\s*mi")
+
+
+def parse_price(text: Optional[str]) -> Optional[float]:
+    """Turn "$1,200" into 1200.0; None if there is no usable number."""
+    if not text:
+        return None
+    match = re.search(r"[\d,]+(?:\.\d+)?", str(text))
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def parse_distance(text: Optional[str]) -> Optional[float]:
+    """Turn "2.4mi" into 2.4; None if the result does not show a distance."""
+    if not text:
+        return None
+    match = DISTANCE_PATTERN.search(text)
+    return float(match.group(1)) if match else None
+
+
+class SearchResultPrefilter:
+    """
+    Cheap checks on the data shown on a search results page.
+
+    Runs before any detail page is requested so that obviously wrong results
+    never cost a download. A result with a missing price or distance is kept,
+    since there is not enough information to reject it.
+
+    Args:
+        min_price: Drop results priced below this
+        max_price: Drop results priced above this
+        required_keywords: Every keyword must appear in the title (case-insensitive)
+        excluded_keywords: Drop results whose title contains any of these
+        max_distance: Drop results further than this many miles away
+    """
+
+    def __init__(self,
+                 min_price: Optional[float] = None,
+                 max_price: Optional[float] = None,
+                 required_keywords: Iterable[str] = (),
+                 excluded_keywords: Iterable[str] = (),
+                 max_distance: Optional[float] = None):
+        self.min_price = min_price
+        self.max_price = max_price
+        self.required_keywords = tuple(k.lower() for k in required_keywords)
+        self.excluded_keywords = tuple(k.lower() for k in excluded_keywords)
+        self.max_distance = max_distance
+
+    @classmethod
+    def from_config(cls, options: Optional[Mapping[str, Any]]) -> "SearchResultPrefilter":
+        options = options or {}
+        return cls(
+            min_price=options.get("min_price"),
+            max_price=options.get("max_price"),
+            required_keywords=options.get("required_keywords") or (),
+            excluded_keywords=options.get("excluded_keywords") or (),
+            max_distance=options.get("max_distance"),
+        )
+
+    def drop_reason(self, result: Dict[str, Any]) -> Optional[str]:
+        """
+        Decide whether a search result should be fetched.
+
+        Args:
+            result: Dictionary with the title, price and distance parsed from the results page
+
+        Returns:
+            The reason the result should be dropped, or None to keep it
+        """
+        price = result.get("price")
+        if price is not None:
+            if self.min_price is not None and price < self.min_price:
+                return "min_price"
+            if self.max_price is not None and price > self.max_price:
+                return "max_price"
+
+        title = (result.get("title") or "").lower()
+        if any(keyword in title for keyword in self.excluded_keywords):
+            return "excluded_keyword"
+        if not all(keyword in title for keyword in self.required_keywords):
+            return "required_keyword"
+
+        distance = result.get("distance")
+        if distance is not None and self.max_distance is not None and distance > self.max_distance:
+            return "max_distance"
+        return None
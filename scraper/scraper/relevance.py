@@ -0,0 +1,213 @@
+import fcntl
+import math
+import os
+import re
+import tempfile
+from typing import Iterable, List, Optional, Sequence
+import numpy as np
+from utilities.logger import Logger
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have", "i", "in",
+    "is", "it", "its", "me", "my", "of", "on", "or", "so", "that", "the", "this", "to", "was", "will",
+    "with", "you", "your",
+))
+# Fields of a listing that describe it; url, post_id and timestamps would only add noise
+TEXT_FIELDS = ("title", "content", "attribute_group")
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def listing_text(listing: dict) -> str:
+    parts = []
+    for field in TEXT_FIELDS:
+        value = listing.get(field)
+        if isinstance(value, dict):
+            parts.extend(f"{key} {val}" for key, val in value.items())
+        elif value:
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+class RelevanceIndex:
+    """
+    BM25 corpus statistics that grow with every listing the bot scores.
+
+    The vocabulary and per-term document frequencies are kept in NumPy arrays
+    and saved to `path` (an .npz file) so IDF keeps improving across runs.
+    `score` rates a batch of documents against a query in one vectorized pass
+    and normalizes the result to [0, 1] by the best score the query could get.
+
+    Scores use the statistics as loaded plus the scored documents themselves.
+    Documents counted with `add_documents` only take effect once saved, so a
+    batch scores the same whichever batches of the run were ranked before it,
+    in this process or another. Several crawl workers may share `path`: `save`
+    adds the documents this index counted to whatever is on disk at that
+    moment, under a file lock, so concurrent workers never discard each
+    other's counts.
+
+    Args:
+        path: Where the statistics are persisted; None keeps them in memory only
+        k1: BM25 term frequency saturation
+        b: BM25 document length normalization
+    """
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self._df = np.zeros(1024, dtype=np.int64)
+        self.n_docs = 0
+        self.total_length = 0
+        # Counted since loading and not saved yet, aligned with _df; not used for scoring
+        self._added_df = np.zeros(1024, dtype=np.int64)
+        self._added_docs = 0
+        self._added_length = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        state = self._read(self.path)
+        if state is None:
+            return
+        terms, df, self.n_docs, self.total_length = state
+        self.vocabulary = {term: index for index, term in enumerate(terms)}
+        self._df = np.zeros(max(1024, 2 * len(terms)), dtype=np.int64)
+        self._df[:len(terms)] = df
+        self._added_df = np.zeros(len(self._df), dtype=np.int64)
+
+    def _read(self, path):
+        """(terms, df, n_docs, total_length) stored at `path`, or None if it cannot be read."""
+        try:
+            with np.load(path, allow_pickle=False) as state:
+                return [str(term) for term in state["terms"]], state["df"], int(state["n_docs"]), int(state["total_length"])
+        except (OSError, KeyError, ValueError) as e:
+            Logger.warning(f"Could not load relevance index, starting empty: {e}", component="PRERANK", context={"path": path})
+            return None
+
+    def save(self):
+        """Add the documents counted since the last load or save to the statistics on disk."""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            stored = self._read(self.path) if os.path.exists(self.path) else None
+            terms, df, n_docs, total_length = stored or ([], np.zeros(0, dtype=np.int64), 0, 0)
+            positions = {term: index for index, term in enumerate(terms)}
+            terms = list(terms)
+            for term in self.vocabulary:
+                if term not in positions:
+                    positions[term] = len(terms)
+                    terms.append(term)
+            merged = np.zeros(len(terms), dtype=np.int64)
+            merged[:len(df)] = df
+            ids = np.fromiter(self.vocabulary.values(), dtype=np.int64, count=len(self.vocabulary))
+            merged[np.fromiter((positions[term] for term in self.vocabulary), dtype=np.int64, count=len(ids))] += self._added_df[ids]
+            n_docs += self._added_docs
+            total_length += self._added_length
+
+            # A unique file beside the target, swapped in, so neither an interrupted
+            # save nor another process saving at the same time leaves a broken file
+            with tempfile.NamedTemporaryFile(dir=directory, prefix=os.path.basename(self.path), suffix=".tmp.npz", delete=False) as tmp:
+                np.savez(tmp, terms=np.array(terms, dtype=np.str_), df=merged, n_docs=n_docs, total_length=total_length)
+            os.replace(tmp.name, self.path)
+
+        # Later scores use the merged statistics, which include every other worker's counts
+        self.vocabulary = positions
+        self._df = np.zeros(max(1024, 2 * len(terms)), dtype=np.int64)
+        self._df[:len(terms)] = merged
+        self._added_df = np.zeros(len(self._df), dtype=np.int64)
+        self.n_docs, self.total_length = n_docs, total_length
+        self._added_docs = self._added_length = 0
+
+    @property
+    def documents_counted(self) -> int:
+        """Documents in the statistics, including those not saved yet."""
+        return self.n_docs + self._added_docs
+
+    def _ids(self, tokens: Iterable[str], grow: bool) -> np.ndarray:
+        ids = []
+        for token in tokens:
+            index = self.vocabulary.get(token)
+            if index is None:
+                if not grow:
+                    continue
+                index = self.vocabulary[token] = len(self.vocabulary)
+            ids.append(index)
+        while len(self.vocabulary) > len(self._df):
+            self._df = np.concatenate([self._df, np.zeros(len(self._df), dtype=np.int64)])
+            self._added_df = np.concatenate([self._added_df, np.zeros(len(self._added_df), dtype=np.int64)])
+        return np.asarray(ids, dtype=np.int64)
+
+    def add_documents(self, documents: List[List[str]], count: Optional[Sequence[bool]] = None) -> List[np.ndarray]:
+        """
+        Count `documents` (lists of tokens) into the statistics saved next and return their term ids.
+
+        Args:
+            count: Which documents to count (default = all); the others, e.g.
+                ones already counted by an earlier run, only get term ids
+        """
+        doc_ids = [self._ids(tokens, grow=True) for tokens in documents]
+        counted = doc_ids if count is None else [ids for ids, new in zip(doc_ids, count) if new]
+        if counted:
+            np.add.at(self._added_df, np.concatenate([np.unique(ids) for ids in counted]), 1)
+        self._added_length += sum(len(ids) for ids in counted)
+        self._added_docs += len(counted)
+        return doc_ids
+
+    def score(self, query: List[str], doc_ids: List[np.ndarray]) -> np.ndarray:
+        """
+        Score documents (as returned by `add_documents`) against a tokenized query.
+
+        The documents count towards the corpus statistics of this call only.
+
+        Returns:
+            One score per document in [0, 1]
+        """
+        query_ids = np.unique(self._ids(query, grow=False))
+        if not doc_ids or not len(query_ids):
+            return np.zeros(len(doc_ids))
+
+        n_docs = self.n_docs + len(doc_ids)
+        # Term frequency of every query term in every document, as a (docs, terms) matrix
+        position = np.full(len(self.vocabulary), -1, dtype=np.int64)
+        position[query_ids] = np.arange(len(query_ids))
+        lengths = np.array([len(ids) for ids in doc_ids], dtype=np.float64)
+        all_ids = np.concatenate(doc_ids) if lengths.sum() else np.zeros(0, dtype=np.int64)
+        owners = np.repeat(np.arange(len(doc_ids)), lengths.astype(np.int64))
+        columns = position[all_ids]
+        matched = columns >= 0
+        tf = np.zeros((len(doc_ids), len(query_ids)))
+        np.add.at(tf, (owners[matched], columns[matched]), 1)
+
+        df = self._df[query_ids] + (tf > 0).sum(axis=0)
+        # Query terms that occur nowhere cannot tell documents apart
+        idf = np.where(df > 0, np.log1p((n_docs - df + 0.5) / (df + 0.5)), 0.0)
+        average_length = (self.total_length + lengths.sum()) / n_docs or 1.0
+        norm = self.k1 * (1 - self.b + self.b * lengths / average_length)
+        scores = (idf * tf * (self.k1 + 1) / (tf + norm[:, None])).sum(axis=1)
+        best = (idf * (self.k1 + 1)).sum()
+        return scores / best if best > 0 else scores
+
+
+def keep_mask(scores: np.ndarray, keep_fraction: Optional[float], min_score: Optional[float]) -> np.ndarray:
+    """
+    Decide which documents continue to the LLM.
+
+    A document is kept if it ranks in the top `keep_fraction` of its window
+    or scores at least `min_score`. With neither set, everything is kept.
+    """
+    if keep_fraction is None and min_score is None:
+        return np.ones(len(scores), dtype=bool)
+    keep = np.zeros(len(scores), dtype=bool)
+    if keep_fraction is not None:
+        keep[np.argsort(-scores, kind="stable")[:math.ceil(keep_fraction * len(scores))]] = True
+    if min_score is not None:
+        keep |= scores >= min_score
+    return keep
@@ -7,6 +7,8 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+
 BOT_NAME = "craigslistbot"
 
 SPIDER_MODULES = ["scraper.scraper.spiders"]
@@ -22,15 +24,29 @@ ADDONS = {}
 ROBOTSTXT_OBEY = False
 
 # Concurrency and throttling settings
+# These are the conservative starting point; AdaptiveThrottleMiddleware tunes each
+# subdomain's delay and concurrency from there based on latency and errors
 #CONCURRENT_REQUESTS = 16
 CONCURRENT_REQUESTS_PER_DOMAIN = 1
 DOWNLOAD_DELAY = 1.5
 RANDOMIZE_DOWNLOAD_DELAY = True
+ADAPTIVE_THROTTLE_ENABLED = True
+ADAPTIVE_THROTTLE_MIN_DELAY = 0.25
+ADAPTIVE_THROTTLE_MAX_DELAY = 60
+ADAPTIVE_THROTTLE_MAX_CONCURRENCY = 4
+ADAPTIVE_THROTTLE_TARGET_LATENCY = 2.0
+ADAPTIVE_THROTTLE_WINDOW = 10
+# Per-subdomain overrides of min_delay, max_delay and max_concurrency
+ADAPTIVE_THROTTLE_DOMAINS = {
+    "sfbay.craigslist.org": {"max_concurrency": 4},
+    "sacramento.craigslist.org": {"max_concurrency": 2},
+    "monterey.craigslist.org": {"max_concurrency": 2},
+}
 RETRY_ENABLED = True
 RETRY_TIMES = 3
 
-# Stop conditions
-CLOSESPIDER_ITEMCOUNT = 50
+# Stop conditions. There is no item cap: one crawl covers every search and region,
+# and each search results page is already capped at listing_count_limit
 CLOSESPIDER_TIMEOUT = 600
 CLOSESPIDER_TIMEOUT_NO_ITEM = 30
 
@@ -54,9 +70,11 @@ CLOSESPIDER_TIMEOUT_NO_ITEM = 30
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "scraper.middlewares.ScraperDownloaderMiddleware": 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    "scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware": None,
+    "scraper.scraper.throttle.AdaptiveThrottleMiddleware": 600,
+    "scraper.scraper.httpcache.CraigslistHttpCacheMiddleware": 900,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
@@ -67,6 +85,9 @@ EXTENSIONS = {
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
+    "scraper.scraper.pipelines.DuplicateFilterPipeline": 100,
+    "scraper.scraper.pipelines.RelevancePrerankPipeline": 200,
+    "scraper.scraper.pipelines.ListingImagesPipeline": 250,
     "scraper.scraper.pipelines.LLMBufferPipeline": 300,
 }
 
@@ -85,11 +106,21 @@ ITEM_PIPELINES = {
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
-#HTTPCACHE_ENABLED = True
-#HTTPCACHE_EXPIRATION_SECS = 0
-#HTTPCACHE_DIR = "httpcache"
-#HTTPCACHE_IGNORE_HTTP_CODES = []
-#HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_ENABLED = True
+# Absolute so it does not depend on Scrapy finding a project data dir; sits next to the other local stores
+HTTPCACHE_DIR = os.path.abspath("data/httpcache")
+HTTPCACHE_GZIP = True
+HTTPCACHE_IGNORE_HTTP_CODES = [403, 404, 429, 500, 502, 503, 504]
+HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_POLICY = "scraper.scraper.httpcache.CraigslistCachePolicy"
+# Search pages change often, detail pages rarely
+CRAIGSLIST_HTTPCACHE_SEARCH_TTL = 15 * 60
+CRAIGSLIST_HTTPCACHE_DETAIL_TTL = 24 * 3600
+# Serve everything from the cache and never touch the network (replays recorded runs)
+CRAIGSLIST_HTTPCACHE_OFFLINE = False
+
+# LLM evaluation runs as asyncio coroutines on the reactor thread
+TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 
 # Set settings whose default value is deprecated to a future-proof value
 FEED_EXPORT_ENCODING = "utf-8"
@@ -1,19 +1,79 @@
-import json
-import scrapy
 import time
+import scrapy
+from scrapy.exceptions import IgnoreRequest
+from scraper.scraper.extractor import extract_listing
 from scraper.scraper.items import ListingItem
+from scraper.scraper.pipeline_state import PipelineState
+from scraper.scraper.prefilter import SearchResultPrefilter, parse_distance, parse_price
+from storage.seen_store import SeenStore, post_id_from_url
 from utilities.config import Config
 from utilities.logger import Logger
+from utilities.metrics import Metrics
+
+
+class _ResultOrder:
+    """Listings of one search results page, held until every earlier result on the page is done."""
+
+    def __init__(self, total):
+        self.total = total
+        self.next = 0
+        self.done = {}
+
+    def release(self, position, items):
+        """Record the items of the result at `position`; returns those now due, in page order."""
+        self.done[position] = items
+        released = []
+        while self.next in self.done:
+            released.extend(self.done.pop(self.next))
+            self.next += 1
+        return released
+
 
 class CraigslistSpider(scrapy.Spider):
+    """
+    Crawls every saved search in every region and yields its listings.
+
+    Detail pages download concurrently, but each results page's listings are
+    passed to the item pipelines in the page's order, so the duplicate filter
+    and the pre-ranker see the same sequence however the downloads interleave.
+
+    Args:
+        llm_client: Shared LLM client the pipelines evaluate listings with
+        searches: Saved searches to crawl (default = every configured search)
+        pipeline_state: Indexes and stores the pipelines reuse across crawls;
+            a spider given none builds its own and closes it when it finishes
+        run_started_at: Start of the run this crawl belongs to; listings other
+            crawls of the run indexed are not taken as earlier copies
+    """
     name = "craigslist"
-    start_urls = [
-        "https://sfbay.craigslist.org/search/bia?postal=94105&query=54cm%20frame%20road%20bike&search_distance=15&sort=date"
-    ]
 
-    def __init__(self, llm_client, *args, **kwargs):
+    def __init__(self, llm_client, searches=None, pipeline_state=None, run_started_at=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.llm_client = llm_client
+        self.searches = searches or Config.current().searches
+        self.prefilters = {search.name: SearchResultPrefilter.from_config(search.prefilter) for search in self.searches}
+        self.seen_store = SeenStore()
+        self.owns_pipeline_state = pipeline_state is None
+        self.pipeline_state = pipeline_state or PipelineState()
+        self.run_started_at = run_started_at or time.time()
+        self.result_order = {}
+
+    async def start(self):
+        """
+        Issue one search results request per saved search and region.
+
+        Every search shares this spider's scheduler and download slots; the
+        search name travels in the request meta so items can be routed back.
+        """
+        base_url = Config.get('craigslist_base_url')
+        for search in self.searches:
+            for region in search.regions:
+                Logger.log("Starting search", component="SPIDER", context={"search": search.name, "region": region})
+                yield scrapy.Request(
+                    search.url(base_url, region=region),
+                    callback=self.parse,
+                    meta={'search': search.name, 'region': region},
+                )
 
     def parse(self, response):
         """
@@ -21,7 +81,9 @@ class CraigslistSpider(scrapy.Spider):
         
         This method is called for the initial search page and extracts links to individual
         bike listings from the search results. It iterates through each listing result
-        and follows the link to the detailed listing page.
+        and follows the link to the detailed listing page. Results rejected by the
+        search's prefilter (price bounds, keywords, distance) and listings that were
+        already scored at the same price are dropped before any detail request.
         
         Args:
             response (scrapy.Response): The response object containing the search results page HTML.
@@ -30,17 +92,60 @@ class CraigslistSpider(scrapy.Spider):
             scrapy.Request: Request objects to follow each individual listing URL.
         """
         Logger.log("Parsing search results page", component="SPIDER", context={"url": response.url})
-        for list_item in response.css("li.cl-static-search-result")[:Config.get('listing_count_limit')]:
-
-            link = list_item.css("a::attr(href)").get()
-            if not link:
-                Logger.warning("Search result missing href", component="SPIDER")
-                continue
-            yield response.follow(
-                link, 
-                callback=self.parse_detail_page,
-                meta={'listing_url': link}
-            )
+        self._observe_download(response, "search")
+        listing_count_limit = Config.current().listing_count_limit
+        search = response.meta.get('search', '')
+        region = response.meta.get('region')
+        prefilter = self.prefilters.get(search) or SearchResultPrefilter()
+        dropped = {}
+        requests = []
+        with Metrics.span("parse_seconds", {"page": "search"}):
+            for list_item in response.css("li.cl-static-search-result")[:listing_count_limit]:
+
+                link = list_item.css("a::attr(href)").get()
+                if not link:
+                    Logger.warning("Search result missing href", component="SPIDER")
+                    continue
+                price = list_item.css("div.price::text").get()
+                result = {
+                    "title": list_item.css("div.title::text").get() or list_item.attrib.get("title"),
+                    "price": parse_price(price),
+                    "distance": parse_distance(list_item.css("div.distance::text").get()),
+                }
+                reason = prefilter.drop_reason(result)
+                if reason is None and self.seen_store.is_unchanged_result(link, price, search):
+                    reason = "known"
+                if reason:
+                    dropped[reason] = dropped.get(reason, 0) + 1
+                    continue
+                requests.append(response.follow(
+                    link, 
+                    callback=self.parse_detail_page,
+                    errback=self.detail_failed,
+                    meta={
+                        'listing_url': link,
+                        'post_id': post_id_from_url(link),
+                        'search': search,
+                        'region': region,
+                        'position': len(requests),
+                    },
+                    # Another search may follow the same listing; the seen store already gates
+                    # repeats per search, and the dupefilter would drop this search's request
+                    dont_filter=True,
+                ))
+        self.result_order[(search, region)] = _ResultOrder(len(requests))
+        yield from requests
+
+        for reason, count in dropped.items():
+            self.crawler.stats.inc_value(f"prefilter/dropped/{reason}", count, spider=self)
+            Metrics.inc("prefilter_dropped_total", count, {"reason": reason})
+        Metrics.inc("search_results_followed_total", len(requests))
+        if dropped:
+            Logger.log("Prefilter dropped search results", component="SPIDER", context={
+                "search": search,
+                "dropped": sum(dropped.values()),
+                "reasons": dropped,
+            })
 
     def parse_detail_page(self, response):
         """
@@ -49,7 +154,7 @@ class CraigslistSpider(scrapy.Spider):
         This method extracts comprehensive information from each individual bike listing
         including the title, post ID, bike attributes, description content, and last
         updated timestamp. It handles cases where certain elements may not be present
-        on the page.
+        on the page. All fields are pulled in a single pass by `extract_listing`.
         
         Args:
             response (scrapy.Response): The response object containing the individual listing page HTML.
@@ -62,121 +167,68 @@ class CraigslistSpider(scrapy.Spider):
                 - updated_at (str): Last updated timestamp
                 - content (str): The main description text of the listing
                 - url (str): The original listing URL
+                - search (str): Name of the saved search that found the listing
+                - region (str): Craigslist site the search ran on
+                - images (list): URLs of the listing's photos
         """
         Logger.log("Parsing detail page", component="SPIDER", context={"url": response.meta.get('listing_url', response.url)})
-        item = ListingItem()
-        item["title"] = "Title Not Found"
-        item["content"] = "Content Not Found"
-        item["post_id"] = None
-        item["attribute_group"] = None
-        item["updated_at"] = None
-        item["price"] = "Price Not Found"
-        item["url"] = response.meta.get('listing_url', response.url)
-
-        posting_data_script = response.css('script#ld_posting_data::text').get()
-        if posting_data_script:
-            try:
-                posting_data_script = posting_data_script.strip()
-                posting_data = json.loads(posting_data_script)
-                item["title"] = posting_data.get("name", "Title Not Found")
-                item["content"] = posting_data.get("description", "Content Not Found")
-                item["price"] = posting_data.get("offers", {}).get("price", "Price Not Found")
-            except (json.JSONDecodeError, AttributeError) as e:
-                Logger.warning(f"Failed to parse JSON-LD data: {e}", component="SPIDER")
-                item["title"] = self._extract_title_from_css(response)
-                item["content"] = self._extract_content_from_css(response)
-        else:
-            item["title"] = self._extract_title_from_css(response)
-            item["content"] = self._extract_content_from_css(response)
-
-        item["post_id"] = self._extract_post_id(response)
-        item["attribute_group"] = self._extract_attributes(response)
-        item["updated_at"] = self._extract_updated_timestamp(response)
-
-        yield item
-    
-    def _extract_title_from_css(self, response):
-        """Extract title using CSS selectors with error handling."""
-        try:
-            title_element = response.css('h1.postingtitle span#titletextonly::text').get()
-            return title_element.strip() if title_element else "Title Not Found"
-        except Exception as e:
-            Logger.warning(f"Failed to extract title from CSS: {e}", component="SPIDER")
-            return "Title Not Found"
-    
-    def _extract_content_from_css(self, response):
-        """Extract content using CSS selectors with error handling."""
+        self._observe_download(response, "detail")
+        meta = response.meta
         try:
-            content_elements = response.css('section#postingbody::text').getall()
-            if content_elements:
-                content = " ".join(text.strip() for text in content_elements if text.strip())
-                return content.strip() if content else "Content Not Found"
-            return "Content Not Found"
-        except Exception as e:
-            Logger.warning(f"Failed to extract content from CSS: {e}", component="SPIDER")
-            return "Content Not Found"
-    
-    def _extract_post_id(self, response):
-        """Extract post ID with proper integer conversion and error handling."""
-        try:
-            post_id_text = response.css('div.postinginfos p.postinginfo::text').get()
-            if not post_id_text:
-                Logger.warning("Post ID element not found", component="SPIDER")
-                return None
-            
-            colon_index = post_id_text.find(':')
-            if colon_index == -1:
-                Logger.warning(f"Post ID format unexpected: {post_id_text}", component="SPIDER")
-                return None
-            
-            id_part = post_id_text[colon_index + 2:].strip()
-            if not id_part:
-                Logger.warning("Post ID is empty after parsing", component="SPIDER")
-                return None
-            
-            return int(id_part)
-        except ValueError as e:
-            Logger.warning(f"Failed to convert post ID to integer: {e}", component="SPIDER")
-            return None
-        except Exception as e:
-            Logger.warning(f"Unexpected error extracting post ID: {e}", component="SPIDER")
-            return None
-    
-    def _extract_updated_timestamp(self, response):
-        """Extract updated timestamp with proper error handling."""
-        try:
-            timestamp_elements = response.css('div.postinginfos p.postinginfo.reveal time.date.timeago::text').getall()
-            if len(timestamp_elements) > 1:
-                return timestamp_elements[1]
-            elif len(timestamp_elements) == 1:
-                return timestamp_elements[0]
-            else:
-                Logger.warning("No timestamp elements found", component="SPIDER")
-                return None
-        except IndexError:
-            Logger.warning("Index error accessing timestamp elements", component="SPIDER")
-            return None
-        except Exception as e:
-            Logger.warning(f"Unexpected error extracting timestamp: {e}", component="SPIDER")
-            return None
-        
-    def _extract_attributes(self, response):
-        attrs = {}
-        for row in response.css("div.attrgroup div.attr"):
-            key = row.css("span.labl::text").get()
-            value = row.css('span.valu a::text').get()
-            if value is None:
-                value = row.css("span.valu::text").getall()
-                value = " ".join(v.strip() for v in value)
-            else:
-                value = value.strip()
-
-            if key and value:
-                key = key.strip().rstrip(":")
-                attrs[key] = value
-        
-        return attrs
-    
+            with Metrics.span("parse_seconds", {"page": "detail"}):
+                record = extract_listing(response)
+        except Exception:
+            yield from self._release(meta, [])
+            raise
+        Metrics.inc("listings_scraped_total")
+        item = ListingItem()
+        item["title"] = record.title
+        item["content"] = record.content
+        item["post_id"] = record.post_id
+        item["attribute_group"] = record.attribute_group
+        item["updated_at"] = record.updated_at
+        item["price"] = record.price
+        item["url"] = meta.get('listing_url', response.url)
+        item["search"] = meta.get('search', '')
+        item["region"] = meta.get('region')
+        item["images"] = record.images
+
+        yield from self._release(meta, [item])
+
+    def detail_failed(self, failure):
+        """A detail page that could not be fetched no longer holds back the results after it."""
+        # Pages left out on purpose, e.g. missing from the offline HTTP cache, are not failures
+        if not failure.check(IgnoreRequest):
+            Logger.warning(f"Detail page failed: {failure.getErrorMessage()}", component="SPIDER", context={
+                "url": failure.request.meta.get('listing_url', failure.request.url),
+            })
+        yield from self._release(failure.request.meta, [])
+
+    def results_pending(self, search, region):
+        """Whether listings of this search and region may still be yielded."""
+        order = self.result_order.get((search, region))
+        return order is None or order.next < order.total
+
+    def _release(self, meta, items):
+        order = self.result_order.get((meta.get('search', ''), meta.get('region')))
+        if order is None or 'position' not in meta:
+            return items
+        return order.release(meta['position'], items)
+
+    def closed(self, reason):
+        held = sum(len(items) for order in self.result_order.values() for items in order.done.values())
+        if held:
+            Logger.warning("Listings left waiting on an earlier result", component="SPIDER", context={"listings": held})
+        if self.owns_pipeline_state:
+            self.pipeline_state.close()
+
+    def _observe_download(self, response, page):
+        """Record how long the page took to download; responses served from the HTTP cache have no latency."""
+        if "cached" in response.flags:
+            Metrics.inc("pages_cached_total", labels={"page": page})
+            return
+        Metrics.observe("download_seconds", response.meta.get("download_latency"), {"page": page})
+
     # @classmethod
     # def from_crawler(cls, crawler, *args, **kwargs):
     #     spider = super().from_crawler(crawler, *args, **kwargs)
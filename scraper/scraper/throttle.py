@@ -0,0 +1,141 @@
+# Adaptive per-domain throttling for Craigslist
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
+
+import time
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from utilities.logger import Logger
+
+BACKOFF_STATUSES = {403, 429, 500, 502, 503, 504}
+MAX_RECORDED_EVENTS = 100
+
+
+class AdaptiveThrottleMiddleware:
+    """
+    Additive-increase / multiplicative-decrease throttle per download slot.
+
+    Every slot (one per Craigslist subdomain) starts at DOWNLOAD_DELAY with
+    CONCURRENT_REQUESTS_PER_DOMAIN in flight. After ADAPTIVE_THROTTLE_WINDOW
+    healthy responses in a row the slot first shortens its delay towards its
+    minimum and then admits one more concurrent request, up to its maximum.
+    A 403/429/5xx or a download error drops the slot straight back to one
+    request at a doubled delay (or the server's Retry-After); a response slower
+    than ADAPTIVE_THROTTLE_TARGET_LATENCY gives up one request of concurrency
+    and lengthens the delay by half. Per-subdomain limits come from
+    ADAPTIVE_THROTTLE_DOMAINS.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        if not settings.getbool("ADAPTIVE_THROTTLE_ENABLED"):
+            raise NotConfigured
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.start_delay = settings.getfloat("DOWNLOAD_DELAY")
+        self.defaults = {
+            "min_delay": settings.getfloat("ADAPTIVE_THROTTLE_MIN_DELAY", 0.25),
+            "max_delay": settings.getfloat("ADAPTIVE_THROTTLE_MAX_DELAY", 60.0),
+            "max_concurrency": settings.getint("ADAPTIVE_THROTTLE_MAX_CONCURRENCY", 4),
+        }
+        self.domains = settings.getdict("ADAPTIVE_THROTTLE_DOMAINS")
+        self.target_latency = settings.getfloat("ADAPTIVE_THROTTLE_TARGET_LATENCY", 2.0)
+        self.window = settings.getint("ADAPTIVE_THROTTLE_WINDOW", 10)
+        self.streaks = {}
+        self.events = []
+        self.started_at = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        o = cls(crawler)
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def spider_opened(self, spider):
+        self.started_at = time.monotonic()
+
+    def _limits(self, key):
+        return {**self.defaults, **self.domains.get(key, {})}
+
+    def _get_slot(self, request):
+        key = request.meta.get("download_slot")
+        if key is None or self.crawler.engine is None:
+            return None, None
+        return key, self.crawler.engine.downloader.slots.get(key)
+
+    def process_response(self, request, response, spider):
+        if "cached" in response.flags:
+            return response
+        key, slot = self._get_slot(request)
+        if slot is None:
+            return response
+
+        latency = request.meta.get("download_latency")
+        if response.status in BACKOFF_STATUSES:
+            self._backoff(key, slot, f"status_{response.status}", retry_after=response.headers.get(b"Retry-After"))
+        elif latency is not None and latency > self.target_latency:
+            self._slow_down(key, slot, latency)
+        elif response.status < 400:
+            self._speed_up(key, slot)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        key, slot = self._get_slot(request)
+        if slot is not None:
+            self._backoff(key, slot, type(exception).__name__)
+        return None
+
+    def _speed_up(self, key, slot):
+        self.streaks[key] = self.streaks.get(key, 0) + 1
+        if self.streaks[key] < self.window:
+            return
+        self.streaks[key] = 0
+        limits = self._limits(key)
+        if slot.delay > limits["min_delay"]:
+            slot.delay = max(limits["min_delay"], slot.delay * 0.75)
+        elif slot.concurrency < limits["max_concurrency"]:
+            slot.concurrency += 1
+        self.stats.max_value(f"throttle/{key}/max_concurrency", slot.concurrency)
+
+    def _slow_down(self, key, slot, latency):
+        limits = self._limits(key)
+        self.streaks[key] = 0
+        slot.concurrency = max(1, slot.concurrency - 1)
+        slot.delay = min(limits["max_delay"], max(slot.delay * 1.5, limits["min_delay"]))
+        self._record(key, slot, "slow_response", latency=round(latency, 3))
+
+    def _backoff(self, key, slot, reason, retry_after=None):
+        limits = self._limits(key)
+        self.streaks[key] = 0
+        delay = max(slot.delay * 2, self.start_delay, limits["min_delay"])
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        slot.concurrency = 1
+        slot.delay = min(limits["max_delay"], delay)
+        self._record(key, slot, reason)
+
+    def _record(self, key, slot, reason, **extra):
+        self.stats.inc_value("throttle/backoffs")
+        self.stats.inc_value(f"throttle/backoff/{reason}")
+        event = {"slot": key, "reason": reason, "delay": round(slot.delay, 3), "concurrency": slot.concurrency, **extra}
+        if len(self.events) < MAX_RECORDED_EVENTS:
+            self.events.append(event)
+        Logger.warning("Throttle backoff", component="THROTTLE", context=event)
+
+    def spider_closed(self, spider):
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0
+        pages = self.stats.get_value("response_received_count", 0)
+        pages_per_sec = pages / elapsed if elapsed else 0.0
+        self.stats.set_value("throttle/pages_per_sec", round(pages_per_sec, 3))
+        Logger.log("Throttle summary", component="THROTTLE", context={
+            "pages": pages,
+            "elapsed_seconds": round(elapsed, 1),
+            "pages_per_sec": round(pages_per_sec, 3),
+            "backoffs": self.stats.get_value("throttle/backoffs", 0),
+            "events": self.events,
+        })
@@ -0,0 +1,3 @@
+from .seen_store import SeenStore
+
+__all__ = ['SeenStore']
@@ -0,0 +1,236 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Collection, Dict, List, Optional, Set, Tuple
+from storage.seen_store import normalize_price
+from utilities.logger import Logger
+
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def _features(title: str, content: str) -> List[str]:
+    # Imported here to keep storage free of a module-level dependency on the scraper package
+    from scraper.scraper.relevance import tokenize
+    words = tokenize(f"{title or ''} {content or ''}")
+    # Word pairs make the fingerprint sensitive to order, not just vocabulary
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def simhash(title: str, content: str) -> int:
+    """64-bit SimHash of a listing's title and description; similar text gives fingerprints a few bits apart."""
+    # Imported here so the engine can open the index at startup without loading NumPy
+    import numpy as np
+    features = _features(title, content)
+    if not features:
+        return 0
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big") for feature in features],
+        dtype=np.uint64,
+    )
+    bits = (hashes[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(features)
+    return int(np.packbits((votes > 0)[::-1]).view(">u8")[0])
+
+
+def _signed(value: int) -> int:
+    """SQLite integers are signed 64-bit."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _bands(fingerprint: int) -> List[int]:
+    return [(fingerprint >> (band * BAND_BITS)) & BAND_MASK for band in range(BANDS)]
+
+
+class DuplicateIndex:
+    """
+    Persistent SimHash index of listing text, used to spot reposts and cross-posts.
+
+    Every fingerprint is split into four 16-bit bands, each indexed in SQLite.
+    Two fingerprints at most `max_distance` (<= 3) bits apart always share at
+    least one band exactly, so a lookup only compares the handful of rows that
+    share a band instead of scanning history. A candidate also has to be within
+    `price_tolerance` (relative) of the listing's price to count as the same
+    item. Duplicates are tracked per search and each one links to the first
+    listing of its group, its canonical listing.
+
+    Args:
+        path: SQLite database file
+        max_distance: Largest Hamming distance between near-duplicate fingerprints
+        price_tolerance: Largest relative price difference between duplicates
+    """
+
+    def __init__(self, path: str, max_distance: int = 3, price_tolerance: float = 0.1):
+        if max_distance >= BANDS:
+            raise ValueError(f"max_distance must be below {BANDS} for banded lookups to find every match")
+        self.path = path
+        self.max_distance = max_distance
+        self.price_tolerance = price_tolerance
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # Crawl workers in other processes may share the file
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    url TEXT NOT NULL,
+                    search TEXT NOT NULL DEFAULT '',
+                    fingerprint INTEGER NOT NULL,
+                    price REAL,
+                    canonical_url TEXT NOT NULL,
+                    first_seen REAL NOT NULL,
+                    {", ".join(f"band{band} INTEGER NOT NULL" for band in range(BANDS))},
+                    PRIMARY KEY (url, search)
+                )
+            """)
+            for band in range(BANDS):
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS fingerprints_band{band} ON fingerprints(search, band{band})")
+        Logger.log("DuplicateIndex initialized", component="STORE", context={"path": self.path, "max_distance": max_distance})
+
+    @staticmethod
+    def _price(price: Any) -> Optional[float]:
+        try:
+            return float(normalize_price(price))
+        except (TypeError, ValueError):
+            return None
+
+    def _same_price(self, a: Optional[float], b: Optional[float]) -> bool:
+        if a is None or b is None:
+            return True
+        return abs(a - b) <= self.price_tolerance * max(a, b)
+
+    def find_canonical(self,
+                       fingerprint: int,
+                       price: Any = None,
+                       search: str = "",
+                       exclude_url: Optional[str] = None,
+                       indexed_before: Optional[float] = None,
+                       also_urls: Collection[str] = ()) -> Optional[Dict[str, Any]]:
+        """
+        Find the closest earlier listing this fingerprint duplicates.
+
+        Args:
+            indexed_before: If set, only match listings first indexed before this
+                time or listed in `also_urls`, e.g. those of earlier runs and of
+                the caller's own crawl
+            also_urls: Listings matched regardless of `indexed_before`
+
+        Returns:
+            The canonical listing's url, the matched url and Hamming distance, or None
+        """
+        price = self._price(price)
+        bands = _bands(fingerprint)
+        # One indexed probe per band; with a single OR'd WHERE SQLite only uses the search prefix and scans
+        query = " UNION ".join(
+            f"SELECT url, fingerprint, price, canonical_url, first_seen FROM fingerprints WHERE search = ? AND band{band} = ?"
+            for band in range(BANDS)
+        )
+        with self._lock:
+            rows = self._conn.execute(query, [value for band in bands for value in (search, band)]).fetchall()
+
+        best = None
+        for row in rows:
+            if row["url"] == exclude_url:
+                continue
+            if indexed_before is not None and row["first_seen"] >= indexed_before and row["url"] not in also_urls:
+                continue
+            distance = bin((row["fingerprint"] & ((1 << 64) - 1)) ^ fingerprint).count("1")
+            if distance > self.max_distance or not self._same_price(price, row["price"]):
+                continue
+            if best is None or distance < best["distance"]:
+                best = {"url": row["url"], "canonical_url": row["canonical_url"], "distance": distance}
+        return best
+
+    def add(self, url: str, fingerprint: int, price: Any = None, search: str = "", canonical_url: Optional[str] = None) -> None:
+        """Insert or replace a listing's fingerprint, linked to `canonical_url` (itself by default)."""
+        bands = _bands(fingerprint)
+        with self._lock, self._conn:
+            self._conn.execute(f"""
+                INSERT INTO fingerprints (url, search, fingerprint, price, canonical_url, first_seen, {", ".join(f"band{band}" for band in range(BANDS))})
+                VALUES (?, ?, ?, ?, ?, ?, {", ".join("?" * BANDS)})
+                ON CONFLICT(url, search) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    price = excluded.price,
+                    canonical_url = excluded.canonical_url,
+                    {", ".join(f"band{band} = excluded.band{band}" for band in range(BANDS))}
+            """, [url, search, _signed(fingerprint), self._price(price), canonical_url or url, time.time()] + bands)
+
+    def lookup(self, url: str, search: str = "") -> Optional[Dict[str, Any]]:
+        """The stored fingerprint, price and canonical url of a listing."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, price, canonical_url FROM fingerprints WHERE url = ? AND search = ?", (url, search)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"fingerprint": row["fingerprint"] & ((1 << 64) - 1), "price": row["price"], "canonical_url": row["canonical_url"]}
+
+    def is_near(self, a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        """Whether two `lookup` entries are near-duplicates: close fingerprints at about the same price."""
+        distance = bin(a["fingerprint"] ^ b["fingerprint"]).count("1")
+        return distance <= self.max_distance and self._same_price(a["price"], b["price"])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+
+class NearDuplicateSet:
+    """
+    In-memory group of `DuplicateIndex.lookup` entries, searchable for near-duplicates.
+
+    Entries are indexed by canonical url and by the same four SimHash bands as
+    the index, so `find` only compares the entries sharing one of them rather
+    than every entry in the group.
+
+    Args:
+        index: The index whose distance and price rules decide what is near
+    """
+
+    def __init__(self, index: DuplicateIndex):
+        self.index = index
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._by_canonical: Dict[str, Set[str]] = {}
+        self._by_band: Dict[Tuple[int, int], Set[str]] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, url: str, entry: Dict[str, Any]) -> None:
+        self.remove(url)
+        self._entries[url] = entry
+        self._by_canonical.setdefault(entry["canonical_url"], set()).add(url)
+        for band in enumerate(_bands(entry["fingerprint"])):
+            self._by_band.setdefault(band, set()).add(url)
+
+    def remove(self, url: str) -> None:
+        entry = self._entries.pop(url, None)
+        if entry is None:
+            return
+        buckets = [(self._by_canonical, entry["canonical_url"])]
+        buckets += [(self._by_band, band) for band in enumerate(_bands(entry["fingerprint"]))]
+        for index, key in buckets:
+            urls = index[key]
+            urls.discard(url)
+            if not urls:
+                del index[key]
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(url)
+
+    def find(self, entry: Dict[str, Any]) -> Optional[str]:
+        """The url of an entry with the same canonical listing or a near fingerprint, or None."""
+        candidates = set(self._by_canonical.get(entry["canonical_url"], ()))
+        for band in enumerate(_bands(entry["fingerprint"])):
+            candidates.update(self._by_band.get(band, ()))
+        # Smallest url first, so the match does not depend on insertion order
+        for url in sorted(candidates):
+            other = self._entries[url]
+            if other["canonical_url"] == entry["canonical_url"] or self.index.is_near(entry, other):
+                return url
+        return None
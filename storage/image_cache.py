@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+from utilities.logger import Logger
+
+
+class ImageCache:
+    """
+    Local cache of listing photo thumbnails, keyed by URL and by perceptual hash.
+
+    Every thumbnail is a small JPEG in `thumbnail_dir`, named after the 64-bit
+    dHash of the photo, and a SQLite table maps photo URLs to their hash. A URL
+    that was fetched before is never downloaded again, and a photo already
+    stored under another URL (a repost, a re-upload) is not stored twice.
+
+    Args:
+        path: SQLite database file
+        thumbnail_dir: Where thumbnails are written (default = "thumbnails" beside `path`)
+    """
+
+    def __init__(self, path: str, thumbnail_dir: Optional[str] = None):
+        self.path = path
+        self.thumbnail_dir = thumbnail_dir or os.path.join(os.path.dirname(path) or ".", "thumbnails")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        os.makedirs(self.thumbnail_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS photos (
+                    url TEXT PRIMARY KEY,
+                    dhash TEXT NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    bytes INTEGER,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS photos_dhash ON photos(dhash)")
+        Logger.log("ImageCache initialized", component="STORE", context={"path": self.path, "thumbnail_dir": self.thumbnail_dir})
+
+    def thumbnail_path(self, dhash: int) -> str:
+        return os.path.join(self.thumbnail_dir, f"{dhash:016x}.jpg")
+
+    def lookup(self, url: str) -> Optional[Tuple[int, str]]:
+        """The hash and thumbnail path of a photo URL fetched before, if its thumbnail still exists."""
+        with self._lock:
+            row = self._conn.execute("SELECT dhash FROM photos WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        dhash = int(row["dhash"], 16)
+        path = self.thumbnail_path(dhash)
+        return (dhash, path) if os.path.exists(path) else None
+
+    def add(self, url: str, dhash: int, data: bytes, width: int, height: int) -> Tuple[str, bool]:
+        """
+        Store a thumbnail for a photo URL.
+
+        Returns:
+            The thumbnail path and whether a thumbnail with the same hash was already stored
+        """
+        path = self.thumbnail_path(dhash)
+        existed = os.path.exists(path)
+        if not existed:
+            # Written beside the target and swapped in, so a reader never sees half a file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO photos (url, dhash, width, height, bytes, fetched_at) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    dhash = excluded.dhash,
+                    width = excluded.width,
+                    height = excluded.height,
+                    bytes = excluded.bytes,
+                    fetched_at = excluded.fetched_at
+            """, (url, f"{dhash:016x}", width, height, len(data), time.time()))
+        return path, existed
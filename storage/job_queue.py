@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utilities.logger import Logger
+
+
+class JobQueue:
+    """
+    SQLite queue of crawl jobs shared by a coordinator and its worker processes.
+
+    A job is one search on one Craigslist region within a run. Workers claim
+    pending jobs one at a time, write the (score, url) results of every
+    evaluated batch back to the queue and mark the job done or failed; the
+    coordinator reads the results of the whole run once every job is
+    finished. Claims are a single UPDATE, so two processes never get the same
+    job. Jobs of a worker that died can be released back to pending.
+
+    Args:
+        path: SQLite database file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # Several processes write to the same file; wait for their short transactions instead of failing
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    search TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    enqueued_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    stats TEXT,
+                    error TEXT
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_run_status ON jobs(run_id, status)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    run_id TEXT NOT NULL,
+                    job_id INTEGER NOT NULL,
+                    search TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    score REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_run ON results(run_id)")
+        Logger.log("JobQueue initialized", component="STORE", context={"path": self.path})
+
+    def enqueue(self, run_id: str, jobs: Iterable[Tuple[str, str]]) -> int:
+        """Add a run's (search, region) jobs. Returns how many were added."""
+        now = time.time()
+        rows = [(run_id, search, region, now) for search, region in jobs]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO jobs (run_id, search, region, enqueued_at) VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def claim(self, run_id: str, worker: str) -> Optional[Dict[str, Any]]:
+        """Take the oldest pending job of a run for `worker`, if there is one."""
+        with self._lock, self._conn:
+            row = self._conn.execute("""
+                UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, started_at = ?
+                WHERE id = (SELECT id FROM jobs WHERE run_id = ? AND status = 'pending' ORDER BY id LIMIT 1)
+                RETURNING *
+            """, (worker, time.time(), run_id)).fetchone()
+        return dict(row) if row else None
+
+    def complete(self, job_id: int, stats: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, stats = ? WHERE id = ?",
+                (time.time(), json.dumps(stats or {}, default=str), job_id),
+            )
+
+    def fail(self, job_id: int, error: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                (time.time(), error, job_id),
+            )
+
+    def release(self, run_id: str, worker: str, max_attempts: int) -> int:
+        """
+        Hand the running jobs of a dead worker back to the queue.
+
+        A job that has already been tried `max_attempts` times is marked failed
+        instead, so a listing that crashes every worker cannot stall the run.
+        Results the worker already wrote for a released job are kept and the
+        retry adds to them: those listings' scores are in the seen store, so
+        the retry skips them as unchanged and would never report them again.
+
+        Returns:
+            The number of jobs put back to pending
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, attempts FROM jobs WHERE run_id = ? AND worker = ? AND status = 'running'",
+                (run_id, worker),
+            ).fetchall()
+            retry = [row["id"] for row in rows if row["attempts"] < max_attempts]
+            give_up = [row["id"] for row in rows if row["attempts"] >= max_attempts]
+            self._conn.executemany("UPDATE jobs SET status = 'pending', worker = NULL WHERE id = ?", [(i,) for i in retry])
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = 'worker exited' WHERE id = ?",
+                [(time.time(), i) for i in give_up],
+            )
+        return len(retry)
+
+    def add_results(self, run_id: str, job_id: int, search: str, results: Iterable[tuple]) -> None:
+        """Store a batch of (score, url) results of a job."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO results (run_id, job_id, search, url, score) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, job_id, search, url, score) for score, url in results],
+            )
+
+    def results(self, run_id: str) -> Dict[str, List[Tuple[float, str]]]:
+        """Every (score, url) result of a run, by search."""
+        with self._lock:
+            rows = self._conn.execute("SELECT search, url, score FROM results WHERE run_id = ?", (run_id,)).fetchall()
+        results = {}
+        for row in rows:
+            results.setdefault(row["search"], []).append((row["score"], row["url"]))
+        return results
+
+    def jobs(self, run_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs WHERE run_id = ? ORDER BY id", (run_id,)).fetchall()
+        jobs = [dict(row) for row in rows]
+        for job in jobs:
+            job["stats"] = json.loads(job["stats"]) if job["stats"] else {}
+        return jobs
+
+    def counts(self, run_id: str) -> Dict[str, int]:
+        """Number of a run's jobs in each status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY status", (run_id,)).fetchall()
+        return {status: count for status, count in rows}
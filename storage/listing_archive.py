@@ -0,0 +1,322 @@
+"""
+Append-only archive of every scraped listing and its LLM score.
+
+Rows are partitioned Hive style by the UTC date they were archived on and by
+search, as `<path>/date=YYYY-MM-DD/search=<name>/part-*`, so a query for a
+date range or one search only opens the files it needs. Parts are Parquet
+(zstd, one file per flush) when pyarrow is installed, otherwise gzipped JSON
+lines appended one gzip member per flush. Both can be read back and queried
+from the command line:
+
+    python -m storage.listing_archive prices [--search NAME] [--url URL] [--since YYYY-MM-DD]
+    python -m storage.listing_archive scores [--search NAME] [--since YYYY-MM-DD] [--bins 10]
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote, unquote
+from storage.seen_store import normalize_price
+from utilities.logger import Logger
+
+# Stored columns, in order; `date` and `search` are only in the partition path
+COLUMNS = ("scraped_at", "url", "post_id", "title", "price", "score", "status", "updated_at", "attributes", "content")
+PARTITION_COLUMNS = ("date", "search")
+
+
+def pyarrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("scraped_at", pa.float64()),
+        ("url", pa.string()),
+        ("post_id", pa.int64()),
+        ("title", pa.string()),
+        ("price", pa.float64()),
+        ("score", pa.float64()),
+        ("status", pa.string()),
+        ("updated_at", pa.string()),
+        ("attributes", pa.string()),
+        ("content", pa.string()),
+    ])
+
+
+def _price(value: Any) -> Optional[float]:
+    try:
+        return float(normalize_price(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class ListingArchive:
+    """
+    Buffered writer and column-pruning reader for the listing archive.
+
+    `append` buffers rows per partition and writes a partition out once it
+    holds `flush_rows` rows; `flush` writes whatever is left and must be called
+    when a run ends. Every writer names its parts after the time and process it
+    was created in, so runs and concurrent processes never write to the same file.
+
+    Args:
+        path: Root directory of the archive
+        format: "parquet", "jsonl" or "auto" (Parquet if pyarrow is installed)
+        flush_rows: Rows buffered per partition before they are written
+    """
+
+    def __init__(self, path: str, format: str = "auto", flush_rows: int = 1000):
+        if format == "auto":
+            format = "parquet" if pyarrow_available() else "jsonl"
+        if format not in ("parquet", "jsonl"):
+            raise ValueError(f"Unknown archive format: {format}")
+        if format == "parquet" and not pyarrow_available():
+            raise ValueError("The parquet archive format needs pyarrow (the 'archive' extra)")
+        self.path = path
+        self.format = format
+        self.flush_rows = flush_rows
+        self.part_prefix = f"part-{int(time.time())}-{os.getpid()}"
+        self.rows_written = 0
+        self.files_written = 0
+        self._buffers = {}
+        self._parts = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def append(self, listing: Dict[str, Any], score: Optional[float], status: str) -> None:
+        """
+        Buffer one listing.
+
+        Args:
+            listing: The scraped item, as a dict
+            score: Its LLM score, if it has one
+            status: How the score was obtained, e.g. "scored", "unscored", "unchanged",
+                "duplicate" or "prerank_dropped"
+        """
+        now = time.time()
+        row = {
+            "scraped_at": now,
+            "url": listing.get("url"),
+            "post_id": listing.get("post_id"),
+            "title": listing.get("title"),
+            "price": _price(listing.get("price")),
+            "score": score,
+            "status": status,
+            "updated_at": listing.get("updated_at"),
+            "attributes": json.dumps(listing.get("attribute_group") or {}, sort_keys=True),
+            "content": listing.get("content"),
+        }
+        partition = (datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%d"), listing.get("search") or "")
+        with self._lock:
+            rows = self._buffers.setdefault(partition, [])
+            rows.append(row)
+            if len(rows) >= self.flush_rows:
+                self._write(partition, self._buffers.pop(partition))
+
+    def flush(self) -> None:
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            for partition, rows in buffers.items():
+                self._write(partition, rows)
+
+    def _partition_dir(self, date: str, search: str) -> str:
+        return os.path.join(self.path, f"date={date}", f"search={quote(search, safe='')}")
+
+    def _write(self, partition: Tuple[str, str], rows: List[Dict[str, Any]]) -> None:
+        directory = self._partition_dir(*partition)
+        os.makedirs(directory, exist_ok=True)
+        if self.format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self._parts += 1
+            path = os.path.join(directory, f"{self.part_prefix}-{self._parts:04d}.parquet")
+            # Written beside the target and swapped in, so a reader never sees half a file
+            tmp_path = f"{path}.tmp"
+            pq.write_table(pa.Table.from_pylist(rows, schema=_schema()), tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+            self.files_written += 1
+        else:
+            path = os.path.join(directory, f"{self.part_prefix}.jsonl.gz")
+            if not os.path.exists(path):
+                self.files_written += 1
+            # Appends a new gzip member; readers decompress the members as one stream
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+        self.rows_written += len(rows)
+        Logger.log("Archived listings", component="STORE", context={"path": path, "rows": len(rows)})
+
+    def _partitions(self, search: Optional[str], since: Optional[str], until: Optional[str]) -> Iterable[Tuple[str, str, str]]:
+        """(date, search, directory) of every partition in range, read from directory names alone."""
+        for date_dir in sorted(os.listdir(self.path)):
+            date = date_dir.partition("date=")[2]
+            if not date or (since and date < since) or (until and date > until):
+                continue
+            for search_dir in sorted(os.listdir(os.path.join(self.path, date_dir))):
+                if not search_dir.startswith("search="):
+                    continue
+                name = unquote(search_dir.partition("search=")[2])
+                if search is None or name == search:
+                    yield date, name, os.path.join(self.path, date_dir, search_dir)
+
+    def scan(self,
+             columns: Iterable[str],
+             search: Optional[str] = None,
+             since: Optional[str] = None,
+             until: Optional[str] = None) -> Dict[str, List[Any]]:
+        """
+        Read some columns of the archive.
+
+        Partitions outside the search or date range are skipped without being
+        opened, and Parquet parts only decode the requested columns. JSON line
+        parts have to be parsed whole.
+
+        Args:
+            columns: Any of COLUMNS and the partition columns "date" and "search"
+            search: Only this search
+            since: First date to include, as YYYY-MM-DD
+            until: Last date to include, as YYYY-MM-DD
+
+        Returns:
+            A list of values per column, all in the same row order
+        """
+        columns = list(dict.fromkeys(columns))
+        unknown = [column for column in columns if column not in COLUMNS + PARTITION_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown archive columns: {unknown}")
+        stored = [column for column in columns if column in COLUMNS]
+        result = {column: [] for column in columns}
+
+        for date, name, directory in self._partitions(search, since, until):
+            for filename in sorted(os.listdir(directory)):
+                data = self._read_part(os.path.join(directory, filename), stored)
+                if data is None:
+                    continue
+                count = len(data[stored[0]]) if stored else self._count_rows(os.path.join(directory, filename))
+                for column in columns:
+                    if column == "date":
+                        result[column].extend([date] * count)
+                    elif column == "search":
+                        result[column].extend([name] * count)
+                    else:
+                        result[column].extend(data[column])
+        return result
+
+    def _read_part(self, path: str, columns: List[str]) -> Optional[Dict[str, List[Any]]]:
+        if path.endswith(".parquet"):
+            if not pyarrow_available():
+                Logger.warning("Skipping Parquet archive part, pyarrow is not installed", component="STORE", context={"path": path})
+                return None
+            import pyarrow.parquet as pq
+            return pq.read_table(path, columns=columns).to_pydict()
+        if path.endswith(".jsonl.gz"):
+            data = {column: [] for column in columns}
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        row = json.loads(line)
+                        for column in columns:
+                            data[column].append(row.get(column))
+            except (EOFError, json.JSONDecodeError) as e:
+                # A run that died mid-write leaves a truncated last member; keep what was complete
+                Logger.warning(f"Archive part is truncated: {e}", component="STORE", context={"path": path})
+                count = min((len(values) for values in data.values()), default=0)
+                data = {column: values[:count] for column, values in data.items()}
+            return data
+        return None
+
+    def _count_rows(self, path: str) -> int:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            return pq.ParquetFile(path).metadata.num_rows
+        return len(self._read_part(path, ["url"])["url"])
+
+    def price_history(self,
+                      search: Optional[str] = None,
+                      url: Optional[str] = None,
+                      since: Optional[str] = None,
+                      until: Optional[str] = None) -> Dict[str, List[Tuple[float, float]]]:
+        """
+        Every listing's price over time, as (scraped_at, price) points at which the price changed.
+
+        Reads only the url, scraped_at and price columns.
+        """
+        data = self.scan(("url", "scraped_at", "price"), search=search, since=since, until=until)
+        points = {}
+        for row_url, scraped_at, price in zip(data["url"], data["scraped_at"], data["price"]):
+            if price is None or (url is not None and row_url != url):
+                continue
+            points.setdefault(row_url, []).append((scraped_at, price))
+
+        history = {}
+        for row_url, series in points.items():
+            series.sort()
+            history[row_url] = [point for i, point in enumerate(series) if i == 0 or point[1] != series[i - 1][1]]
+        return history
+
+    def score_distribution(self,
+                           search: Optional[str] = None,
+                           since: Optional[str] = None,
+                           until: Optional[str] = None,
+                           bins: int = 10,
+                           max_score: float = 5.0) -> Dict[str, Any]:
+        """
+        Histogram and summary of the archived scores. Reads only the score and url columns.
+
+        A listing archived several times with the same score, e.g. on every run
+        while unchanged, is counted once per distinct score.
+        """
+        import numpy as np
+        data = self.scan(("url", "score"), search=search, since=since, until=until)
+        distinct = {(url, score) for url, score in zip(data["url"], data["score"]) if score is not None}
+        values = np.fromiter((score for _, score in distinct), dtype=np.float64, count=len(distinct))
+        counts, edges = np.histogram(values, bins=bins, range=(0.0, max_score))
+        summary = {
+            "count": int(values.size),
+            "histogram": [(float(edges[i]), float(edges[i + 1]), int(counts[i])) for i in range(bins)],
+        }
+        if values.size:
+            summary.update({
+                "mean": float(values.mean()),
+                "p50": float(np.percentile(values, 50)),
+                "p90": float(np.percentile(values, 90)),
+            })
+        return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query", choices=("prices", "scores"))
+    parser.add_argument("--path", default=None, help="archive directory (default = archive_path from config.yaml)")
+    parser.add_argument("--search", default=None)
+    parser.add_argument("--url", default=None, help="prices of one listing only")
+    parser.add_argument("--since", default=None, help="first date, YYYY-MM-DD")
+    parser.add_argument("--until", default=None, help="last date, YYYY-MM-DD")
+    parser.add_argument("--bins", type=int, default=10)
+    args = parser.parse_args()
+
+    # Keep the bot's own log intact and stdout to the query result
+    Logger._log_file = os.path.join(os.path.dirname(Logger._log_file) or ".", "archive_query.jsonl")
+    Logger._echo = False
+    path = args.path
+    if path is None:
+        from utilities.config import Config
+        path = Config.get('archive_path', 'data/archive')
+    archive = ListingArchive(path)
+    if args.query == "prices":
+        result = archive.price_history(search=args.search, url=args.url, since=args.since, until=args.until)
+    else:
+        result = archive.score_distribution(search=args.search, since=args.since, until=args.until, bins=args.bins)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
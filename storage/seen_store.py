@@ -0,0 +1,214 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utilities.config import Config
+from utilities.logger import Logger
+
+POST_ID_PATTERN = re.compile(r"/(\d+)\.html")
+
+
+def post_id_from_url(url: Optional[str]) -> Optional[int]:
+    """Pull the numeric Craigslist post id out of a listing URL."""
+    if not url:
+        return None
+    match = POST_ID_PATTERN.search(url)
+    return int(match.group(1)) if match else None
+
+
+def normalize_price(price: Any) -> Optional[str]:
+    """Normalize "$1,200", "1200" and 1200 to the same value so they compare equal."""
+    if price is None:
+        return None
+    text = str(price).strip().lstrip("$").replace(",", "")
+    try:
+        return f"{float(text):.2f}"
+    except ValueError:
+        return text or None
+
+
+class SeenStore:
+    """
+    Local SQLite record of every listing the bot has processed.
+
+    Keyed by listing URL and search name (with the post id indexed alongside)
+    and holding the last seen price, updated_at timestamp, LLM score (or when
+    the pre-ranker dropped it instead) and when it was notified. Scores are per search since the same post can match
+    several searches differently; notifications are per URL. Used to skip
+    detail fetches and LLM calls for unchanged listings and to avoid notifying
+    the same listing twice. A listing queued for notification but not yet sent
+    stays pending across runs until a send succeeds.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, path: Optional[str] = None):
+        if cls._instance is None:
+            cls._instance = super(SeenStore, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self, path: Optional[str] = None):
+        if not self._initialized:
+            self.path = path or Config.get('seen_store_path', 'data/seen.sqlite3')
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._create_schema()
+            SeenStore._initialized = True
+            Logger.log("SeenStore initialized", component="STORE", context={"path": self.path})
+
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS listings (
+                    url TEXT NOT NULL,
+                    search TEXT NOT NULL DEFAULT '',
+                    post_id INTEGER,
+                    price TEXT,
+                    updated_at TEXT,
+                    score REAL,
+                    prerank_dropped_at REAL,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL,
+                    notified_at REAL,
+                    queued_at REAL,
+                    PRIMARY KEY (url, search)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS listings_post_id ON listings(post_id, search)")
+
+    def lookup(self, url: Optional[str] = None, post_id: Optional[int] = None, search: str = "") -> Optional[Dict[str, Any]]:
+        """Find a stored listing for a search by post id (preferred) or URL."""
+        with self._lock:
+            row = None
+            if post_id is not None:
+                row = self._conn.execute("SELECT * FROM listings WHERE post_id = ? AND search = ?", (post_id, search)).fetchone()
+            if row is None and url:
+                row = self._conn.execute("SELECT * FROM listings WHERE url = ? AND search = ?", (url, search)).fetchone()
+        return dict(row) if row else None
+
+    @staticmethod
+    def _processed(row: Optional[Dict[str, Any]]) -> bool:
+        """Whether a stored listing was scored or dropped by the pre-ranker."""
+        return row is not None and (row["score"] is not None or row["prerank_dropped_at"] is not None)
+
+    def is_unchanged_result(self, url: str, price: Any = None, search: str = "") -> bool:
+        """
+        Decide from a search result alone whether the detail page can be skipped.
+
+        A result is unchanged when the listing was already scored or dropped by
+        the pre-ranker and the price shown on the search page still matches the
+        stored one.
+        """
+        row = self.lookup(url=url, post_id=post_id_from_url(url), search=search)
+        if not self._processed(row):
+            return False
+        return price is None or normalize_price(price) == row["price"]
+
+    def has_version(self, item: Dict[str, Any]) -> bool:
+        """True if this listing was recorded with the same updated_at before, for any search."""
+        post_id = item.get("post_id")
+        key, value = ("post_id", post_id) if post_id is not None else ("url", item.get("url"))
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM listings WHERE {key} = ? AND updated_at IS ? LIMIT 1", (value, item.get("updated_at"))
+            ).fetchone()
+        return row is not None
+
+    def is_changed(self, item: Dict[str, Any]) -> bool:
+        """True if the scraped listing is new, edited, repriced or was never scored or pre-ranked."""
+        row = self.lookup(url=item.get("url"), post_id=item.get("post_id"), search=item.get("search") or "")
+        if not self._processed(row):
+            return True
+        return (item.get("updated_at") != row["updated_at"]
+                or normalize_price(item.get("price")) != row["price"])
+
+    def record_item(self, item: Dict[str, Any]) -> None:
+        """Upsert a scraped listing. A change in price or updated_at clears the stored score and pre-rank drop."""
+        now = time.time()
+        price = normalize_price(item.get("price"))
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO listings (url, search, post_id, price, updated_at, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url, search) DO UPDATE SET
+                    post_id = excluded.post_id,
+                    score = CASE
+                        WHEN listings.price IS excluded.price AND listings.updated_at IS excluded.updated_at
+                        THEN listings.score ELSE NULL END,
+                    prerank_dropped_at = CASE
+                        WHEN listings.price IS excluded.price AND listings.updated_at IS excluded.updated_at
+                        THEN listings.prerank_dropped_at ELSE NULL END,
+                    price = excluded.price,
+                    updated_at = excluded.updated_at,
+                    last_seen = excluded.last_seen
+            """, (item.get("url"), item.get("search") or "", item.get("post_id"), price, item.get("updated_at"), now, now))
+
+    def record_prerank_drop(self, item: Dict[str, Any]) -> None:
+        """
+        Upsert a listing the pre-ranker kept from the LLM.
+
+        It stays unscored but counts as unchanged, so its detail page is not
+        fetched again until its price or updated_at changes.
+        """
+        self.record_item(item)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE listings SET prerank_dropped_at = ? WHERE url = ? AND search = ?",
+                (time.time(), item.get("url"), item.get("search") or ""),
+            )
+
+    def record_scores(self, results: Iterable[tuple], search: str = "") -> None:
+        """Store a search's LLM scores from (score, url) tuples."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE listings SET score = ?, prerank_dropped_at = NULL WHERE url = ? AND search = ?",
+                [(score, url, search) for score, url in results],
+            )
+
+    def was_notified(self, url: str) -> bool:
+        """True if the URL was sent to the user for any search."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM listings WHERE url = ? AND notified_at IS NOT NULL LIMIT 1", (url,)
+            ).fetchone()
+        return row is not None
+
+    def mark_notified(self, url: str, search: str = "") -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO listings (url, search, post_id, first_seen, last_seen, notified_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url, search) DO UPDATE SET notified_at = excluded.notified_at
+            """, (url, search, post_id_from_url(url), now, now, now))
+
+    def queue_notification(self, url: str, search: str = "", score: Optional[float] = None) -> None:
+        """Remember that a listing should be sent, so a failed send is retried on the next run."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO listings (url, search, post_id, score, first_seen, last_seen, queued_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url, search) DO UPDATE SET
+                    queued_at = COALESCE(listings.queued_at, excluded.queued_at),
+                    score = COALESCE(excluded.score, listings.score)
+            """, (url, search, post_id_from_url(url), score, now, now, now))
+
+    def pending_notifications(self) -> List[Tuple[Optional[float], str, str]]:
+        """(score, url, search) for every queued listing that has not been sent for any search."""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT score, url, search FROM listings AS queued
+                WHERE queued_at IS NOT NULL AND notified_at IS NULL
+                  AND NOT EXISTS (
+                      SELECT 1 FROM listings AS sent
+                      WHERE sent.url = queued.url AND sent.notified_at IS NOT NULL
+                  )
+                ORDER BY queued_at
+            """).fetchall()
+        return [(row["score"], row["url"], row["search"]) for row in rows]
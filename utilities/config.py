@@ -1,37 +1,291 @@
+import os
+import re
 import yaml
+from dataclasses import dataclass, field
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+from urllib.parse import urlencode
 from utilities.logger import Logger
 
+DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / "config.yaml"
+
+
+def _freeze(value):
+    """Recursively convert dicts and lists into read-only mappings and tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _parse_radius(value) -> Optional[int]:
+    """Accept 15, "15" or "15 miles" as a search radius in miles."""
+    if value is None:
+        return None
+    match = re.match(r"\s*(\d+)", str(value))
+    if not match:
+        raise ValueError(f"Search radius must be a number of miles, got {value!r}")
+    return int(match.group(1))
+
+
+@dataclass(frozen=True)
+class SearchConfig:
+    """One saved search: what to look for on Craigslist and how to rank the results."""
+    name: str
+    query: str
+    details: Tuple[str, ...]
+    regions: Tuple[str, ...]
+    category: str
+    zip_code: Optional[str]
+    radius: Optional[int]
+    threshold: float
+    top_k: int
+    prefilter: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: dict) -> "SearchConfig":
+        query = data.get("query")
+        if not query:
+            raise ValueError(f"Search is missing a query: {data!r}")
+        details = data.get("details") or ()
+        if isinstance(details, str):
+            details = (details,)
+        regions = data.get("regions") or [data.get("region", "sfbay")]
+        if isinstance(regions, str):
+            regions = [regions]
+        prefilter = data.get("prefilter") or {}
+        if not isinstance(details, (list, tuple)) or not isinstance(regions, (list, tuple)):
+            raise ValueError(f"Search details and regions must be a string or a list: {data!r}")
+        if not isinstance(prefilter, dict):
+            raise ValueError(f"Search prefilter must be a mapping: {data!r}")
+        try:
+            threshold = float(data.get("threshold", defaults["threshold"]))
+            top_k = int(data.get("top_k", defaults["top_k"]))
+        except (TypeError, ValueError):
+            raise ValueError(f"Search threshold and top_k must be numbers: {data!r}")
+        return cls(
+            name=str(data.get("name") or query),
+            query=str(query),
+            details=tuple(str(d) for d in details),
+            regions=tuple(dict.fromkeys(str(r) for r in regions)),
+            category=str(data.get("category", "bia")),
+            zip_code=str(data["zip_code"]) if data.get("zip_code") is not None else None,
+            radius=_parse_radius(data.get("radius")),
+            threshold=threshold,
+            top_k=top_k,
+            prefilter=_freeze(dict(prefilter)),
+        )
+
+    @property
+    def region(self) -> str:
+        """The first of the search's regions."""
+        return self.regions[0]
+
+    def url(self, base_url: Optional[str] = None, region: Optional[str] = None) -> str:
+        """
+        Build the search results URL for one of the search's regions (default = the first).
+
+        `base_url` points the search at a different host (e.g. a local stand-in)
+        and may contain a `{region}` placeholder.
+        """
+        region = region or self.region
+        params = {"query": self.query, "sort": "date"}
+        if self.zip_code:
+            params["postal"] = self.zip_code
+        if self.radius is not None:
+            params["search_distance"] = self.radius
+        base = base_url.format(region=region).rstrip("/") if base_url else f"https://{region}.craigslist.org"
+        return f"{base}/search/{self.category}?{urlencode(params)}"
+
+
+@dataclass(frozen=True)
+class TierConfig:
+    """One model of the LLM evaluation cascade and the backend that serves it."""
+    name: str
+    model: str
+    backend: str
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: dict) -> "TierConfig":
+        model = data.get("model") or defaults["model"]
+        return cls(
+            name=str(data.get("name") or model),
+            model=str(model),
+            backend=str(data.get("backend") or defaults["backend"]),
+        )
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    Immutable, validated view of config.yaml.
+
+    Known keys are exposed as typed attributes; every key (including ones
+    without a dedicated attribute) is also reachable through `get`.
+    """
+    batch_size: int
+    top_k: int
+    threshold: float
+    listing_count_limit: int
+    searches: Tuple[SearchConfig, ...]
+    tiers: Tuple[TierConfig, ...]
+    model: str
+    temperature: float
+    max_tokens: int
+    values: Mapping[str, Any] = field(repr=False)
+    path: str = ""
+    mtime: float = 0.0
+
+    _TYPES = {
+        "batch_size": int,
+        "top_k": int,
+        "threshold": float,
+        "listing_count_limit": int,
+        "model": str,
+        "temperature": float,
+        "max_tokens": int,
+    }
+
+    @classmethod
+    def from_dict(cls, data: dict, path: str = "", mtime: float = 0.0) -> "ConfigSnapshot":
+        """
+        Validate raw YAML data and build a snapshot from it.
+
+        Raises:
+            ValueError: If a required key is missing or has the wrong type
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"Configuration must be a mapping, got {type(data).__name__}")
+
+        typed = {}
+        for key, cast in cls._TYPES.items():
+            if data.get(key) is None:
+                raise ValueError(f"Missing required configuration key: {key}")
+            try:
+                typed[key] = cast(data[key])
+            except (TypeError, ValueError):
+                raise ValueError(f"Configuration key '{key}' must be {cast.__name__}, got {data[key]!r}")
+
+        searches = data.get("searches")
+        if searches is None:
+            # Single search configured with the older top-level keys
+            searches = [{
+                "query": data.get("search_query"),
+                "details": data.get("search_details"),
+                "zip_code": data.get("zip_code"),
+                "radius": data.get("range"),
+            }]
+        if not isinstance(searches, list) or not all(isinstance(search, dict) for search in searches):
+            raise ValueError(f"Configuration key 'searches' must be a list of mappings, got {searches!r}")
+        typed["searches"] = tuple(SearchConfig.from_dict(search, typed) for search in searches)
+        if not typed["searches"]:
+            raise ValueError("Configuration must define at least one search")
+        names = [search.name for search in typed["searches"]]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Search names must be unique, got {names}")
+
+        # Without a cascade, `model` alone scores every listing
+        tier_defaults = {"model": typed["model"], "backend": data.get("llm_backend") or "openai"}
+        tiers = data.get("llm_tiers") or [{"name": "default"}]
+        if not isinstance(tiers, list) or not all(isinstance(tier, dict) for tier in tiers):
+            raise ValueError(f"Configuration key 'llm_tiers' must be a list of mappings, got {tiers!r}")
+        typed["tiers"] = tuple(TierConfig.from_dict(tier, tier_defaults) for tier in tiers)
+        tier_names = [tier.name for tier in typed["tiers"]]
+        if len(set(tier_names)) != len(tier_names):
+            raise ValueError(f"LLM tier names must be unique, got {tier_names}")
+
+        for key in ("batch_size", "top_k", "listing_count_limit", "max_tokens"):
+            if typed[key] <= 0:
+                raise ValueError(f"Configuration key '{key}' must be positive, got {typed[key]}")
+
+        # Pre-ranking holds items until their window is flushed; without the timer a partial window never is
+        if data.get("prerank_enabled"):
+            max_wait = data.get("prerank_max_wait_seconds", 2)
+            if isinstance(max_wait, bool) or not isinstance(max_wait, (int, float)) or max_wait <= 0:
+                raise ValueError(f"Configuration key 'prerank_max_wait_seconds' must be positive, got {max_wait!r}")
+
+        values = dict(data)
+        values.update(typed)
+        return cls(**typed, values=_freeze(values), path=str(path), mtime=mtime)
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def search(self, name: str) -> SearchConfig:
+        for search in self.searches:
+            if search.name == name:
+                return search
+        raise KeyError(f"Unknown search: {name}")
+
+
 class Config:
     _instance = None
     _initialized = False
+    _snapshot: Optional[ConfigSnapshot] = None
 
-    def __new__(cls):
+    def __new__(cls, path=None):
         if cls._instance is None:
             cls._instance = super(Config, cls).__new__(cls)
         return cls._instance
 
     def __init__(self, path=None):
         if not self._initialized:
-            self._load(path)
+            self.path = Path(path) if path else DEFAULT_CONFIG_PATH
+            Config._snapshot = self._load()
             Config._initialized = True
             Logger.log("Configuration loaded", component="CONFIG", context={"path": str(path) if path else "default"})
 
-    def _load(self, file_path):
-        if file_path is None:
-            file_path = Path(__file__).parent.parent / "config.yaml"
+    def _load(self) -> ConfigSnapshot:
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, "r") as f:
+                data = yaml.safe_load(f)
+        except FileNotFoundError:
+            Logger.error(f"Project configuration file not found: {self.path}", component="CONFIG")
+            raise FileNotFoundError(f"Project configuration file not found: {self.path}")
+        return ConfigSnapshot.from_dict(data, path=self.path, mtime=mtime)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Re-read the config file if its mtime has moved since the last load.
+
+        An invalid file is logged and ignored so the previous snapshot stays in
+        effect. Type errors from a shape the validation does not cover are
+        treated the same way, so an edit can never take down the daemon.
+
+        Returns:
+            True if a new snapshot was swapped in
+        """
         try:
-            with open(file_path, "r") as f:
-                self.data = yaml.safe_load(f)
+            mtime = os.stat(self.path).st_mtime
         except FileNotFoundError:
-            Logger.error(f"Project configuration file not found: {file_path}", component="CONFIG")
-            raise FileNotFoundError(f"Project configuration file not found: {file_path}")
+            Logger.warning("Configuration file disappeared, keeping previous snapshot", component="CONFIG", context={"path": str(self.path)})
+            return False
+        if mtime == Config._snapshot.mtime:
+            return False
+
+        try:
+            Config._snapshot = self._load()
+        except (ValueError, TypeError, AttributeError, yaml.YAMLError) as e:
+            Logger.error(f"Ignoring invalid configuration reload: {e}", component="CONFIG")
+            return False
+        Logger.log("Configuration reloaded", component="CONFIG", context={"path": str(self.path)})
+        return True
+
+    @staticmethod
+    def current() -> ConfigSnapshot:
+        """Return the active snapshot. Hold on to it for repeated reads in a hot path."""
+        return Config._snapshot or Config()._snapshot
+
+    @staticmethod
+    def refresh() -> bool:
+        return Config().reload_if_changed()
 
     def get_value(self, key, default=None):
-        value = self.data.get(key, default)
-        Logger.log("Config get", component="CONFIG", context={"key": key, "has_value": value is not None})
-        return value
+        return Config._snapshot.get(key, default)
 
     @staticmethod
     def get(key, default=None):
-        return Config().get_value(key, default)
+        return Config.current().get(key, default)
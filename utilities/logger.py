@@ -1,58 +1,193 @@
 from datetime import datetime
 from typing import Optional
+import atexit
 import json
 import os
+import queue
+import sys
+import threading
+import time
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+
+class _LogWriter(threading.Thread):
+    """
+    Background thread that drains the log queue into an append-only JSONL file.
+
+    Lines are buffered in memory and written out once the buffer reaches
+    `flush_bytes` or `flush_interval` seconds have passed since the last write,
+    whichever comes first. The file is rotated once it grows past `max_bytes`.
+    """
+
+    def __init__(self, path: str, log_queue: queue.Queue, flush_interval: float,
+                 flush_bytes: int, max_bytes: int, backup_count: int):
+        super().__init__(name="LoggerWriter", daemon=True)
+        self.path = path
+        self.queue = log_queue
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._pending = []
+        self._pending_bytes = 0
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = self._file.tell()
+
+    def run(self):
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                entry = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                entry = None
+
+            if isinstance(entry, threading.Event):
+                self._flush()
+                last_flush = time.monotonic()
+                entry.set()
+                continue
+            if entry is Logger._STOP:
+                self._flush()
+                self._file.close()
+                return
+            if entry is not None:
+                self._pending.append(entry)
+                self._pending_bytes += len(entry)
+
+            if self._pending_bytes >= self.flush_bytes or time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        if self.max_bytes and self._size + self._pending_bytes > self.max_bytes and self._size > 0:
+            self._rotate()
+        data = "".join(self._pending)
+        self._file.write(data)
+        self._file.flush()
+        self._size += self._pending_bytes
+        self._pending.clear()
+        self._pending_bytes = 0
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._size = 0
+
 
 class Logger:
-    _log_file = "logs/logs.json"
+    _log_file = os.getenv("LOG_FILE", "logs/logs.jsonl")
+    _min_level = LEVELS.get(os.getenv("LOG_LEVEL", "INFO").upper(), LEVELS["INFO"])
+    _echo = os.getenv("LOG_ECHO", "1") != "0"
+    _queue_size = 10000
+    _flush_interval = 1.0
+    _flush_bytes = 64 * 1024
+    _max_bytes = 10 * 1024 * 1024
+    _backup_count = 3
+
+    _STOP = object()
     _initialized = False
-    
+    _cleared = False
+    _queue: Optional[queue.Queue] = None
+    _writer: Optional[_LogWriter] = None
+    _lock = threading.Lock()
+    dropped = 0
+
     @staticmethod
     def initialize():
-        """Initialize the logger by clearing the log file for a fresh start"""
-        os.makedirs(os.path.dirname(Logger._log_file), exist_ok=True)
-        
-        # Initialize with empty JSON array
-        with open(Logger._log_file, 'w') as f:
-            f.write('[]')
-        
-        Logger._initialized = True
+        """Initialize the logger by clearing the log file and starting the background writer"""
+        with Logger._lock:
+            if Logger._initialized:
+                return
+            os.makedirs(os.path.dirname(Logger._log_file) or ".", exist_ok=True)
+            if not Logger._cleared:
+                open(Logger._log_file, 'w').close()
+                atexit.register(Logger.shutdown)
+                Logger._cleared = True
+
+            Logger._queue = queue.Queue(maxsize=Logger._queue_size)
+            Logger._writer = _LogWriter(
+                Logger._log_file,
+                Logger._queue,
+                flush_interval=Logger._flush_interval,
+                flush_bytes=Logger._flush_bytes,
+                max_bytes=Logger._max_bytes,
+                backup_count=Logger._backup_count,
+            )
+            Logger._writer.start()
+            Logger._initialized = True
         Logger.log("Logger initialized - log file cleared", component="LOGGER")
 
+    @staticmethod
+    def set_level(level: str):
+        """Only entries at or above `level` are echoed and written"""
+        Logger._min_level = LEVELS[level.upper()]
+
     @staticmethod
     def format(msg: str, **kwargs):
         return json.dumps({
             "message": msg,
             **{k: v for k, v in kwargs.items() if v is not None},
-        })
-    
+        }, default=str)
+
     @staticmethod
     def log(msg: str, severity: str = "INFO", component: Optional[str] = None, context: Optional[dict] = None):
-        timestamp = datetime.now().isoformat()
-        log_entry = json.loads(Logger.format(
+        if LEVELS.get(severity, LEVELS["INFO"]) < Logger._min_level:
+            return
+
+        if not Logger._initialized:
+            Logger.initialize()
+
+        line = Logger.format(
             msg,
             severity=severity,
             component=component,
             context=context,
-            timestamp=timestamp,
-        ))
-        
-        if not Logger._initialized:
-            Logger.initialize()
-        
-        print(json.dumps(log_entry))
-        
-        # Read existing logs, append new entry, write back as JSON array
+            timestamp=datetime.now().isoformat(),
+        )
+
+        if Logger._echo:
+            print(line)
+
+        line += "\n"
+        if severity == "ERROR":
+            # Errors are never dropped; wait for room in the queue instead
+            Logger._queue.put(line)
+            return
         try:
-            with open(Logger._log_file, 'r') as f:
-                logs = json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            logs = []
-        
-        logs.append(log_entry)
-        
-        with open(Logger._log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
+            Logger._queue.put_nowait(line)
+        except queue.Full:
+            Logger.dropped += 1
+
+    @staticmethod
+    def flush(timeout: Optional[float] = 5.0):
+        """Block until every entry queued so far has been written to disk"""
+        if not Logger._initialized or not Logger._writer.is_alive():
+            return
+        done = threading.Event()
+        Logger._queue.put(done)
+        done.wait(timeout)
+
+    @staticmethod
+    def shutdown():
+        """Flush outstanding entries and stop the background writer"""
+        with Logger._lock:
+            if not Logger._initialized:
+                return
+            if Logger.dropped:
+                sys.stderr.write(f"Logger dropped {Logger.dropped} entries because the queue was full\n")
+            Logger._queue.put(Logger._STOP)
+            Logger._writer.join(timeout=5.0)
+            Logger._initialized = False
 
     @staticmethod
     def warning(msg: str, component: Optional[str] = None, context: Optional[dict] = None):
@@ -60,4 +195,4 @@ class Logger:
 
     @staticmethod
     def error(msg: str, component: Optional[str] = None, context: Optional[dict] = None):
-        Logger.log(msg, severity="ERROR", component=component, context=context)
\ No newline at end of file
+        Logger.log(msg, severity="ERROR", component=component, context=context)
@@ -0,0 +1,198 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import json
+import math
+import os
+import threading
+import time
+
+# Upper bounds in seconds, from a fast lxml parse up to a slow LLM request
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, math.inf)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, math.inf)
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are interpolated within a bucket the way Prometheus does."""
+    __slots__ = ("buckets", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                if math.isinf(upper):
+                    return self.max
+                value = lower + (upper - lower) * (rank - cumulative) / bucket_count
+                return min(max(value, self.min), self.max)
+            cumulative += bucket_count
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "min": round(self.min, 6) if self.count else None,
+            "max": round(self.max, 6) if self.count else None,
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.50),
+            "p90": self.quantile(0.90),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Metrics:
+    """
+    In-process counters and histograms for one run.
+
+    Everything is aggregated in memory behind a single lock, so recording a value
+    costs a dict lookup and a bisect; nothing is written until `dump`. Values are
+    keyed by name plus an optional `labels` dict (e.g. {"page": "detail"}).
+    Set METRICS_ENABLED=0 to turn recording into a no-op.
+    """
+    PREFIX = "craigslistbot_"
+    enabled = os.getenv("METRICS_ENABLED", "1") != "0"
+    _lock = threading.Lock()
+    _counters: Dict[tuple, float] = {}
+    _histograms: Dict[tuple, Histogram] = {}
+    _started_at = time.time()
+
+    @staticmethod
+    def _key(name: str, labels: Optional[dict]) -> tuple:
+        return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+    @staticmethod
+    def inc(name: str, value: float = 1, labels: Optional[dict] = None):
+        if not Metrics.enabled:
+            return
+        key = Metrics._key(name, labels)
+        with Metrics._lock:
+            Metrics._counters[key] = Metrics._counters.get(key, 0) + value
+
+    @staticmethod
+    def observe(name: str, value: Optional[float], labels: Optional[dict] = None,
+                buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        if not Metrics.enabled or value is None:
+            return
+        key = Metrics._key(name, labels)
+        with Metrics._lock:
+            histogram = Metrics._histograms.get(key)
+            if histogram is None:
+                histogram = Metrics._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @staticmethod
+    @contextmanager
+    def span(name: str, labels: Optional[dict] = None):
+        """Time the enclosed block (sync or around an await) into the `name` histogram, in seconds."""
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            Metrics.observe(name, time.perf_counter() - began, labels)
+
+    @staticmethod
+    def reset():
+        """Start a new run: forget every value recorded so far"""
+        with Metrics._lock:
+            Metrics._counters = {}
+            Metrics._histograms = {}
+            Metrics._started_at = time.time()
+
+    @staticmethod
+    def summary() -> dict:
+        with Metrics._lock:
+            counters = sorted(Metrics._counters.items())
+            histograms = sorted((key, histogram.summary()) for key, histogram in Metrics._histograms.items())
+        result = {
+            "started_at": datetime.fromtimestamp(Metrics._started_at).isoformat(),
+            "duration": round(time.time() - Metrics._started_at, 3),
+            "counters": {},
+            "histograms": {},
+        }
+        for (name, labels), value in counters:
+            result["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), summary in histograms:
+            result["histograms"].setdefault(name, []).append({"labels": dict(labels), **summary})
+        return result
+
+    @staticmethod
+    def _format_labels(labels, extra: Optional[tuple] = None) -> str:
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        escaped = (
+            f'{k}="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for k, v in pairs
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def prometheus() -> str:
+        """Render every value in the Prometheus text exposition format"""
+        with Metrics._lock:
+            counters = sorted(Metrics._counters.items())
+            histograms = sorted(
+                ((key, histogram.buckets, list(histogram.counts), histogram.sum, histogram.count)
+                 for key, histogram in Metrics._histograms.items()),
+                key=lambda entry: entry[0],
+            )
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            metric = Metrics.PREFIX + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{Metrics._format_labels(labels)} {value}")
+        for (name, labels), buckets, counts, total, count in histograms:
+            metric = Metrics.PREFIX + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                le = "+Inf" if math.isinf(bound) else repr(float(bound))
+                lines.append(f"{metric}_bucket{Metrics._format_labels(labels, ('le', le))} {cumulative}")
+            lines.append(f"{metric}_sum{Metrics._format_labels(labels)} {total}")
+            lines.append(f"{metric}_count{Metrics._format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def dump(json_path: Optional[str] = None, prometheus_path: Optional[str] = None) -> dict:
+        """Write the run summary as JSON and/or Prometheus text and return the summary"""
+        summary = Metrics.summary()
+        if json_path:
+            os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+        if prometheus_path:
+            os.makedirs(os.path.dirname(prometheus_path) or ".", exist_ok=True)
+            with open(prometheus_path, "w", encoding="utf-8") as f:
+                f.write(Metrics.prometheus())
+        return summary